@@ -0,0 +1,47 @@
+import pytest
+
+from xml_toolkit import Feed, build_report
+from xml_toolkit.fields import plan
+
+pytest.importorskip("lxml")
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- exported feed -->
+<root>
+<agents>
+<agent><name>Agent 0</name><email>agent0@example.com</email><telephone>0113 496 0000</telephone></agent>
+<agent><name>Agent 1</name><email/><telephone></telephone></agent>
+</agents>
+<properties>
+<property><external_reference>R1</external_reference><name>Unit 1 &amp; 2, Mill Lane</name>
+<address><address1>Unit 1</address1><address2/><town_city>Leeds</town_city><postcode>LS1 1AA</postcode></address>
+<location accuracy="1"><latitude>53.8</latitude><longitude>-1.55</longitude></location>
+<agents><agent><main_agent>1</main_agent><email>agent0@example.com</email></agent>
+<agent><main_agent>0</main_agent><email>nobody@example.com</email></agent></agents>
+<size type="2"><size_from>100</size_from><size_to></size_to></size>
+<sale_basises><sale_basis><tenure_type>2</tenure_type><sale_type>1</sale_type><guide_price>10</guide_price></sale_basis>
+<sale_basis><tenure_type>1</tenure_type></sale_basis></sale_basises>
+<descriptions><description type="4">Near <!-- note --> the station</description><description type="1"/></descriptions>
+<images><image><caption/><url>https://example.com/a.jpg</url></image></images>
+</property>
+<property><external_reference>R1</external_reference><name/><address/><agents/></property>
+<property><external_reference> R2 </external_reference><location><latitude>0</latitude><longitude>0</longitude></location></property>
+</properties>
+</root>
+"""
+
+
+def _parse(tmp_path, backend):
+    path = tmp_path / "feed.xml"
+    path.write_bytes(FEED)
+    feed = Feed(path, backend=backend)
+    rows = [plan.row_dict(p) for p in feed]
+    agents = [[(child.tag, child.text) for child in agent] for agent in feed.agents]
+    return rows, agents, build_report(Feed(path, backend=backend)).to_dict()
+
+
+def test_lxml_and_stdlib_give_the_same_results(tmp_path):
+    assert Feed(tmp_path, backend="lxml").backend.name == "lxml"
+    stdlib, lxml = _parse(tmp_path, "stdlib"), _parse(tmp_path, "lxml")
+    assert len(stdlib[0]) == 3 and len(stdlib[1]) == 2
+    assert lxml == stdlib
@@ -0,0 +1,45 @@
+import gzip
+import lzma
+
+import pytest
+
+from xml_toolkit.batch import feed_stems, run_batch
+from xml_toolkit.compression import ArchiveMember
+
+FEED = b"""<?xml version="1.0"?>
+<properties><property><external_reference>R1</external_reference></property></properties>
+"""
+
+
+def test_stems_keep_the_compression_suffix_only_when_shared():
+    assert feed_stems(["a/feed.xml", "a/feed.xml.gz", "a/feed.XML.xz", "a/other.xml.gz"]) == \
+        ["feed", "feed.gz", "feed.xz", "other"]
+    assert feed_stems([ArchiveMember("a/all.zip", "feed.xml"), "a/all-feed.xml"]) == \
+        ["all.zip-feed", "all-feed"]
+
+
+def test_feeds_with_the_same_name_are_refused():
+    with pytest.raises(ValueError, match="overwrite"):
+        feed_stems(["a/feed.xml", "b/feed.xml"])
+
+
+def test_batch_outputs_of_differently_compressed_feeds_are_kept_apart(tmp_path):
+    (tmp_path / "feed.xml").write_bytes(FEED)
+    with gzip.open(tmp_path / "feed.xml.gz", "wb") as f:
+        f.write(FEED)
+    with lzma.open(tmp_path / "feed.xml.xz", "wb") as f:
+        f.write(FEED)
+    paths = [tmp_path / name for name in ("feed.xml", "feed.xml.gz", "feed.xml.xz")]
+    results = list(run_batch(paths, tmp_path / "out", jobs=1, convert=False, perf_log=tmp_path / "perf.jsonl"))
+    assert [r.get("error") for r in results] == [None] * 3
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == \
+        ["feed.gz.report.json", "feed.report.json", "feed.xz.report.json"]
+
+
+def test_a_batch_with_clashing_feeds_processes_nothing(tmp_path):
+    for d in ("a", "b"):
+        (tmp_path / d).mkdir()
+        (tmp_path / d / "feed.xml").write_bytes(FEED)
+    with pytest.raises(ValueError):
+        next(run_batch([tmp_path / "a" / "feed.xml", tmp_path / "b" / "feed.xml"], tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
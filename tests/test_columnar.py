@@ -0,0 +1,36 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+
+from xml_toolkit.columnar import ColumnarWriter
+
+COLUMNS = ("external_reference", "sales_status")
+ROWS = [("A1", "For Sale"), ("A2", "Sold"), ("A3", "For Sale"), ("A4", "Under Offer"),
+        ("A5", "Let"), ("A6", "Sold"), ("A7", "")]
+
+
+def _write(path, fmt):
+    with ColumnarWriter(path, fmt, columns=COLUMNS, coded=("sales_status",), batch_rows=2) as w:
+        for row in ROWS:
+            w.write(row)
+    return w
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_round_trip_over_several_batches(tmp_path, fmt):
+    path = tmp_path / f"out.{fmt}"
+    assert _write(path, fmt).rows == len(ROWS)
+    table = pa.ipc.open_file(path).read_all() if fmt == "arrow" else pq.read_table(path)
+    frame = table.to_pandas()
+    assert list(frame.itertuples(index=False, name=None)) == ROWS
+    assert str(frame["sales_status"].dtype) == "category"
+
+
+def test_arrow_batches_share_one_growing_dictionary(tmp_path):
+    path = tmp_path / "out.arrow"
+    _write(path, "arrow")
+    reader = pa.ipc.open_file(path)
+    assert reader.num_record_batches == 4
+    last = reader.get_batch(reader.num_record_batches - 1).column(1)
+    assert last.dictionary.to_pylist() == ["For Sale", "Sold", "Under Offer", "Let", ""]
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+
+from xml_toolkit.diff import OTHER_CONTENT, diff_feeds, export_diff, fingerprint
+from xml_toolkit.feed import Feed
+
+
+def _feed(*props):
+    body = "".join(f"<property><external_reference>{ref}</external_reference>{inner}</property>\n"
+                   for ref, inner in props)
+    return io.BytesIO(f'<?xml version="1.0"?><root><properties>{body}</properties></root>'.encode())
+
+
+def test_added_removed_and_changed_refs():
+    previous = _feed(("A", "<name>a</name>"), ("B", "<name>b</name>"), ("C", "<name>c</name>"))
+    current = _feed(("A", "<name>a</name>"), ("C", "<name>c2</name>"), ("D", "<name>d</name>"))
+    diff = diff_feeds(previous, current)
+    assert diff.summary() == {"added": 1, "changed": 1, "removed": 1, "unchanged": 1}
+    assert diff.rows[["Change", "external_reference", "name"]].values.tolist() == [
+        ["Changed", "C", "c2"], ["Added", "D", "d"]]
+    assert diff.removed["external_reference"].tolist() == ["B"]
+    assert diff.fields.values.tolist() == [["C", "name", "c", "c2"]]
+
+
+def test_duplicate_refs_are_matched_by_occurrence():
+    previous = _feed(("A", "<name>first</name>"), ("A", "<name>second</name>"), ("B", ""), ("B", ""))
+    current = _feed(("A", "<name>first</name>"), ("A", "<name>changed</name>"), ("A", "<name>third</name>"),
+                    ("B", ""))
+    diff = diff_feeds(previous, current)
+    assert diff.summary() == {"added": 1, "changed": 1, "removed": 1, "unchanged": 2}
+    assert diff.rows[["Change", "name"]].values.tolist() == [["Changed", "changed"], ["Added", "third"]]
+    assert diff.fields.values.tolist() == [["A", "name", "second", "changed"]]
+    assert diff.removed["external_reference"].tolist() == ["B"]
+
+
+def test_change_outside_the_exported_fields():
+    previous = _feed(("A", "<name>a</name><internal_note>x</internal_note>"))
+    current = _feed(("A", "<name>a</name><internal_note>y</internal_note>"))
+    diff = diff_feeds(previous, current)
+    assert diff.summary()["changed"] == 1
+    assert diff.fields.values.tolist() == [["A", OTHER_CONTENT, "", ""]]
+
+
+def test_whitespace_around_values_is_not_a_change():
+    previous = _feed(("A", "<name>a</name>"))
+    current = _feed(("A", "\n  <name> a\n</name>  "))
+    assert diff_feeds(previous, current).summary() == {"added": 0, "changed": 0, "removed": 0, "unchanged": 1}
+    a, b = (fingerprint(next(iter(Feed(_feed(("A", f"<size type='{t}'/>")))))) for t in (1, 2))
+    assert a != b       # attributes count
+
+
+def test_export_writes_every_sheet():
+    diff = diff_feeds(_feed(("A", "<name>a</name>"), ("B", "")), _feed(("A", "<name>b</name>")))
+    artifact = export_diff(diff)
+    sheets = pd.read_excel(artifact.path, sheet_name=None)
+    assert {name: len(frame) for name, frame in sheets.items()} == {
+        "Changed rows": 1, "Field changes": 1, "Removed": 1}
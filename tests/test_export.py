@@ -0,0 +1,33 @@
+import pandas as pd
+
+from xml_toolkit import export
+from xml_toolkit.export import write_tables, write_xlsx
+
+
+def test_rows_past_the_sheet_limit_continue_on_another_sheet(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 3)
+    path = tmp_path / "out.xlsx"
+    rows = [(f"R{i}", str(i)) for i in range(5)]
+    assert write_xlsx(iter(rows), path, columns=("ref", "n")) == 5
+    sheets = pd.read_excel(path, sheet_name=None, dtype=str)
+    assert list(sheets) == ["Properties", "Properties (2)", "Properties (3)"]
+    assert [tuple(r) for frame in sheets.values() for r in frame.itertuples(index=False)] == rows
+
+
+def test_child_tables_continue_on_another_sheet(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 2)
+    path = tmp_path / "out.xlsx"
+    tables = {"main": (("ref",), ()), "images": (("ref", "url"), ())}
+    records = [((f"R{i}",), {"images": [(f"R{i}", "a"), (f"R{i}", "b")]}) for i in range(2)]
+    assert write_tables(iter(records), {"xlsx": path}, tables) == 2
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert set(sheets) == {"main", "main (2)", "images", "images (2)", "images (3)", "images (4)"}
+    assert sum(len(sheets[name]) for name in sheets if name.startswith("images")) == 4
+
+
+def test_an_overlong_cell_keeps_the_rest_of_its_row(tmp_path):
+    path = tmp_path / "out.xlsx"
+    write_xlsx([("x" * 40000, "after")], path, columns=("long", "next"))
+    frame = pd.read_excel(path)
+    assert len(frame["long"][0]) == 32767
+    assert frame["next"][0] == "after"
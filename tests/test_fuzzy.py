@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from xml_toolkit import fuzzy
+from xml_toolkit.fuzzy import RefIndex, suggestion_columns
+
+
+def _levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ca != cb))
+    return row[-1]
+
+
+@pytest.fixture
+def numpy_distances(monkeypatch):
+    monkeypatch.setattr(fuzzy, "_rapid_levenshtein", None)
+
+
+def test_numpy_distances_match_a_naive_levenshtein(numpy_distances):
+    rng = random.Random(7)
+    alphabet = "ab1-é"
+    for _ in range(200):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 9)))
+        others = ["".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 9))) for _ in range(6)]
+        assert fuzzy._distances(a, others).tolist() == [_levenshtein(a, o) for o in others]
+
+
+@pytest.fixture(scope="module")
+def index():
+    # one shared prefix and many shared digits, so common trigrams get skipped
+    return RefIndex([f"SYN{i * 7919 % 10 ** 7:07d}" for i in range(5000)] + ["AB", "7", "X-1"])
+
+
+@pytest.mark.parametrize("query", ["SYN0039595", "syn 0039-595 ", "SYN0039559", "SYN00395955", "SYN003959"])
+def test_suggests_case_changed_padded_and_transposed_refs(index, numpy_distances, query):
+    assert index.suggest(query)[0][0] == "SYN0039595"       # ref 5 of the index
+
+
+def test_refs_shorter_than_three_characters(index):
+    assert index.suggest("ab") == [("AB", 1.0)]
+    assert index.suggest("7") == [("7", 1.0)]
+    assert index.suggest("x1") == [("X-1", 1.0)]
+    assert index.suggest("ABX") == [("AB", 0.667)]
+    assert index.suggest("8") == [] and index.suggest("-") == []
+
+
+def test_suggestion_columns(index):
+    frame = suggestion_columns(["SYN0039559", "nothing like it"], index, "XML")
+    assert frame["Closest XML ref(s)"].tolist()[0].startswith("SYN0039595")
+    assert frame["Closest XML ref(s)"].tolist()[1] == "" and np.isnan(frame["Similarity"].tolist()[1])
+    assert suggestion_columns(["A"], None, "XML")["Closest XML ref(s)"].tolist() == [""]
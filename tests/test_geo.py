@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from xml_toolkit.geo import GEO_COLUMNS, Centroids
+
+CENTROIDS = Centroids(["LS1 1AA", "ls12ab", "LS2 7HY", "YO1 7HH", "", "BAD 0AA"],
+                      [53.800, 53.796, 53.806, 53.96, 53.0, 0.0],
+                      [-1.550, -1.545, -1.555, -1.08, -1.0, 0.0])
+
+
+def issues(positions):
+    rows = CENTROIDS.validate(positions)
+    assert all(len(row) == len(GEO_COLUMNS) for row in rows)
+    return {row[0]: row[-1] for row in rows}
+
+
+def test_unusable_centroid_rows_are_dropped():
+    assert len(CENTROIDS) == 4
+    assert CENTROIDS.lookup(["BAD 0AA"])[2].tolist() == [False]
+    assert np.isnan(CENTROIDS.lookup(["BAD 0AA"])[0]).all()
+
+
+def test_verdicts():
+    assert issues([
+        ("ok", "LS1 1AA", "53.801", "-1.551", "4"),
+        ("zero", "LS1 1AA", "0", "0", "4"),
+        ("swapped", "LS1 1AA", "-1.55", "53.80", "4"),
+        ("far", "LS1 1AA", "53.90", "-1.55", "4"),
+        ("loose", "LS1 1AA", "53.90", "-1.55", "0"),
+        ("sea", "ZZ9 9ZZ", "40.0", "10.0", "4"),
+        ("inland", "ZZ9 9ZZ", "53.9", "-1.2", "4"),
+        ("range", "LS1 1AA", "95", "-1.55", "4"),
+        ("text", "LS1 1AA", "north", "-1.55", "4"),
+    ]) == {"zero": "zero", "swapped": "swapped", "far": "far from postcode",
+           "sea": "outside postcode coverage", "range": "out of range", "text": "not a number"}
+
+
+def test_unknown_postcode_falls_back_to_its_district():
+    lat, lon, district = CENTROIDS.lookup(["LS1 9ZZ", "LS1 1AA", "ZZ9 9ZZ"])
+    assert district.tolist() == [True, False, False]
+    assert lat[0] == pytest.approx((53.800 + 53.796) / 2, abs=1e-4)
+    assert np.isnan(lat[2])
+    # within the accuracy band plus the district slack, but not beyond it
+    assert issues([
+        ("near", "LS1 9ZZ", "53.87", "-1.55", "4"),
+        ("far", "LS1 9ZZ", "53.95", "-1.55", "4"),
+    ]) == {"far": "far from postcode"}
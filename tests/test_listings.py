@@ -0,0 +1,31 @@
+from xml_toolkit.listings import GRID, ListingIndex
+
+
+def _add(index, ref, name, line1, lat, line2=""):
+    index.add(ref, name, (line1, line2, "", "Town", "", "AB1 2CD"), "AB1 2CD", lat, -1.0)
+
+
+def test_nearby_listings_without_a_shared_signal_do_not_chain():
+    index = ListingIndex()
+    for k in range(6):      # each flat one cell from the next along the street
+        _add(index, f"F{k}", f"Flat {k}", f"Flat {k}", 51.0 + k * GRID * 0.9, line2="High Street")
+    assert index.clusters() == []
+
+
+def test_nearby_listings_join_on_name_or_first_address_line():
+    index = ListingIndex()
+    _add(index, "N1", "The Old Mill", "Unit 1", 52.0)
+    _add(index, "N2", "the old mill", "Unit 9", 52.0 + GRID * 0.5)
+    _add(index, "U1", "", "Unit 4", 53.0, line2="Park Road")
+    _add(index, "U2", "", "unit 4", 53.0 + GRID * 0.5)
+    _add(index, "X1", "", "Unit 4", 54.0, line2="Dock Road")     # same first line, but far away
+    assert [(row[0], row[1], row[-1]) for row in index.clusters()] == [
+        (1, "N1", "location + name"), (1, "N2", "location + name"),
+        (2, "U1", "location + street"), (2, "U2", "location + street")]
+
+
+def test_merged_indexes_cluster_like_one():
+    whole, first, second = ListingIndex(), ListingIndex(), ListingIndex()
+    for index, ref in ((whole, "A"), (whole, "B"), (first, "A"), (second, "B")):
+        _add(index, ref, "Mill House", "1 Mill Lane", 52.0)
+    assert first.merge(second).clusters() == whole.clusters()
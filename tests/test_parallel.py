@@ -0,0 +1,38 @@
+import glob
+import os
+import tempfile
+
+import pytest
+
+from xml_toolkit.parallel import parallel_pass
+
+
+class Stop(Exception):
+    pass
+
+
+def _feed(path, count):
+    props = "".join(f"<property><external_reference>R{i}</external_reference></property>\n"
+                    for i in range(count))
+    path.write_text(f'<?xml version="1.0"?>\n<properties>\n{props}</properties>\n', encoding="utf-8")
+    return path
+
+
+def test_progress_reports_every_range(tmp_path):
+    feed = _feed(tmp_path / "feed.xml", 500)
+    seen = []
+    done = parallel_pass(feed, 2, report=False, refs=True, progress=seen.append)
+    assert len(seen) >= 2 * 4 and sum(seen) == done.count == 500
+    assert len(done.ref_frame()) == 500
+
+
+def test_a_raising_progress_stops_the_pass_and_drops_its_rows(tmp_path):
+    feed = _feed(tmp_path / "feed.xml", 2000)
+    spooled = set(glob.glob(os.path.join(tempfile.gettempdir(), "xml_toolkit_*.rows")))
+
+    def stop(count):
+        raise Stop
+
+    with pytest.raises(Stop):
+        parallel_pass(feed, 2, report=False, rows=True, chunk_bytes=1 << 10, progress=stop)
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), "xml_toolkit_*.rows"))) <= spooled
@@ -0,0 +1,86 @@
+import base64
+import hashlib
+import io
+import random
+import re
+
+import pytest
+
+from xml_toolkit.feed import Feed
+from xml_toolkit.fields import plan
+from xml_toolkit.payloads import PayloadFilter, PayloadSink
+
+
+class Trickle:
+    """A raw stream returning 1–7 bytes per read, whatever size is asked for."""
+
+    def __init__(self, data, seed):
+        self._f, self._rng = io.BytesIO(data), random.Random(seed)
+
+    def read(self, size=-1):
+        return self._f.read(self._rng.randint(1, 7))
+
+    def close(self):
+        pass
+
+
+def _b64(n, seed):
+    text = base64.b64encode(random.Random(seed).randbytes(n)).decode()
+    return "\n".join(text[i:i + 76] for i in range(0, len(text), 76))
+
+
+PAYLOADS = [_b64(300, 1), _b64(50, 2), _b64(1000, 3)]
+FEED = f"""<?xml version="1.0"?>
+<root><properties>
+<property><external_reference>R1</external_reference>
+<images><image><url>a.jpg</url><data>{PAYLOADS[0]}</data></image>
+<image type="x"><data type="base64">{PAYLOADS[1]}</data></image><image><data/></image></images>
+<documents><document><data>{PAYLOADS[2]}</data></document></documents>
+<notes><data>not a payload</data><database>kept</database></notes>
+</property>
+<property><external_reference>R2</external_reference><images><image><data></data></image></images></property>
+</properties></root>
+""".encode()
+
+
+def _reference(payload):
+    raw = payload.encode()
+    return f"[payload {len(raw)} chars sha256:{hashlib.sha256(raw).hexdigest()[:16]}]"
+
+
+def _parse(source, payloads=None):
+    """(elements, export row) of each property; elements are (tag, attributes, text)."""
+    return [([(e.tag, e.attrib, e.text or "") for e in p.iter()], plan.row_dict(p))
+            for p in Feed(source, payloads=payloads)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tiny_reads_parse_like_the_unfiltered_feed(seed):
+    references = {payload: _reference(payload) for payload in PAYLOADS}
+    sink = PayloadSink()
+    filtered = _parse(Trickle(FEED, seed), sink)
+    unfiltered = _parse(io.BytesIO(FEED))
+    assert len(filtered) == len(unfiltered) == 2
+    for (elements, row), (plain_elements, plain_row) in zip(filtered, unfiltered):
+        assert elements == [(tag, attrib, references.get(text, text)) for tag, attrib, text in plain_elements]
+        assert {k: v for k, v in row.items() if k not in ("image", "brochure")} == \
+            {k: v for k, v in plain_row.items() if k not in ("image", "brochure")}
+    assert sink.count == 4 and sink.chars == sum(len(p) for p in PAYLOADS)      # and one empty <data>
+
+
+def test_read_returns_at_most_size_bytes():
+    stream = PayloadFilter(Trickle(FEED, 9), PayloadSink())
+    rng, pieces = random.Random(3), []
+    while True:
+        size = rng.randint(0, 40)
+        piece = stream.read(size)
+        assert len(piece) <= size
+        if size and not piece:
+            break
+        pieces.append(piece)
+    filtered = b"".join(pieces)
+    assert b"not a payload" in filtered and b"<database>kept</database>" in filtered
+    assert re.findall(rb"\[payload \d+ chars sha256:\w+\]", filtered) == [
+        _reference(p).encode() for p in PAYLOADS]
+    rest = PayloadFilter(io.BytesIO(FEED), PayloadSink())
+    assert rest.read(10) + rest.read() == filtered
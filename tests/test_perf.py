@@ -0,0 +1,45 @@
+import threading
+import tracemalloc
+
+from xml_toolkit.perf import Run
+
+
+def test_a_lone_run_measures_memory():
+    with Run("a", memory=True) as run, run.stage("alloc"):
+        data = bytearray(1 << 20)
+    assert not run.memory_skipped
+    assert run.stages["alloc"].peak_bytes >= 1 << 20
+    assert not tracemalloc.is_tracing()
+    del data
+
+
+def test_overlapping_runs_record_no_peaks():
+    started, release = threading.Event(), threading.Event()
+    inner = {}
+
+    def other():
+        with Run("b", memory=True) as run, run.stage("alloc"):
+            started.set()
+            release.wait()
+        inner["run"] = run
+
+    with Run("a", memory=True) as outer, outer.stage("alloc"):
+        worker = threading.Thread(target=other)
+        worker.start()
+        started.wait()
+        release.set()
+        worker.join()
+    assert outer.memory_skipped and inner["run"].memory_skipped
+    assert outer.stages["alloc"].peak_bytes is None
+    assert inner["run"].stages["alloc"].peak_bytes is None
+    assert not tracemalloc.is_tracing()
+
+
+def test_a_run_leaves_tracing_it_did_not_start_alone():
+    tracemalloc.start()
+    try:
+        with Run("a", memory=True) as run, run.stage("s"):
+            pass
+        assert run.memory_skipped and tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,56 @@
+import io
+import threading
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from xml_toolkit.jobs import Cancelled, Job
+from xml_toolkit.reconcile import count_feeds, reconcile
+
+
+def _feed(*refs):
+    props = "".join(f"<property><external_reference>{r}</external_reference></property>" for r in refs)
+    return f'<?xml version="1.0"?><properties>{props}</properties>'.encode()
+
+
+def test_feeds_on_disk_and_in_memory_are_counted_in_order(tmp_path):
+    (tmp_path / "a.xml").write_bytes(_feed("A", "A", "B"))
+    (tmp_path / "c.xml").write_bytes(_feed("C"))
+    sources = [tmp_path / "a.xml", io.BytesIO(_feed("M")), str(tmp_path / "c.xml"), io.BytesIO(b"<oops")]
+    found = list(count_feeds(sources, jobs=2))
+    assert [s for s, _, _ in found] == sources
+    assert [dict(c) if c else None for _, c, _ in found] == [{"A": 2, "B": 1}, {"M": 1}, {"C": 1}, None]
+    assert found[-1][2]
+
+
+def test_advance_counts_until_cancelled():
+    started, go = threading.Event(), threading.Event()
+
+    def work(job):
+        job.advance(5)
+        started.set()
+        go.wait()
+        job.advance(5)
+        return "finished"
+
+    job = Job(work)
+    started.wait()
+    assert job.done == 5
+    job.cancel()
+    go.set()
+    job._future.result()
+    assert (job.state, job.done) == ("cancelled", 5)
+    with pytest.raises(Cancelled):
+        job.advance(1)
+
+
+def test_feeds_sharing_a_name_keep_their_own_columns():
+    master = pd.DataFrame({"Property ref": ["A", "B", "C"]})
+    result = reconcile(master, [("feed.xml", Counter({"A": 1})), ("feed.xml", Counter({"B": 1, "C": 2}))])
+    assert result.feeds == ["feed.xml", "feed.xml (2)"]
+    assert result.per_feed[["Feed", "Properties", "Refs"]].values.tolist() == [
+        ["feed.xml", 1, 1], ["feed.xml (2)", 3, 2]]
+    matrix = result.matrix.set_index("Property ref")
+    assert matrix.loc["A", ["feed.xml", "feed.xml (2)"]].tolist() == [1, 0]
+    assert matrix.loc["C", "Status"] == "duplicate"
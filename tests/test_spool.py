@@ -0,0 +1,28 @@
+import gzip
+import io
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+from xml_toolkit.spool import SPLIT_CONTEXT, SpooledUpload, progress_total
+
+
+def test_split_workers_do_not_run_the_page(tmp_path, monkeypatch):
+    marker = tmp_path / "page ran"
+    page = tmp_path / "page.py"
+    page.write_text(f"open({str(marker)!r}, 'w').close()\n", encoding="utf-8")
+    main = types.ModuleType("__main__")     # what Streamlit makes of a page
+    main.__file__ = str(page)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    with ProcessPoolExecutor(max_workers=1, mp_context=SPLIT_CONTEXT) as pool:
+        assert pool.submit(os.getpid).result() != os.getpid()
+    assert sys.modules["__main__"] is main
+    assert not marker.exists()
+
+
+def test_only_spooled_plain_feeds_get_a_progress_total():
+    feed = b"<root><properties>" + b"<property><name>x</name></property>" * 3 + b"</properties></root>"
+    assert progress_total(SpooledUpload(io.BytesIO(feed))) == 3
+    assert progress_total(SpooledUpload(io.BytesIO(gzip.compress(feed)))) is None
+    assert progress_total(io.BytesIO(feed)) is None
@@ -0,0 +1,44 @@
+import pytest
+
+from xml_toolkit import Feed, build_report, synthetic
+from xml_toolkit.compare import xml_ref_frame
+from xml_toolkit.payloads import PayloadSink
+from xml_toolkit.store import FeedStore
+
+EDGE_CASES = """<?xml version="1.0"?>
+<root><properties>
+<property><external_reference> R1 </external_reference><name>Mill House</name>
+<address><address1>1 Mill Lane</address1><postcode>LS1 1AA</postcode></address>
+<location><latitude>53.8</latitude><longitude>-1.55</longitude></location><sales_status>5</sales_status></property>
+<property><external_reference>R1</external_reference><name>Mill House</name>
+<address><address1>1 mill lane.</address1><postcode>ls11aa</postcode></address>
+<location><latitude>0</latitude><longitude>0</longitude></location><sales_status/></property>
+<property><external_reference></external_reference><name>No ref</name><address/></property>
+<property><external_reference>R2</external_reference><name>R2</name>
+<address><address1>R2</address1><town_city>Leeds</town_city></address>
+<location><latitude>north</latitude><longitude>200</longitude></location>
+<agents><agent><main_agent>1</main_agent><email>not-an-email</email></agent></agents>
+<images><image><url>a.jpg</url><data>aGVsbG8=</data></image></images>
+<sale_basises><sale_basis><guide_price>£1m</guide_price></sale_basis></sale_basises></property>
+<property/>
+</properties></root>
+"""
+
+
+@pytest.fixture(params=["synthetic", "edge cases"])
+def feed_path(request, tmp_path):
+    path = tmp_path / "feed.xml"
+    if request.param == "synthetic":
+        synthetic.write_feed(path, 300, dup_rate=0.05, fault_rate=0.1, blob_rate=0.1, seed=3)
+    else:
+        path.write_text(EDGE_CASES, encoding="utf-8")
+    return path
+
+
+def test_stored_feed_gives_the_streamed_results(feed_path, tmp_path):
+    store = FeedStore(tmp_path / "store.db")
+    expected = build_report(Feed(feed_path, payloads=PayloadSink())).to_dict()
+    assert store.report("d", store.feed(feed_path)).to_dict() == expected
+    assert FeedStore(tmp_path / "store.db").report("d").to_dict() == expected     # from the stored rows only
+    refs = store.xml_ref_frame("d")
+    assert refs.equals(xml_ref_frame(Feed(feed_path)))
@@ -6,41 +6,50 @@
 # -------------------------------------------------------------
 
 import streamlit as st
-import xml.etree.ElementTree as ET
-import pandas as pd
-from collections import Counter
-import io
+
+from xml_toolkit import Feed, build_report
+from xml_toolkit.cache import results
+from xml_toolkit.compare import compare_refs, read_ref_export, xml_ref_frame
+from xml_toolkit.compression import UPLOAD_TYPES, expand_archive
+from xml_toolkit.diff import diff_feeds, export_diff
+from xml_toolkit.export import (FORMATS, LAYOUTS, PAYLOAD_MODES, XLSX_MIME, ZIP_MIME,
+                                available_formats, export_workbook, output_type)
+from xml_toolkit.jobs import detached
+from xml_toolkit.reconcile import count_feeds, export_reconciliation, reconcile
+from xml_toolkit.spool import SPLIT_CONTEXT, SPLIT_JOBS, progress_total, split_pass, split_path
+from xml_toolkit.store import STORE_PATH, FeedStore
+from xml_toolkit.ui import (PerfPanel, background_job, feed_upload, job_result, render_diff,
+                            render_findings, render_job, render_report, rerun_while_busy,
+                            upload_digest, upload_source)
 
 # ────────────────────────────────────────────────────────────────────────────
 # 1 · STREAMLIT CONFIG
 # ────────────────────────────────────────────────────────────────────────────
 st.set_page_config(page_title="XML Property Toolkit", layout="wide")
 st.title("XML Property Toolkit")
+perf = PerfPanel()
 
 # ────────────────────────────────────────────────────────────────────────────
 # 2 · XML UPLOAD
 # ────────────────────────────────────────────────────────────────────────────
-xml_file = st.file_uploader("📤 Upload XML", type=["xml"], key="xml")
+xml_file = st.file_uploader("📤 Upload XML (or .gz / .bz2 / .xz / .zip)", type=UPLOAD_TYPES, key="xml")
 if not xml_file:
     st.stop()
 
 # ────────────────────────────────────────────────────────────────────────────
-# 3 · PARSE XML ONCE (shared by all actions)
+# 3 · OPEN XML AS A STREAM (each action makes one pass, one property at a time)
 # ────────────────────────────────────────────────────────────────────────────
-try:
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    properties = root.findall(".//property")
-except Exception as e:
-    st.error(f"❌ Cannot parse XML: {e}")
-    st.stop()
+source, digest = feed_upload(xml_file, "xml_member")   # digest keys cached results across reruns
+store = FeedStore() if STORE_PATH else None   # persistent SQLite index, when configured
+feed = store.feed(source) if store else Feed(source)
+split = store is None and split_path(source) is not None   # large plain XML: parsed across processes
 
 # ────────────────────────────────────────────────────────────────────────────
 # 4 · ACTION MENU
 # ────────────────────────────────────────────────────────────────────────────
 action = st.sidebar.radio(
     "◀️ Select action",
-    ("Report", "External Ref Comparison", "Convert XML ➜ Excel")
+    ("Report", "External Ref Comparison", "Convert XML ➜ Excel", "Feed Diff", "Reconcile Feeds")
 )
 
 # =============================================================================
@@ -48,91 +57,87 @@ action = st.sidebar.radio(
 # =============================================================================
 if action == "Report":
     with st.expander("📊 Click to show / hide full report", expanded=False):
+        report_key = (digest, "report")
+        report = results.get(report_key)
+        if report is None:
+            report = job_result(report_key)
+            if report is not None:
+                results.put(report_key, report, size=report.nbytes)
 
-        # (a) Blank phone numbers
-        st.subheader("a) Blank phone numbers in global <agents>")
-        blanks = [(a.findtext("name","[No Name]"), a.findtext("email","[No Email]"))
-                  for a in root.findall("agents/agent")
-                  if not (a.findtext("telephone") or "").strip()]
-        st.write(f"Count: {len(blanks)}")
-        for n,e in blanks:
-            st.write(f"• {n} | {e}")
-
-        # (b) Duplicate vs unique refs
-        st.subheader("b) External reference uniqueness")
-        ref_counts = Counter(p.findtext("external_reference","") for p in properties)
-        dups = [r for r,c in ref_counts.items() if c>1]
-        st.write(f"Unique: {sum(1 for c in ref_counts.values() if c==1)} | Duplicates: {len(dups)}")
-        if dups: st.write(dups)
-
-        # (c) Sales status counts
-        st.subheader("c) Sales status counts")
-        status_map = {"1":"Available","2":"Under Offer","3":"Sold",
-                      "4":"Withdrawn","5":"Let","6":"Unconfirmed"}
-        s_cnt = Counter(p.findtext("sales_status","") for p in properties)
-        for k,v in status_map.items():
-            st.write(f"{v}: {s_cnt.get(k,0)}")
-
-        # (d) Property type counts
-        st.subheader("d) Property type counts")
-        ptype_map = {"1":"Offices","2":"Industrial","3":"Land",
-                     "4":"Retail","5":"Leisure","6":"Other"}
-        t_cnt = Counter(p.findtext("property_type","") for p in properties)
-        for k,v in ptype_map.items():
-            st.write(f"{v}: {t_cnt.get(k,0)}")
-
-        # (l) LAT/LONG blank but tags present
-        st.subheader("l) LAT / LONG tags present but blank")
-        miss_latlng = [p.findtext("external_reference") for p in properties
-                       if (loc:=p.find("location")) is not None and
-                       (not (loc.findtext("latitude") or "").strip()
-                        or not (loc.findtext("longitude") or "").strip())]
-        st.write(miss_latlng if miss_latlng else "✅ None")
-
-        st.caption("Report truncated – add more checks (e–n) as needed.")
+        if report is None:
+            def build(job, source=detached(source)):
+                job.total = progress_total(source)
+                if split:
+                    with perf.run("Report", jobs=SPLIT_JOBS) as run, run.stage("parallel pass", jobs=SPLIT_JOBS):
+                        return split_pass(source, progress=job.advance).report()
+                job_feed = job.track(store.feed(source) if store else Feed(source))
+                with perf.run("Report") as run, run.stage("build report"):
+                    return store.report(digest, job_feed, run) if store else build_report(job_feed, run)
+
+            background_job(report_key, build, "Building report")
+            render_job(report_key)
+        else:
+            with perf.run("Render report") as run, run.stage("render"):
+                render_report(report)
+
+    if store is not None:
+        lookup_ref = st.text_input("🔎 Look up an external_reference in the stored feed")
+        if lookup_ref:
+            ingest_key = (digest, "ingest")
+            job_result(ingest_key)
+            if store.has(digest):
+                st.dataframe(store.lookup(digest, lookup_ref.strip()), hide_index=True)
+            elif report is None:     # the report job stores the feed on its way
+                st.info("The feed is stored while the report is built; look-ups work once it is ready.")
+            else:
+                def ingest(job, source=detached(source)):
+                    job.total = progress_total(source)
+                    return store.ingest(digest, job.track(store.feed(source)))
+
+                background_job(ingest_key, ingest, "Storing feed", restart=True)
+                render_job(ingest_key)
 
 # =============================================================================
 # ACTION 2 · EXCEL COMPARISON
 # =============================================================================
 if action == "External Ref Comparison":
     st.header("External Ref Comparison")
-    xls = st.file_uploader("Upload Excel", type=["xls","xlsx"], key="xls")
+    xls = st.file_uploader("Upload Excel (or CSV)", type=["xls","xlsx","csv"], key="xls")
     if xls:
         try:
-            df = pd.read_excel(xls)
-            if "Property ref" not in df.columns:
-                st.error("Excel must contain 'Property ref' column"); st.stop()
-            xls_refs = df["Property ref"].astype(str).str.strip()
-            xml_refs = [p.findtext("external_reference","").strip() for p in properties]
-            xml_counts = Counter(xml_refs)
-
-            # Issues in Excel side
-            issues = []
-            for _,row in df.iterrows():
-                ref = str(row["Property ref"]).strip()
-                c = xml_counts.get(ref,0)
-                if c!=1:
-                    issues.append({
-                        "Property ref": ref,
-                        "Issue": "Missing" if c==0 else "Duplicate",
-                        "Property url": row.get("Property url",""),
-                        "Sale status": row.get("Sale status",""),
-                        "Date created": row.get("Date created",""),
-                        "Date edited": row.get("Date last edited","")
-                    })
-            if issues:
-                st.subheader("Excel refs missing / duplicated in XML")
-                st.dataframe(pd.DataFrame(issues))
-            else:
-                st.success("All Excel refs appear exactly once in XML")
+            with perf.run("External Ref Comparison") as run:
+                with run.stage("read excel") as stage:
+                    xls_source = upload_source(xls, "xls")
+                    df = results.get_or_compute((upload_digest(xls), "excel_refs"),
+                                                lambda: read_ref_export(xls_source))
+                    stage.items = len(df)
+                with run.stage("xml refs"):
+                    xml = results.get_or_compute((digest, "xml_refs"), lambda: (
+                        store.xml_ref_frame(digest, feed, run) if store else
+                        split_pass(source, report=False, refs=True).ref_frame() if split else
+                        xml_ref_frame(feed, run)))
+                with run.stage("join"):
+                    cmp = compare_refs(xml, df)
 
-            # XML refs not in Excel
-            missing_in_xls = [r for r in xml_refs if r not in set(xls_refs)]
-            if missing_in_xls:
-                st.subheader("XML refs absent from Excel")
-                st.write(missing_in_xls)
-            else:
-                st.success("All XML refs appear in Excel")
+                with run.stage("render"):
+                    # Issues in Excel side
+                    if len(cmp.xls_issues):
+                        st.subheader("Excel refs missing / duplicated in XML")
+                        render_findings("excel_ref_issues",
+                                        cmp.xls_issues[["Property ref","Issue","Closest XML ref(s)","Similarity",
+                                                        "Property url","Sale status",
+                                                        "Date created","Date last edited"]]
+                                        .rename(columns={"Date last edited":"Date edited"}),
+                                        owner=cmp.xls_issues)
+                    else:
+                        st.success("All Excel refs appear exactly once in XML")
+
+                    # XML refs not in Excel
+                    if len(cmp.xml_only):
+                        st.subheader("XML refs absent from Excel")
+                        render_findings("xml_refs_absent", cmp.xml_only)
+                    else:
+                        st.success("All XML refs appear in Excel")
 
         except Exception as e:
             st.error(f"❌ Comparison failed: {e}")
@@ -142,64 +147,130 @@ if action == "External Ref Comparison":
 # =============================================================================
 if action == "Convert XML ➜ Excel":
     st.header("Convert XML ➜ Excel (all requested fields)")
-    if st.button("Convert now"):
-
-        # Lookup dictionaries
-        ptype_map = {"1":"Offices","2":"Industrial","3":"Land","4":"Retail","5":"Leisure","6":"Other"}
-        status_map = {"1":"Available","2":"Under Offer","3":"Sold","4":"Withdrawn","5":"Let","6":"Unconfirmed"}
-        loc_acc_map = {"0":"Unknown","1":"Low","2":"Medium","3":"High","4":"Exact"}
-        size_type_map = {"1":"Sq Mt","2":"Sq Ft","3":"Acres","4":"Hectare"}
-        tenure_map = {"1":"Freehold","2":"Leasehold","3":"NA"}
-        sale_type_map = {"1":"For Sale","2":"To Let"}
-        gp_type_map = {"1":"Per Sq Ft","2":"Per Annum","3":"NA","4":"Per Sq M",
-                       "5":"Per Hectare","6":"Per Acre","7":"Per Month"}
-        force_map = {"1":"YES","0":"NO"}
-        desc_map = {"1":"General","2":"Location","3":"Accommodation","4":"Terms","5":"Specification"}
-        img_type_map = {"1":"Photo","2":"Artist Impression","3":"Floorplan","4":"Site Plan"}
-        doc_type_map = {"1":"PDF","2":"Word","4":"Excel"}
-        link_type_map = {"1":"Virtual Tour","2":"3d Tour","3":"Video","4":"Website"}
-
-        rows=[]
-        for p in properties:
-            d={ 'external_reference':p.findtext('external_reference',''),
-                'action'           :p.findtext('action',''),
-                'name'             :p.findtext('name','') }
-
-            # Address
-            for tag in ['address1','address2','address3','town_city','county','postcode','country']:
-                d[tag]=p.findtext(f'address/{tag}','')
-
-            # Location
-            loc=p.find('location')
-            if loc is not None:
-                d['location_accuracy']=loc_acc_map.get(loc.attrib.get('accuracy',''),'')
-                d['latitude']=loc.findtext('latitude','')
-                d['longitude']=loc.findtext('longitude','')
-            else:
-                d['location_accuracy']=d['latitude']=d['longitude']=''
-
-            # Property meta
-            d['property_type']    = ptype_map.get(p.findtext('property_type',''),'')
-            d['property_subtype'] = p.findtext('property_subtype','')
-            d['sales_status']     = status_map.get(p.findtext('sales_status',''),'')
-            # Main agent email
-            d['email']=''; 
-            for ag in p.findall('.//agents/agent'):
-                if ag.findtext('main_agent')=='1':
-                    d['email']=ag.findtext('email',''); break
-
-            # Size
-            size_elem=p.find('size')
-            d['size type']=size_type_map.get(size_elem.attrib.get('type','') if size_elem is not None else '','')
-            d['size_from']=p.findtext('size/size_from','')
-            d['size_to']  =p.findtext('size/size_to','')
-
-            # Up to two sale_basis
-            bases = p.findall('sale_basises/sale_basis') or p.findall('sale_basis')
-            for i in range(2):
-                suf=f" {i+1}"
-                if i<len(bases):
-                    sb=bases[i]
-                    d[f'tenure type{suf}']      = tenure_map.get(sb.findtext('tenure_type',''),'')
-                    d[f'sale type{suf}']        = sale_type_map.get(sb.findtext('sale_type',''),'')
-                    d[f'guide price{suf}']      = sb.findtext
+    payload_mode = st.radio("Embedded image / document data", list(PAYLOAD_MODES),
+                            format_func=PAYLOAD_MODES.get, horizontal=True)
+    formats = available_formats()
+    out_format = st.radio("Output format", formats, format_func=lambda f: FORMATS[f][0],
+                          horizontal=True) if len(formats) > 1 else "xlsx"
+    layout = st.radio("Layout", list(LAYOUTS), format_func=LAYOUTS.get, horizontal=True)
+    export_key = (digest, out_format, payload_mode, layout)
+    exported = results.get(export_key)
+    if exported is None:
+        exported = job_result(export_key)
+        if exported is not None:
+            results.put(export_key, exported, size=sum(a.size for a in exported if a))
+    if st.button("Convert now") and exported is None:
+        def convert(job, source=detached(source), mode=payload_mode, fmt=out_format,
+                    layout=layout):
+            job.total = progress_total(source)
+            with perf.run("Convert XML ➜ Excel", payloads=mode, format=fmt,
+                          layout=layout) as run, run.stage("export"):
+                return export_workbook(source, mode, recorder=run, progress=job.track, fmt=fmt,
+                                       layout=layout)
+
+        background_job(export_key, convert, "Converting", restart=True)
+    render_job(export_key)
+
+    if exported is not None:
+        converted, payload_zip = exported
+        label = FORMATS[out_format][0]
+        suffix, mime = output_type(out_format, layout)
+        with converted.open() as f:
+            st.download_button(f"⬇️ Download {label}", f, file_name=f"xml_properties{suffix}", mime=mime)
+        if payload_zip is not None:
+            with payload_zip.open() as f:
+                st.download_button("⬇️ Download embedded files (zip)", f, file_name="xml_properties_files.zip", mime=ZIP_MIME)
+        st.success(f"{label} generated with {converted.rows} rows, including all requested fields.")
+
+# =============================================================================
+# ACTION 4 · FEED DIFF AGAINST AN EARLIER SNAPSHOT
+# =============================================================================
+if action == "Feed Diff":
+    st.header("Feed Diff (previous ➜ uploaded XML)")
+    prev_file = st.file_uploader("Upload the previous XML", type=UPLOAD_TYPES, key="prev_xml")
+    if prev_file:
+        try:
+            prev_source, prev_digest = feed_upload(prev_file, "prev_member")
+            diff_key = (prev_digest, digest, "diff")
+            with perf.run("Feed Diff") as run:
+                with run.stage("diff"):
+                    diff = results.get_or_compute(diff_key, lambda: diff_feeds(prev_source, source,
+                                                                               recorder=run))
+                with run.stage("render"):
+                    render_diff(diff)
+            if len(diff.rows) or len(diff.removed):
+                changed_xlsx = results.get((*diff_key, "xlsx"))
+                if changed_xlsx is None:
+                    changed_xlsx = export_diff(diff)
+                    results.put((*diff_key, "xlsx"), changed_xlsx, size=changed_xlsx.size)
+                with changed_xlsx.open() as f:
+                    st.download_button("⬇️ Download changed rows", f,
+                                       file_name="xml_properties_changes.xlsx", mime=XLSX_MIME)
+        except Exception as e:
+            st.error(f"❌ Diff failed: {e}")
+
+# =============================================================================
+# ACTION 5 · RECONCILE MANY FEEDS AGAINST ONE MASTER EXPORT
+# =============================================================================
+if action == "Reconcile Feeds":
+    st.header("Reconcile Feeds (every feed ➜ one master Excel)")
+    more = st.file_uploader("Upload further XML feeds", type=UPLOAD_TYPES, key="more_xml",
+                            accept_multiple_files=True)
+    master_file = st.file_uploader("Upload the master Excel (or CSV)", type=["xls","xlsx","csv"],
+                                   key="master_xls")
+    if master_file:
+        uploads = {"xml_member": xml_file, **{f"more_xml_{i}": u for i, u in enumerate(more or [])}}
+        feeds = []
+        for slot, u in uploads.items():
+            u_source = upload_source(u, slot)
+            feeds += [(f"{u.name}:{s.name}" if s is not u_source else u.name, s)
+                      for s in expand_archive(u_source)]
+        master_source = upload_source(master_file, "master_xls")
+        rec_key = (upload_digest(master_file), *(upload_digest(u) for u in uploads.values()), "reconcile")
+        rec = results.get(rec_key)
+        if rec is None:
+            rec = job_result(rec_key)
+            if rec is not None:
+                results.put(rec_key, rec)
+
+        if rec is None:
+            def run_reconcile(job, master_source=detached(master_source),
+                              feeds=[(name, detached(s)) for name, s in feeds]):
+                with perf.run("Reconcile Feeds", feeds=len(feeds)) as run:
+                    with run.stage("read master") as stage:
+                        master = read_ref_export(master_source, master_file.name)
+                        stage.items = len(master)
+                    with run.stage("count feeds", jobs=SPLIT_JOBS) as stage:
+                        job.unit, job.total = "feeds", len(feeds)
+                        counts = []     # (name, refs): uploads may share a file name
+                        found = count_feeds([s for _, s in feeds], jobs=SPLIT_JOBS, mp_context=SPLIT_CONTEXT)
+                        for (name, _), (_, refs, error) in zip(feeds, found):
+                            if error is not None:
+                                raise ValueError(f"{name}: {error}")
+                            counts.append((name, refs))
+                            job.advance(1)
+                        stage.items = sum(sum(refs.values()) for _, refs in counts)     # one ref per property
+                    with run.stage("reconcile"):
+                        return reconcile(master, counts)
+
+            background_job(rec_key, run_reconcile, "Reconciling", restart=True)
+            render_job(rec_key)
+        else:
+            summary = rec.summary()
+            st.success(f"{summary['refs']} refs across {summary['feeds']} feeds: {summary['ok']} ok")
+            st.dataframe(rec.per_feed, hide_index=True)
+            st.subheader("Refs missing, duplicated or in several feeds")
+            render_findings("reconcile_issues", rec.issues(), empty="Every ref is in the master and exactly one feed")
+            rec_xlsx = results.get((*rec_key, "xlsx"))
+            if rec_xlsx is None:
+                rec_xlsx = export_reconciliation(rec)
+                results.put((*rec_key, "xlsx"), rec_xlsx, size=rec_xlsx.size)
+            with rec_xlsx.open() as f:
+                st.download_button("⬇️ Download reconciliation", f, file_name="reconcile.xlsx",
+                                   mime=XLSX_MIME)
+
+# ────────────────────────────────────────────────────────────────────────────
+# 6 · PERFORMANCE PANEL (stage timings of this session's recent runs)
+# ────────────────────────────────────────────────────────────────────────────
+perf.render()
+rerun_while_busy()     # keeps progress bars moving while background jobs run
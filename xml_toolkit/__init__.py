@@ -0,0 +1,11 @@
+"""Shared core of the XML Property Toolkit Streamlit pages and CLI."""
+
+from .backends import BACKENDS
+from .batch import process_feed, run_batch
+from .diff import diff_feeds
+from .feed import Feed
+from .parallel import parallel_pass
+from .report import Report, ReportBuilder, build_report
+
+__all__ = ["BACKENDS", "Feed", "Report", "ReportBuilder", "build_report", "diff_feeds",
+           "parallel_pass", "process_feed", "run_batch"]
@@ -0,0 +1,96 @@
+"""XML parser backends for `Feed`.
+
+`stdlib` is `xml.etree.ElementTree.iterparse`, always available. `lxml`
+parses with libxml2, filters iterparse events down to the tags `Feed` acts
+on and answers path lookups with precompiled XPath; it is used when lxml is
+installed. Both yield elements with the same ElementTree API and produce the
+same results.
+
+The backend is chosen per `Feed` ("auto", "stdlib" or "lxml"), defaulting to
+the `XML_TOOLKIT_PARSER` environment variable. Asking for lxml without it
+installed falls back to the stdlib backend with a warning.
+"""
+
+import os
+import warnings
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:     # optional: pip install lxml
+    lxml_etree = None
+
+BACKENDS = ("auto", "stdlib", "lxml")
+DEFAULT_BACKEND = os.environ.get("XML_TOOLKIT_PARSER", "auto")
+
+
+class StdlibBackend:
+    name = "stdlib"
+
+    def properties(self, src, feed):
+        """Yield each `<property>` of `src`, recording root-level agents on `feed`."""
+        stack = []
+        for event, elem in ET.iterparse(src, events=("start", "end")):
+            if event == "start":
+                if elem.tag == "agents" and len(stack) == 1:
+                    feed.agents = []
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag == "property":
+                feed.count += 1
+                yield elem
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+            elif elem.tag == "agent" and len(stack) == 2 and stack[1].tag == "agents":
+                feed.agents.append(elem)
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def properties(self, src, feed):
+        # Only <property> and <agents> ends are reported; comments and PIs are
+        # dropped as ElementTree does, and only internal entities are expanded.
+        events = lxml_etree.iterparse(src, events=("end",), tag=("property", "agents"),
+                                      remove_comments=True, remove_pis=True,
+                                      resolve_entities="internal", huge_tree=True)
+        for _, elem in events:
+            parent = elem.getparent()
+            if elem.tag == "property":
+                feed.count += 1
+                yield elem
+                elem.clear()
+                if parent is not None:
+                    parent.remove(elem)
+            elif parent is not None and parent.getparent() is None:
+                feed.agents = [a for a in elem if a.tag == "agent"]
+
+
+def get_backend(name=None):
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown parser backend {name!r} (expected one of {', '.join(BACKENDS)})")
+    if name == "stdlib":
+        return StdlibBackend()
+    if lxml_etree is None:
+        if name == "lxml":
+            warnings.warn("lxml is not installed; using the stdlib XML parser", RuntimeWarning)
+        return StdlibBackend()
+    return LxmlBackend()
+
+
+def findtext(path):
+    """Precompiled `elem.findtext(path)` that works on elements from either backend."""
+    if lxml_etree is None:
+        return lambda elem: elem.findtext(path)
+    first = lxml_etree.XPath(f"({path})[1]")
+    lxml_element = lxml_etree._Element
+
+    def text(elem):
+        if isinstance(elem, lxml_element):
+            found = first(elem)
+            return (found[0].text or "") if found else None
+        return elem.findtext(path)
+    return text
@@ -0,0 +1,204 @@
+"""Headless processing of whole feeds, one at a time or a directory in parallel.
+
+`process_feed` runs every requested action (report, comparison, conversion)
+in a single streamed pass over one feed and writes its outputs next to each
+other: `<stem>.report.json`, `<stem>.xlsx`, `<stem>.compare.xlsx` and, when
+payloads are extracted, `<stem>_files.zip`. `run_batch` fans a list of feeds
+out over a `ProcessPoolExecutor`; a single huge feed can instead be split
+across processes with `split`. Feeds of a batch that share a stem
+("feed.xml", "feed.xml.gz") keep their compression suffix in it (`feed_stems`).
+"""
+
+import json
+import os
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .compare import XML_REF_COLUMNS, compare_refs, xml_ref_row
+from .compression import COMPRESSED_SUFFIXES, ArchiveMember, compression, expand_archive
+from .export import FORMATS, table_path, write_rows, write_tables
+from .feed import Feed
+from .fields import NORMALIZED_TABLES, normalized, plan
+from .parallel import parallel_pass
+from .payloads import PayloadSink
+from .perf import Run
+from .report import ReportBuilder
+
+FEED_SUFFIXES = (".xml", *(".xml" + s for s in COMPRESSED_SUFFIXES), *COMPRESSED_SUFFIXES)
+
+
+def expand_feeds(paths):
+    """Files as given; directories expanded to the feeds they contain (sorted).
+
+    A zip holding several feeds is expanded to one `ArchiveMember` per feed.
+    """
+    out = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            found = sorted(f for f in p.iterdir() if f.name.lower().endswith(FEED_SUFFIXES))
+        else:
+            found = [p]
+        for f in found:
+            out.extend(expand_archive(f) if f.is_file() else [f])
+    return out
+
+
+def feed_stem(path, keep_compression=False):
+    """File name of `path` without its feed suffix; with `keep_compression`, "feed.xml.gz" gives "feed.gz"."""
+    if isinstance(path, ArchiveMember):
+        return f"{feed_stem(path.archive, keep_compression)}-{feed_stem(path.name, keep_compression)}"
+    name = Path(path).name
+    for suffix in FEED_SUFFIXES:
+        if name.lower().endswith(suffix):
+            stem, suffix = name[:-len(suffix)], name[-len(suffix):]
+            if keep_compression and suffix.lower() != ".xml":
+                stem += suffix[4:] if suffix.lower().startswith(".xml") else suffix
+            return stem
+    return Path(name).stem
+
+
+def feed_stems(paths):
+    """`feed_stem` of each of `paths`, distinct so that their outputs don't overwrite each other.
+
+    Feeds differing only in compression keep its suffix; raises ValueError
+    for feeds whose names are still the same (e.g. one name in two directories).
+    """
+    stems = [feed_stem(p) for p in paths]
+    shared = Counter(stems)
+    stems = [feed_stem(p, keep_compression=True) if shared[s] > 1 else s for p, s in zip(paths, stems)]
+    shared = Counter(stems)
+    clashes = [str(p) for p, s in zip(paths, stems) if shared[s] > 1]
+    if clashes:
+        raise ValueError(f"feeds would overwrite each other's outputs: {', '.join(clashes)}")
+    return stems
+
+
+def process_feed(path, out_dir, report=True, convert=True, excel=None, payloads="summary",
+                 split=1, backend=None, perf_log=None, formats=("xlsx",), layout="flat", stem=None):
+    """Run the requested actions over `path` in one pass; returns a summary dict.
+
+    `excel` is a DataFrame with a "Property ref" column to compare against.
+    With `split` > 1 the feed itself is parsed by that many processes
+    (see `parallel_pass`; compressed feeds are always read in one stream).
+    `path` may also be an `ArchiveMember`. `backend` picks the XML parser. Stage timings are
+    appended to `perf_log` (default: `perf.LOG_PATH`) as JSON lines.
+    The conversion writes every one of `formats` (see `export.FORMATS`), in
+    the flat or normalized `layout` (see `export.LAYOUTS`). Output names
+    start with `stem` (default: `feed_stem(path)`).
+    """
+    with Run("batch", feed=str(path), log_path=perf_log) as run:
+        return _process(run, path, out_dir, report, convert, excel, payloads, split, backend,
+                        formats, layout, stem or feed_stem(path))
+
+
+def _process(run, path, out_dir, report, convert, excel, payloads, split, backend, formats, layout,
+             stem):
+    started = time.perf_counter()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    result = {"feed": str(path)}
+    outputs = {fmt: out_dir / f"{stem}{FORMATS[fmt][1]}" for fmt in formats}
+    write_stage = "write workbook" if "xlsx" in outputs else "write rows"
+    extract, write = ((normalized.record, write_tables) if layout == "normalized"
+                      else (plan.row, write_rows))
+
+    if split > 1 and compression(path) is not None:
+        split = 1       # byte ranges need the plain XML on disk; decompress in one stream instead
+        result["split"] = "ignored for a compressed feed"
+    if split > 1:
+        with run.stage("parallel pass", jobs=split):
+            done = parallel_pass(path, split, report=report, rows=convert, refs=excel is not None,
+                                 payloads=payloads, backend=backend, layout=layout)
+        try:
+            if convert:
+                with run.stage(write_stage):
+                    write(done.rows(), outputs)
+        finally:
+            done.discard()
+        count, refs = done.count, done.refs
+        finished = done.report() if report else None
+    else:
+        zip_path = out_dir / f"{stem}_files.zip" if convert and payloads == "zip" else None
+        sink = None if payloads == "inline" else PayloadSink(zip_path)
+        feed = Feed(path, payloads=sink, backend=backend)
+        builder = ReportBuilder() if report else None
+        refs = [] if excel is not None else None
+
+        def properties():
+            for p in run.timed("parse", feed):
+                if builder is not None:
+                    builder.add(p)
+                if refs is not None:
+                    refs.append(xml_ref_row(p))
+                yield p
+
+        with run.stage(write_stage if convert else "pass"):
+            if convert:
+                write(run.timed("extract rows", (extract(p) for p in properties())), outputs)
+                if zip_path:
+                    result["payload_zip"] = str(zip_path)
+            else:
+                for _ in properties():
+                    pass
+        count = feed.count
+        finished = builder.finish(feed.agents) if builder is not None else None
+
+    if convert:
+        for fmt, out_path in outputs.items():
+            result["workbook" if fmt == "xlsx" else fmt] = str(out_path)
+            if layout == "normalized" and fmt != "xlsx":
+                result.setdefault("tables", []).extend(
+                    table_path(str(out_path), t) for t in list(NORMALIZED_TABLES)[1:])
+    result["properties"] = count
+    if finished is not None:
+        result["report"] = finished.to_dict()
+    if refs is not None:
+        with run.stage("compare"):
+            cmp = compare_refs(pd.DataFrame(refs, columns=XML_REF_COLUMNS), excel)
+            compare_path = out_dir / f"{stem}.compare.xlsx"
+            cmp.to_excel(compare_path)
+        result["comparison"] = dict(cmp.summary(), workbook=str(compare_path))
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    json_path = out_dir / f"{stem}.report.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False, default=str)
+    result["json"] = str(json_path)
+    return result
+
+
+def _safe_process(path, *args, **kwargs):
+    try:
+        return process_feed(path, *args, **kwargs)
+    except Exception as e:
+        return {"feed": str(path), "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc()}
+
+
+def run_batch(paths, out_dir, jobs=None, **options):
+    """Process feeds across `jobs` worker processes; yields summaries as they finish.
+
+    Failures are reported as {"feed", "error", "traceback"} rather than raised,
+    so one bad feed doesn't stop the batch. Feeds split across processes
+    (`split` > 1) are run one after another. Raises ValueError before any
+    feed is processed when two feeds would write the same outputs (see `feed_stems`).
+    """
+    paths = list(paths)
+    stems = feed_stems(paths)
+    if options.get("split", 1) > 1:
+        jobs = 1
+    jobs = jobs or min(len(paths), os.cpu_count() or 1)
+    if jobs <= 1 or len(paths) <= 1:
+        for p, stem in zip(paths, stems):
+            yield _safe_process(p, out_dir, stem=stem, **options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_safe_process, p, out_dir, stem=stem, **options)
+                   for p, stem in zip(paths, stems)]
+        for fut in futures:
+            yield fut.result()
@@ -0,0 +1,146 @@
+"""Benchmark harness: wall time, peak RSS and rows/sec per action and feed size.
+
+Each (action, size) runs in a fresh interpreter so peak RSS belongs to that
+action alone. Feeds come from `synthetic` and are cached in the data directory
+between runs. Results are saved as JSON; `compare_results` lines up two result
+files (e.g. before/after a change).
+
+    python -m xml_toolkit bench --sizes 1000,10000 --out before.json
+    python -m xml_toolkit bench --sizes 1000,10000 --out after.json --against before.json
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ACTIONS = ("parse", "report", "compare", "convert")
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DATA_DIR = Path(tempfile.gettempdir()) / "xml_toolkit_bench"
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:     # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _run_action(action, feed_path, excel_path, parser):
+    from .compare import compare_refs, read_ref_export, xml_ref_frame
+    from .export import export_workbook
+    from .feed import Feed
+    from .payloads import PayloadSink
+    from .report import build_report
+
+    feed = Feed(feed_path, payloads=PayloadSink(), backend=parser)
+    if action == "parse":
+        for _ in feed:
+            pass
+    elif action == "report":
+        build_report(feed)
+    elif action == "compare":
+        compare_refs(xml_ref_frame(feed), read_ref_export(excel_path))
+    elif action in ("convert", "parquet"):      # parquet needs pyarrow, so it is not a default action
+        out, _ = export_workbook(feed_path, backend=parser, fmt="parquet" if action == "parquet" else "xlsx")
+        return out.rows
+    else:
+        raise ValueError(f"unknown action {action!r}")
+    return feed.count
+
+
+def _child(action, feed_path, excel_path, parser):
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    rows = _run_action(action, feed_path, excel_path, parser)
+    seconds = time.perf_counter() - started
+    print(json.dumps({"seconds": round(seconds, 4), "rows": rows,
+                      "peak_rss_mb": _peak_rss_mb(), "baseline_rss_mb": baseline}))
+
+
+def dataset(size, data_dir=DATA_DIR, dup_rate=0.01, blob_rate=0.0, blob_bytes=50_000, seed=0):
+    """(feed path, excel path) for a synthetic feed, generated on first use."""
+    from .synthetic import write_excel, write_feed
+
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"feed_{size}_d{dup_rate}_b{blob_rate}x{blob_bytes}_s{seed}"
+    feed_path, excel_path = data_dir / f"{stem}.xml", data_dir / f"{stem}.xlsx"
+    if not (feed_path.exists() and excel_path.exists()):
+        tmp = data_dir / f"{stem}.xml.part"
+        refs = write_feed(tmp, size, dup_rate=dup_rate, blob_rate=blob_rate,
+                          blob_bytes=blob_bytes, seed=seed)
+        write_excel(excel_path, refs, seed=seed)
+        os.replace(tmp, feed_path)
+    return feed_path, excel_path
+
+
+def _version():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                             text=True, cwd=Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes=SIZES, actions=ACTIONS, repeat=1, parser=None, data_dir=DATA_DIR, log=None, **data):
+    """Benchmark every action at every size; returns the result document."""
+    from .backends import get_backend
+
+    root = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    results = []
+    for size in sizes:
+        feed_path, excel_path = dataset(size, data_dir, **data)
+        for action in actions:
+            runs = []
+            for _ in range(repeat):
+                cmd = [sys.executable, "-m", "xml_toolkit.bench", action, str(feed_path),
+                       str(excel_path), parser or ""]
+                out = subprocess.run(cmd, capture_output=True, text=True, env=env)
+                if out.returncode:
+                    raise RuntimeError(f"{action} @ {size} failed:\n{out.stderr}")
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            best = min(runs, key=lambda r: r["seconds"])
+            entry = dict(best, action=action, size=size,
+                         feed_mb=round(feed_path.stat().st_size / 1e6, 1),
+                         rows_per_sec=round(best["rows"] / best["seconds"]) if best["seconds"] else None,
+                         runs=[r["seconds"] for r in runs])
+            results.append(entry)
+            if log:
+                log(entry)
+    return {
+        "version": _version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parser": get_backend(parser).name,
+        "dataset": dict(data),
+        "results": results,
+    }
+
+
+def compare_results(old, new):
+    """Rows of (action, size, old s, new s, speed-up, old MB, new MB) for entries in both."""
+    before = {(r["action"], r["size"]): r for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        o = before.get((r["action"], r["size"]))
+        if o:
+            rows.append((r["action"], r["size"], o["seconds"], r["seconds"],
+                         round(o["seconds"] / r["seconds"], 2) if r["seconds"] else None,
+                         o["peak_rss_mb"], r["peak_rss_mb"]))
+    return rows
+
+
+if __name__ == "__main__":
+    _child(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4] or None)
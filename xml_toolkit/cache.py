@@ -0,0 +1,113 @@
+"""Process-wide result cache keyed by upload content hash.
+
+Streamlit re-runs the page script on every widget interaction, but imported
+modules stay loaded, so `results` outlives reruns (and is shared between
+sessions, which is fine: keys are content hashes). Entries are evicted least
+recently used first once their total size passes the memory cap.
+"""
+
+import dataclasses
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import pandas as pd
+
+CACHE_MB = int(os.environ.get("XML_TOOLKIT_CACHE_MB", "512"))
+_SAMPLE = 100       # items measured per list / set / dict; the rest are assumed to be alike
+
+
+def content_hash(fileobj, chunk_size=1 << 20):
+    """sha256 hex digest of a file object, or of a path on disk."""
+    h = hashlib.sha256()
+    if isinstance(fileobj, (str, os.PathLike)):
+        with open(fileobj, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    pos = fileobj.tell()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        h.update(chunk)
+    fileobj.seek(pos)
+    return h.hexdigest()
+
+
+def sizeof(value):
+    """Approximate retained size of a cached value in bytes, without serializing it.
+
+    DataFrames and Series report their own deep memory usage, dataclasses
+    (e.g. `diff.FeedDiff`) are the sum of their fields, and lists, sets and
+    dicts are estimated from a sample of their items.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(sizeof(getattr(value, f.name)) for f in dataclasses.fields(value))
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        sample = list(islice(value.items() if isinstance(value, dict) else value, _SAMPLE))
+        items = sum(map(sizeof, sample)) * len(value) // len(sample) if sample else 0
+        return sys.getsizeof(value) + items
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU mapping with a total size cap in bytes."""
+
+    def __init__(self, max_bytes=CACHE_MB << 20):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def put(self, key, value, size=None):
+        size = sizeof(value) if size is None else size
+        with self._lock:
+            if key in self._data:
+                self.used -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._data[key] = (value, size)
+            self.used += size
+            while self.used > self.max_bytes:
+                _, (_, old) = self._data.popitem(last=False)
+                self.used -= old
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for `key`, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, compute())
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.used = 0
+
+
+_MISSING = object()
+
+results = ResultCache()
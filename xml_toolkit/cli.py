@@ -0,0 +1,277 @@
+"""Command-line entry point: `python -m xml_toolkit <command> FEED...`.
+
+    report   write <stem>.report.json for each feed
+    convert  write <stem>.xlsx (plus <stem>_files.zip with --payloads zip), or
+             <stem>.parquet / <stem>.arrow with --format
+    compare  compare each feed's refs against --excel
+    batch    all of the above in one pass per feed (compare only with --excel)
+    diff     added / changed / removed properties between two snapshots of a feed
+    reconcile
+             every feed against one --excel master: a ref × feed matrix in reconcile.xlsx
+    index    load feeds into a persistent SQLite store (--store), optionally looking up --ref
+
+    synth    write a synthetic feed (and matching Excel export)
+    bench    time every action on synthetic feeds of several sizes
+
+FEED arguments may be files or directories of .xml files. Feeds are spread
+over --jobs worker processes; --split N instead parses each feed with N
+processes, for single feeds too big for one core.
+
+Compressed feeds (.xml.gz, .xml.bz2, .xml.xz) and .zip archives are read as
+they decompress; each feed of a zip holding several is processed in turn.
+
+The report checks pins against postcodes when XML_TOOLKIT_POSTCODES names a
+postcode centroid CSV (see `synth --postcodes` for a synthetic one).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from . import bench, synthetic
+from .backends import BACKENDS, DEFAULT_BACKEND
+from .batch import expand_feeds, feed_stem, feed_stems, run_batch
+from .compare import read_ref_export
+from .compression import source_digest
+from .diff import diff_feeds
+from .export import FORMATS, LAYOUTS, PAYLOAD_MODES
+from .reconcile import count_feeds, reconcile
+from .store import STORE_PATH, FeedStore
+
+ACTIONS = {
+    "report": dict(report=True, convert=False),
+    "convert": dict(report=False, convert=True),
+    "compare": dict(report=False, convert=False),
+    "batch": dict(report=True, convert=True),
+}
+
+
+def read_excel(path):
+    try:
+        return read_ref_export(path)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="python -m xml_toolkit", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ACTIONS:
+        p = sub.add_parser(name)
+        p.add_argument("feeds", nargs="+", metavar="FEED")
+        p.add_argument("-o", "--out", default=".", help="output directory (default: .)")
+        p.add_argument("-j", "--jobs", type=int, default=None,
+                       help="worker processes (default: one per CPU)")
+        p.add_argument("--split", type=int, default=1, metavar="N",
+                       help="parse each feed with N processes (zip payloads unsupported)")
+        p.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND,
+                       help="XML parser backend (default: %(default)s; auto = lxml if installed)")
+        p.add_argument("--excel", required=name == "compare",
+                       help="spreadsheet (.xlsx, .xls or .csv) with a 'Property ref' column to compare against")
+        p.add_argument("--perf-log", metavar="PATH",
+                       help="append per-stage timings as JSON lines (default: $XML_TOOLKIT_PERF_LOG)")
+        if name in ("convert", "batch"):
+            p.add_argument("--payloads", choices=list(PAYLOAD_MODES), default="summary",
+                           help="inline base64 handling (default: summary)")
+            p.add_argument("--format", dest="formats", action="append", choices=list(FORMATS),
+                           help="output format, repeatable (default: xlsx; parquet and arrow need pyarrow)")
+            p.add_argument("--layout", choices=list(LAYOUTS), default="flat",
+                           help="normalized: child tables (sale bases, images, documents, links, "
+                                "descriptions, agents) as extra sheets / files (default: flat)")
+
+    p = sub.add_parser("diff")
+    p.add_argument("previous", help="earlier snapshot of the feed")
+    p.add_argument("current", help="latest snapshot of the feed")
+    p.add_argument("-o", "--out", default=".", help="output directory (default: .)")
+    p.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND)
+
+    p = sub.add_parser("reconcile")
+    p.add_argument("feeds", nargs="+", metavar="FEED")
+    p.add_argument("--excel", required=True,
+                   help="master spreadsheet (.xlsx, .xls or .csv) with a 'Property ref' column")
+    p.add_argument("-o", "--out", default=".", help="output directory (default: .)")
+    p.add_argument("-j", "--jobs", type=int, default=None,
+                   help="worker processes (default: one per CPU)")
+    p.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND)
+
+    p = sub.add_parser("index")
+    p.add_argument("feeds", nargs="+", metavar="FEED")
+    p.add_argument("--store", default=STORE_PATH, required=not STORE_PATH,
+                   help="SQLite database file (default: $XML_TOOLKIT_STORE)")
+    p.add_argument("--ref", action="append", default=[], help="print the stored rows of this ref")
+    p.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND)
+
+    p = sub.add_parser("synth")
+    p.add_argument("out", help="feed to write")
+    p.add_argument("-n", "--count", type=int, default=1000)
+    p.add_argument("--excel", help="also write a matching 'Property ref' export here")
+    p.add_argument("--postcodes", help="also write a postcode centroid CSV for XML_TOOLKIT_POSTCODES here")
+    _dataset_args(p)
+
+    p = sub.add_parser("bench")
+    p.add_argument("--sizes", default=",".join(map(str, bench.SIZES)),
+                   help="comma-separated property counts (default: %(default)s)")
+    p.add_argument("--actions", default=",".join(bench.ACTIONS),
+                   help="comma-separated actions (default: %(default)s)")
+    p.add_argument("--repeat", type=int, default=1, help="runs per action; the fastest is kept")
+    p.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND)
+    p.add_argument("--data", default=bench.DATA_DIR, help="where generated feeds are cached")
+    p.add_argument("--out", default="bench.json", help="results file (default: %(default)s)")
+    p.add_argument("--against", help="earlier results file to compare with")
+    _dataset_args(p)
+    return parser
+
+
+def _dataset_args(p):
+    p.add_argument("--dup-rate", type=float, default=0.01, help="share of repeated refs")
+    p.add_argument("--blob-rate", type=float, default=0.0,
+                   help="share of images with inline base64 data")
+    p.add_argument("--blob-bytes", type=int, default=50_000, help="size of each inline payload")
+    p.add_argument("--seed", type=int, default=0)
+
+
+def _synth(args):
+    refs = synthetic.write_feed(args.out, args.count, dup_rate=args.dup_rate,
+                                blob_rate=args.blob_rate, blob_bytes=args.blob_bytes,
+                                seed=args.seed)
+    print(f"✓ {args.out}: {len(refs)} properties")
+    if args.excel:
+        rows = synthetic.write_excel(args.excel, refs, seed=args.seed)
+        print(f"✓ {args.excel}: {rows} rows")
+    if args.postcodes:
+        rows = synthetic.write_postcodes(args.postcodes)
+        print(f"✓ {args.postcodes}: {rows} postcodes")
+    return 0
+
+
+def _diff(args):
+    try:
+        diff = diff_feeds(args.previous, args.current, backend=args.parser)
+    except ValueError as e:     # e.g. a zip holding several feeds
+        raise SystemExit(str(e))
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    stem = feed_stem(args.current)
+    xlsx_path, json_path = out / f"{stem}.diff.xlsx", out / f"{stem}.diff.json"
+    diff.to_excel(xlsx_path)
+    summary = diff.summary()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(dict(summary, previous=args.previous, current=args.current,
+                       fields=diff.fields.to_dict("records")),
+                  f, indent=2, ensure_ascii=False, default=str)
+    print(f"✓ {args.current}: {summary['added']} added, {summary['changed']} changed, "
+          f"{summary['removed']} removed, {summary['unchanged']} unchanged → {xlsx_path}, {json_path}")
+    return 0
+
+
+def _reconcile(args):
+    master = read_excel(args.excel)
+    feeds = expand_feeds(args.feeds)
+    if not feeds:
+        print("no feeds found", file=sys.stderr)
+        return 2
+    try:
+        stems = feed_stems(feeds)
+    except ValueError as e:     # two feeds would share a column
+        raise SystemExit(str(e))
+    counts, errors = {}, {}
+    results = count_feeds(feeds, jobs=args.jobs, backend=args.parser)
+    for stem, (path, found, error) in zip(stems, results):
+        if error is not None:
+            errors[str(path)] = error
+            print(f"✗ {path}: {error}", file=sys.stderr)
+            continue
+        counts[stem] = found
+        print(f"✓ {path}: {sum(found.values())} properties, {len(found)} refs")
+    result = reconcile(master, counts)
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    xlsx_path, json_path = out / "reconcile.xlsx", out / "reconcile.json"
+    result.to_excel(xlsx_path)
+    summary = result.summary()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(dict(summary, master=args.excel, feeds=result.per_feed.to_dict("records"), errors=errors),
+                  f, indent=2, ensure_ascii=False, default=str)
+    print(f"✓ {summary['refs']} refs across {summary['feeds']} feeds: {summary['ok']} ok, "
+          f"{summary['missing_from_feeds']} missing from feeds, {summary['not_in_master']} not in master, "
+          f"{summary['duplicate']} duplicated, {summary['in_multiple_feeds']} in several feeds "
+          f"→ {xlsx_path}, {json_path}")
+    return 1 if errors else 0
+
+
+def _index(args):
+    store = FeedStore(args.store)
+    for path in expand_feeds(args.feeds):
+        digest = source_digest(path)
+        known = store.has(digest)
+        count = store.ingest(digest, store.feed(path, backend=args.parser))
+        print(f"✓ {path}: {count} properties {'already stored' if known else 'stored'} as {digest[:16]}")
+        for ref in args.ref:
+            for row in store.lookup(digest, ref).to_dict("records"):
+                print(json.dumps(row, ensure_ascii=False, default=str))
+    return 0
+
+
+def _bench(args):
+    def log(r):
+        print(f"{r['action']:>8} {r['size']:>9}  {r['seconds']:9.3f}s  {r['rows_per_sec'] or 0:>9} rows/s"
+              f"  {r['peak_rss_mb']} MB")
+
+    result = bench.run(sizes=[int(s) for s in args.sizes.split(",")],
+                       actions=args.actions.split(","), repeat=args.repeat, parser=args.parser,
+                       data_dir=args.data, log=log, dup_rate=args.dup_rate,
+                       blob_rate=args.blob_rate, blob_bytes=args.blob_bytes, seed=args.seed)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"✓ results → {args.out}")
+    if args.against:
+        with open(args.against, encoding="utf-8") as f:
+            old = json.load(f)
+        for action, size, before, after, speedup, old_mb, new_mb in bench.compare_results(old, result):
+            print(f"{action:>8} {size:>9}  {before:9.3f}s → {after:9.3f}s  ×{speedup}"
+                  f"  {old_mb} → {new_mb} MB")
+    return 0
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    if args.command == "synth":
+        return _synth(args)
+    if args.command == "bench":
+        return _bench(args)
+    if args.command == "diff":
+        return _diff(args)
+    if args.command == "index":
+        return _index(args)
+    if args.command == "reconcile":
+        return _reconcile(args)
+    feeds = expand_feeds(args.feeds)
+    if not feeds:
+        print("no feeds found", file=sys.stderr)
+        return 2
+    try:
+        feed_stems(feeds)
+    except ValueError as e:     # two feeds would write the same outputs
+        raise SystemExit(str(e))
+    options = dict(ACTIONS[args.command], payloads=getattr(args, "payloads", "summary"),
+                   split=args.split, backend=args.parser, perf_log=args.perf_log,
+                   formats=getattr(args, "formats", None) or ("xlsx",),
+                   layout=getattr(args, "layout", "flat"))
+    if args.excel:
+        options["excel"] = read_excel(args.excel)
+
+    failed = 0
+    for result in run_batch(feeds, args.out, jobs=args.jobs, **options):
+        if "error" in result:
+            failed += 1
+            print(f"✗ {result['feed']}: {result['error']}", file=sys.stderr)
+            continue
+        outputs = [result[k] for k in ("json", "workbook", "parquet", "arrow", "payload_zip") if k in result]
+        outputs.extend(result.get("tables", ()))
+        if "comparison" in result:
+            outputs.append(result["comparison"]["workbook"])
+        print(f"✓ {result['feed']}: {result['properties']} properties in {result['seconds']}s "
+              f"→ {', '.join(outputs)}")
+    return 1 if failed else 0
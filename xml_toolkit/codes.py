@@ -0,0 +1,59 @@
+"""Code → label lookups used by the feed schema."""
+
+status_map = {"1": "Available", "2": "Under Offer", "3": "Sold",
+              "4": "Withdrawn", "5": "Let", "6": "Unconfirmed"}
+ptype_map = {"1": "Offices", "2": "Industrial", "3": "Land",
+             "4": "Retail", "5": "Leisure", "6": "Other"}
+loc_acc_map = {"0": "Unknown", "1": "Low", "2": "Medium", "3": "High", "4": "Exact"}
+size_type_map = {"1": "Sq Mt", "2": "Sq Ft", "3": "Acres", "4": "Hectare"}
+tenure_map = {"1": "Freehold", "2": "Leasehold", "3": "NA"}
+sale_type_map = {"1": "For Sale", "2": "To Let"}
+gp_type_map = {"1": "Per Sq Ft", "2": "Per Annum", "3": "NA", "4": "Per Sq M",
+               "5": "Per Hectare", "6": "Per Acre", "7": "Per Month"}
+force_map = {"1": "YES", "0": "NO"}
+desc_map = {"1": "General", "2": "Location", "3": "Accommodation", "4": "Terms", "5": "Specification"}
+img_type_map = {"1": "Photo", "2": "Artist Impression", "3": "Floorplan", "4": "Site Plan"}
+doc_type_map = {"1": "PDF", "2": "Word", "4": "Excel"}
+link_type_map = {"1": "Virtual Tour", "2": "3d Tour", "3": "Video", "4": "Website"}
+
+# (property_type, property_subtype) → subtype label
+prop_subtype_map = {
+    ("1", "57"): "Offices", ("1", "58"): "Business Park", ("1", "59"): "Serviced Office",
+    ("1", "60"): "Science Park", ("1", "61"): "Healthcare - Surgeries", ("1", "84"): "Traditional",
+    ("1", "85"): "Modern", ("1", "86"): "Refurbished", ("1", "87"): "Grade A", ("1", "88"): "Grade B",
+    ("1", "113"): "Design & Build", ("1", "115"): "Research & Development", ("1", "119"): "Investment",
+    ("1", "125"): "Mixed Use", ("1", "126"): "Non residential Institution", ("1", "137"): "Land/Development",
+    ("1", "139"): "Class E - incl Retail Leisure Healthcare", ("1", "140"): "Or Retail Use",
+    ("1", "141"): "With industrial", ("2", "62"): "General Industrial", ("2", "63"): "Light Industrial",
+    ("2", "64"): "Warehouse / Distribution", ("2", "65"): "Industrial Park", ("2", "66"): "Trade Park",
+    ("2", "67"): "Non Food Retail Warehouse", ("2", "68"): "Self Storage",
+    ("2", "69"): "Motor Trade - showroom/vehicle repair", ("2", "89"): "Bonded Warehouse",
+    ("2", "90"): "Warehouse", ("2", "91"): "Business Unit", ("2", "92"): "High Tech Unit",
+    ("2", "93"): "Food Production", ("2", "94"): "Lab Space", ("2", "95"): "Managed Workshop",
+    ("2", "96"): "Manufacturing/Production", ("2", "97"): "Workshop Studio", ("2", "98"): "Distribution",
+    ("2", "99"): "Yard Area", ("2", "100"): "Other Industrial", ("2", "112"): "Design & Build",
+    ("2", "116"): "Research & Development", ("2", "118"): "Investment", ("2", "124"): "Data Centres",
+    ("2", "127"): "Land/Development", ("2", "128"): "Mixed Use", ("2", "142"): "Trade Counter",
+    ("2", "143"): "Class E - incl Office Retail Leisure Healthcare", ("2", "151"): "Open Storage",
+    ("3", "101"): "Mixed Use", ("3", "102"): "Agricultural", ("3", "103"): "Serviced",
+    ("3", "104"): "Sub-Serviced", ("3", "105"): "Residential", ("3", "106"): "Science Park",
+    ("3", "107"): "Vacant Site", ("3", "108"): "Business Park",
+    ("3", "109"): "Industrial Scottish Planning use 4", ("3", "110"): "Industrial Scottish Planning use 5",
+    ("3", "111"): "Industrial Scottish Planning use 6", ("3", "114"): "Design & Build",
+    ("3", "117"): "Farm", ("3", "122"): "Investment", ("3", "129"): "Non residential Institution",
+    ("3", "130"): "Residential Institution", ("3", "152"): "Open Storage", ("3", "153"): "Development",
+    ("3", "n/a"): "exc field from xml", ("4", "70"): "General Retail", ("4", "71"): "Retail - High Street",
+    ("4", "72"): "Retail - out of town", ("4", "73"): "Shopping Centre unit",
+    ("4", "74"): "Motor Trade - filling station", ("4", "75"): "Retail Park",
+    ("4", "120"): "Investment", ("4", "131"): "Mixed Use", ("4", "132"): "Motor Trade - showroom",
+    ("4", "144"): "Class E - incl Office Leisure Healthcare", ("4", "145"): "Or Office Use",
+    ("4", "146"): "Business for sale", ("4", "154"): "Land/Development", ("5", "76"): "Hotel",
+    ("5", "77"): "General Leisure", ("5", "78"): "Restaurants / Cafes", ("5", "79"): "Pubs/Bars/Clubs",
+    ("5", "121"): "Investment", ("5", "133"): "Leisure Park", ("5", "134"): "Mixed Use",
+    ("5", "147"): "Class E - incl Office Retail Healthcare", ("5", "148"): "Business for sale",
+    ("5", "155"): "Land/Development", ("6", "80"): "Residential", ("6", "81"): "Residential Institution",
+    ("6", "82"): "Non residential Institution", ("6", "83"): "Healthcare - hospitals",
+    ("6", "123"): "Investment", ("6", "135"): "Healthcare - Consulting Rooms/Medical Offices",
+    ("6", "136"): "Mixed Use", ("6", "138"): "Healthcare - General", ("6", "149"): "Business for sale",
+    ("6", "150"): "Class E - incl Office Retail Leisure Healthcare", ("6", "156"): "Land/Development"
+}
@@ -0,0 +1,103 @@
+"""Parquet and Arrow IPC export.
+
+`ColumnarWriter` takes export rows one at a time during the streaming pass
+and writes them out every `BATCH_ROWS` rows, as one Parquet row group or one
+Arrow record batch, so only the current batch is held in memory. Columns
+holding code-map labels (`fields.CODED_COLUMNS`: property_type, sales_status,
+tenure and sale type, ...) are dictionary-encoded and load back into pandas
+as categoricals; every other column is a string (or, when listed in
+`integer`, an int32 such as a child table's item number).
+
+Needs pyarrow, which is optional: without it only the Excel export is offered.
+"""
+
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:     # optional: pip install pyarrow
+    pa = pq = None
+
+from .fields import CODED_COLUMNS, COLUMNS
+
+BATCH_ROWS = int(os.environ.get("XML_TOOLKIT_BATCH_ROWS", "50000"))
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+
+def available():
+    return pa is not None
+
+
+def _type(column, coded, integer):
+    if column in coded:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.int32() if column in integer else pa.string()
+
+
+def schema(columns=COLUMNS, coded=CODED_COLUMNS, integer=()):
+    coded, integer = set(coded), set(integer)
+    return pa.schema([(c, _type(c, coded, integer)) for c in columns])
+
+
+class ColumnarWriter:
+    """Rows written to a Parquet (`fmt="parquet"`) or Arrow IPC file (`fmt="arrow"`) in batches."""
+
+    def __init__(self, path, fmt="parquet", columns=COLUMNS, coded=CODED_COLUMNS, integer=(),
+                 batch_rows=BATCH_ROWS):
+        if pa is None:
+            raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"unknown columnar format {fmt!r}")
+        self.schema = schema(columns, coded, integer)
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._batch = []
+        # label → code per dictionary column, kept across batches: each batch's dictionary
+        # extends the previous one, which Arrow IPC files allow (as a delta) and Parquet reuses
+        self._codes = {i: {} for i, f in enumerate(self.schema) if pa.types.is_dictionary(f.type)}
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema, options=pa.ipc.IpcWriteOptions(
+                compression="zstd", emit_dictionary_deltas=True))
+
+    def write(self, row):
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        arrays = []
+        for i, (field, values) in enumerate(zip(self.schema, zip(*self._batch))):
+            codes = self._codes.get(i)
+            if codes is None:
+                arrays.append(pa.array(values, type=field.type))
+                continue
+            indices = pa.array([codes.setdefault(v, len(codes)) for v in values], type=pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(list(codes), type=pa.string())))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows += len(self._batch)
+        self._batch = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def teed(rows, writers):
+    """Pass `rows` through unchanged, handing each one to every writer on the way."""
+    for row in rows:
+        for w in writers:
+            w.write(row)
+        yield row
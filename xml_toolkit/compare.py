@@ -0,0 +1,188 @@
+"""External ref comparison between a feed and a CRM Excel export.
+
+Both sides are reduced to per-ref counts and joined once (an outer merge
+with an indicator column); every result set is then a hash lookup back into
+that join, so the cost is linear in the two inputs.
+
+`read_ref_export` loads only the `EXCEL_COLUMNS` of the export. Workbooks are
+read with calamine when python-calamine is installed, otherwise .xlsx files
+are streamed row by row through openpyxl's read-only reader over just the
+span of columns needed. CSV is accepted as a cheaper alternative.
+
+Unmatched refs on either side get the closest refs of the other side as
+suggestions (`fuzzy.RefIndex`), to catch formatting drift such as
+`ABC-123` against `ABC123`.
+"""
+
+import os
+from dataclasses import dataclass
+
+import openpyxl
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:     # optional: pip install python-calamine
+    python_calamine = None
+
+from .backends import findtext
+from .codes import status_map
+from .fuzzy import RefIndex, suggestion_columns
+
+REF_COLUMN = "Property ref"
+EXCEL_COLUMNS = ["Property url", "Property ref", "Sale status", "Date created", "Date last edited"]
+XML_REF_COLUMNS = ["ref", "sales_status"]
+_external_reference, _sales_status = findtext("external_reference"), findtext("sales_status")
+
+
+def _missing_ref(source):
+    return ValueError(f"{source}: Excel must contain '{REF_COLUMN}' column")
+
+
+def _read_xlsx(f, source):
+    wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(max_row=1, values_only=True), ())
+        found = {}
+        for i, name in enumerate(header):
+            if name in EXCEL_COLUMNS:
+                found.setdefault(name, i)
+        if REF_COLUMN not in found:
+            raise _missing_ref(source)
+        lo, hi = min(found.values()), max(found.values())
+        names = list(found)
+        picks = [found[n] - lo for n in names]
+        rows = [[row[i] if i < len(row) else None for i in picks]
+                for row in ws.iter_rows(min_row=2, min_col=lo + 1, max_col=hi + 1, values_only=True)]
+    finally:
+        wb.close()
+    while rows and all(v is None for v in rows[-1]):    # trailing blank rows, as read_excel trims
+        rows.pop()
+    return pd.DataFrame(rows, columns=names).fillna(float("nan"))
+
+
+def read_ref_export(source, name=None):
+    """The `EXCEL_COLUMNS` of a CRM export (.xlsx, .xls or .csv path or file object).
+
+    `name` gives the file name when `source` is a file object without one.
+    Columns other than those are never materialised; missing ones are blank.
+    """
+    name = str(name or getattr(source, "name", None) or source)
+    ext = os.path.splitext(name)[1].lower()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wanted = EXCEL_COLUMNS.__contains__
+    if ext == ".csv":
+        df = pd.read_csv(source, usecols=wanted, dtype={REF_COLUMN: str})
+    elif python_calamine is not None:
+        df = pd.read_excel(source, engine="calamine", usecols=wanted)
+    elif ext == ".xls":
+        df = pd.read_excel(source, usecols=wanted)
+    else:
+        df = _read_xlsx(source, name)
+    if REF_COLUMN not in df.columns:
+        raise _missing_ref(name)
+    return df.reindex(columns=EXCEL_COLUMNS)
+
+
+def xml_ref_row(p):
+    """A property's stripped ref and sales status."""
+    return (_external_reference(p) or "").strip(), (_sales_status(p) or "").strip()
+
+
+def xml_ref_frame(feed, recorder=None):
+    """One streamed pass collecting `xml_ref_row` for every property."""
+    if recorder is not None:
+        feed = recorder.timed("parse", feed)
+    return pd.DataFrame([xml_ref_row(p) for p in feed], columns=XML_REF_COLUMNS)
+
+
+@dataclass
+class Comparison:
+    xml_dups: pd.DataFrame      # ref, count – refs repeated in the XML
+    xls_dups: pd.DataFrame      # Excel rows whose ref repeats in Excel, plus "Duplicate Count"
+    xls_issues: pd.DataFrame    # Excel rows whose ref is missing from / repeated in the XML, plus "Issue"
+                                # (and "Closest XML ref(s)", "Similarity" for the missing ones)
+    xml_only: pd.DataFrame      # External Reference, Sales Status – XML refs absent from Excel
+                                # (and "Closest Excel ref(s)", "Similarity")
+    joined: pd.DataFrame        # per-ref counts: xml, xls, _merge
+
+    def summary(self):
+        return {
+            "xml_duplicates": len(self.xml_dups),
+            "excel_duplicate_rows": len(self.xls_dups),
+            "excel_missing_in_xml": int((self.xls_issues["Issue"] == "Missing").sum()),
+            "excel_duplicated_in_xml": int((self.xls_issues["Issue"] == "Duplicate").sum()),
+            "xml_missing_in_excel": len(self.xml_only),
+            "excel_missing_with_suggestion": _suggested(self.xls_issues, "XML"),
+            "xml_missing_with_suggestion": _suggested(self.xml_only, "Excel"),
+        }
+
+    def to_excel(self, path):
+        """All four result sets as sheets of one workbook."""
+        with pd.ExcelWriter(path, engine="xlsxwriter",
+                            engine_kwargs={"options": {"strings_to_urls": False}}) as xw:
+            self.xml_dups.to_excel(xw, index=False, sheet_name="XML duplicates")
+            self.xls_dups.to_excel(xw, index=False, sheet_name="Excel duplicates")
+            self.xls_issues.to_excel(xw, index=False, sheet_name="Excel not in XML")
+            self.xml_only.to_excel(xw, index=False, sheet_name="XML not in Excel")
+
+
+def _suggested(frame, side):
+    column = f"Closest {side} ref(s)"
+    return int(frame[column].fillna("").ne("").sum()) if column in frame.columns else 0
+
+
+def _suggestions(refs, candidates, side):
+    """`suggestion_columns` for `refs` against a `RefIndex` of `candidates` (built only when needed)."""
+    index = RefIndex(candidates) if len(refs) and len(candidates) else None
+    return suggestion_columns(refs, index, side)
+
+
+def compare_refs(xml, df_xls, suggest=True):
+    """Compare an `xml_ref_frame` against an Excel export holding a "Property ref" column.
+
+    With `suggest`, Excel refs missing from the XML and XML refs missing from
+    Excel get their closest near-matches from the other side.
+    """
+    if REF_COLUMN not in df_xls.columns:
+        raise ValueError(f"Excel must contain '{REF_COLUMN}' column")
+    xls = df_xls.reindex(columns=EXCEL_COLUMNS, fill_value="")
+    xls[REF_COLUMN] = df_xls[REF_COLUMN].astype(str).str.strip()
+
+    xml_counts = xml["ref"].value_counts().rename("xml")
+    xls_counts = xls[REF_COLUMN].value_counts().rename("xls")
+    joined = pd.merge(xml_counts, xls_counts, left_index=True, right_index=True,
+                      how="outer", sort=False, indicator=True)
+    joined[["xml", "xls"]] = joined[["xml", "xls"]].fillna(0).astype(int)
+
+    xml_dups = (joined.loc[joined["xml"] > 1, ["xml"]]
+                .rename(columns={"xml": "count"}).rename_axis("ref").reset_index())
+
+    in_xml = xls[REF_COLUMN].map(joined["xml"])
+    in_xls = xls[REF_COLUMN].map(joined["xls"])
+
+    xls_dups = xls[in_xls > 1].assign(**{"Duplicate Count": in_xls[in_xls > 1]})
+
+    xls_issues = xls[in_xml != 1].copy()
+    xls_issues.insert(2, "Issue", in_xml[in_xml != 1].map(lambda c: "Missing" if c == 0 else "Duplicate"))
+
+    left_only = joined.index[joined["_merge"] == "left_only"]
+    only = xml[xml["ref"].isin(left_only)]
+    xml_only = pd.DataFrame({
+        "External Reference": only["ref"],
+        "Sales Status": only["sales_status"].map(status_map).fillna("Unknown"),
+    })
+
+    if suggest:
+        missing = xls_issues["Issue"] == "Missing"
+        found = _suggestions(xls_issues.loc[missing, REF_COLUMN],
+                             joined.index[joined["xml"] > 0], "XML")
+        xls_issues = xls_issues.join(found)
+        xml_only = xml_only.join(_suggestions(xml_only["External Reference"],
+                                              joined.index[joined["xls"] > 0], "Excel"))
+
+    return Comparison(xml_dups=xml_dups, xls_dups=xls_dups.reset_index(drop=True),
+                      xls_issues=xls_issues.reset_index(drop=True),
+                      xml_only=xml_only.reset_index(drop=True), joined=joined)
@@ -0,0 +1,146 @@
+"""Compressed feeds: gzip, bzip2 and xz files and zip archives.
+
+The format is sniffed from the first bytes rather than the file name, and
+`open_xml` wraps the opened source in a decompressing reader, so the parser
+pulls decompressed XML a chunk at a time and the expanded feed is never held
+in memory or written to disk.
+
+A zip may hold several feeds. A zip with a single XML member reads as that
+member; for the others, `ArchiveMember(archive, name)` names one member and
+can be passed wherever a feed source is expected.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import zipfile
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
+from .cache import content_hash
+
+_MAGIC = [(b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"),
+          (b"PK\x03\x04", "zip"), (b"PK\x05\x06", "zip")]
+_HEAD = 6
+_STREAMS = {"gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+            "bz2": lambda f: bz2.BZ2File(f, "rb"),
+            "xz": lambda f: lzma.LZMAFile(f, "rb")}
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zip")
+UPLOAD_TYPES = ["xml", "gz", "bz2", "xz", "zip"]       # st.file_uploader extensions
+
+
+class ArchiveMember(NamedTuple):
+    """One feed inside a zip; `archive` is a path or a binary file object."""
+    archive: Any
+    name: str
+
+    def __str__(self):
+        return f"{self.archive}:{self.name}"
+
+
+class _Prefixed:
+    """A non-seekable stream with the bytes already read from it put back in front."""
+
+    def __init__(self, head, src):
+        self._head, self._src = head, src
+
+    def read(self, size=-1):
+        if not self._head:
+            return self._src.read(size)
+        if size is None or size < 0:
+            out, self._head = self._head + self._src.read(), b""
+            return out
+        out, self._head = self._head[:size], self._head[size:]
+        return out
+
+    def close(self):
+        pass
+
+
+def _sniff(src):
+    """(format or None, stream positioned at the start) of an open binary source."""
+    head = src.read(_HEAD)
+    kind = next((kind for magic, kind in _MAGIC if head.startswith(magic)), None)
+    if hasattr(src, "seek"):
+        src.seek(-len(head), 1)
+    else:
+        src = _Prefixed(head, src)
+    return kind, src
+
+
+def _is_feed(info):
+    return (not info.is_dir() and info.filename.lower().endswith(".xml")
+            and not info.filename.startswith("__MACOSX/"))
+
+
+def _zip_members(archive):
+    return [info.filename for info in archive.infolist() if _is_feed(info)]
+
+
+@contextmanager
+def _opened(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        yield source
+
+
+@contextmanager
+def open_xml(source):
+    """The decompressed XML bytes of `source` (path, binary file or `ArchiveMember`), as a stream."""
+    src, member = source if isinstance(source, ArchiveMember) else (source, None)
+    with _opened(src) as raw:
+        kind, raw = _sniff(raw)
+        if kind is None:
+            if member is not None:
+                raise ValueError(f"{src}: not a zip archive")
+            yield raw
+        elif kind == "zip":
+            with zipfile.ZipFile(raw) as archive:
+                if member is None:
+                    names = _zip_members(archive)
+                    if len(names) != 1:
+                        raise ValueError(f"{src}: zip holds {len(names)} XML feeds, expected one "
+                                         f"({', '.join(names[:5])})")
+                    member = names[0]
+                with archive.open(member) as stream:
+                    yield stream
+        else:
+            with _STREAMS[kind](raw) as stream:
+                yield stream
+
+
+def compression(source):
+    """"gzip", "bz2", "xz", "zip" or None for a plain XML `source`."""
+    if isinstance(source, ArchiveMember):
+        return "zip"
+    with _opened(source) as raw:
+        return _sniff(raw)[0]
+
+
+def xml_members(source):
+    """Names of the XML feeds in a zip `source` ([] for anything else)."""
+    if compression(source) != "zip":
+        return []
+    with _opened(source) as raw, zipfile.ZipFile(raw) as archive:
+        return _zip_members(archive)
+
+
+def expand_archive(source):
+    """`source` itself, or one `ArchiveMember` per feed of a zip holding several."""
+    names = xml_members(source)
+    if len(names) > 1:
+        return [ArchiveMember(source, name) for name in names]
+    return [source]
+
+
+def source_digest(source):
+    """`content_hash` of a feed source; a member's digest also names the member."""
+    if isinstance(source, ArchiveMember):
+        return f"{content_hash(source.archive)}:{source.name}"
+    return content_hash(source)
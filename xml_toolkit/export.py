@@ -0,0 +1,290 @@
+"""Streaming workbook export.
+
+Rows go straight to xlsxwriter in `constant_memory` mode as each property is
+extracted, so only the current row is held in memory and the workbook is
+spooled to a temp file rather than an in-memory buffer. The same rows can be
+written as Parquet or Arrow IPC (see `columnar`), alone or alongside the
+workbook in the same pass.
+
+The "normalized" layout replaces the numbered sale basis columns and the
+comma-joined image / document / link cells with child tables keyed by
+external_reference (`fields.CHILD_TABLES`): extra sheets of the workbook, or
+extra Parquet / Arrow files next to the main one.
+"""
+
+import os
+import shutil
+import tempfile
+import weakref
+import zipfile
+
+import xlsxwriter
+
+from .columnar import COLUMNAR_FORMATS, ColumnarWriter, available as columnar_available, teed
+from .feed import Feed
+from .fields import COLUMNS, NORMALIZED_TABLES, normalized, plan
+from .payloads import PayloadSink
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ZIP_MIME = "application/zip"
+XLSX_MAX_ROWS = 1_048_576     # rows per worksheet, header included
+
+# format → (label, file suffix, MIME type)
+FORMATS = {
+    "xlsx": ("Excel", ".xlsx", XLSX_MIME),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    "arrow": ("Arrow IPC", ".arrow", "application/vnd.apache.arrow.file"),
+}
+
+LAYOUTS = {
+    "flat": "One row per property",
+    "normalized": "Child tables keyed by external_reference",
+}
+
+# How inline base64 <data> in images/documents ends up in the export
+PAYLOAD_MODES = {
+    "summary": "Length + hash only",
+    "zip": "Extract files to a sidecar zip",
+    "inline": "Inline base64 (truncated)",
+}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Artifact:
+    """An output file; temporary ones are removed once nothing references them."""
+
+    def __init__(self, path, rows, temporary=True):
+        self.path = path
+        self.rows = rows
+        self.size = os.path.getsize(path)
+        if temporary:
+            weakref.finalize(self, _remove, path)
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+
+def spool_path(suffix):
+    fd, path = tempfile.mkstemp(prefix="xml_toolkit_", suffix=suffix)
+    os.close(fd)
+    return path
+
+
+class _Sheet:
+    """Rows under a header row, continued on "<name> (2)", "<name> (3)", ... once a worksheet is full.
+
+    xlsxwriter does not raise for a cell it cannot write: `write_row` returns
+    an error code and skips the rest of the row. A string cut to the cell
+    limit (-2) still gets the row's remaining cells; anything else raises.
+    """
+
+    def __init__(self, wb, name, columns, header_format):
+        self.wb, self.name, self.columns, self.header_format = wb, name, columns, header_format
+        self.sheets = 0
+        self._add()
+
+    def _add(self):
+        self.sheets += 1
+        self.ws = self.wb.add_worksheet(self.name if self.sheets == 1 else f"{self.name} ({self.sheets})")
+        self.ws.write_row(0, 0, self.columns, self.header_format)
+        self.row = 0
+
+    def write(self, values):
+        if self.row == XLSX_MAX_ROWS - 1:
+            self._add()
+        self.row += 1
+        if self.ws.write_row(self.row, 0, values):
+            for col, value in enumerate(values):
+                if self.ws.write(self.row, col, value) not in (0, -2):
+                    raise ValueError(f"cannot write cell {col + 1} of row {self.row + 1} "
+                                     f"on sheet {self.ws.name!r}: {str(value)[:50]!r}")
+
+
+def write_xlsx(rows, path, columns=COLUMNS, sheet_name="Properties"):
+    """Write an iterable of value rows under a header row; returns the row count.
+
+    Rows past a worksheet's `XLSX_MAX_ROWS` continue on further sheets.
+    """
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_urls": False})
+    try:
+        sheet = _Sheet(wb, sheet_name, columns, wb.add_format({"bold": True}))
+        n = 0
+        for n, row in enumerate(rows, 1):
+            sheet.write(row)
+    finally:
+        wb.close()
+    return n
+
+
+def available_formats():
+    """The `FORMATS` usable here (Parquet and Arrow need pyarrow)."""
+    return [f for f in FORMATS if f not in COLUMNAR_FORMATS or columnar_available()]
+
+
+def write_rows(rows, outputs):
+    """Write an iterable of value rows to every {format: path} in `outputs` in one pass.
+
+    Returns the row count.
+    """
+    writers = []
+    try:
+        for fmt, path in outputs.items():
+            if fmt != "xlsx":
+                writers.append(ColumnarWriter(path, fmt))
+        if writers:
+            rows = teed(rows, writers)
+        if "xlsx" in outputs:
+            return write_xlsx(rows, outputs["xlsx"])
+        return sum(1 for _ in rows)
+    finally:
+        for w in writers:
+            w.close()
+
+
+def table_path(path, table):
+    """Where a child `table` of the normalized export at `path` goes: <stem>.<table><suffix>."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{table}{ext}"
+
+
+class _Sheets:
+    """One worksheet per table of a workbook (more once a table outgrows one), written row by row."""
+
+    def __init__(self, path, tables):
+        self.wb = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_urls": False})
+        bold = self.wb.add_format({"bold": True})
+        self.sheets = {name: _Sheet(self.wb, name, columns, bold) for name, (columns, _) in tables.items()}
+
+    def write(self, table, row):
+        self.sheets[table].write(row)
+
+    def close(self):
+        self.wb.close()
+
+
+class _Files:
+    """One `ColumnarWriter` per table: the main one at `path`, the others at `table_path`s."""
+
+    def __init__(self, path, fmt, tables):
+        self.writers = {}
+        try:
+            for i, (name, (columns, coded)) in enumerate(tables.items()):
+                self.writers[name] = ColumnarWriter(table_path(path, name) if i else path, fmt,
+                                                    columns=columns, coded=coded, integer=("n",))
+        except BaseException:
+            self.close()
+            raise
+
+    def write(self, table, row):
+        self.writers[table].write(row)
+
+    def close(self):
+        for w in self.writers.values():
+            w.close()
+
+
+def write_tables(records, outputs, tables=NORMALIZED_TABLES):
+    """Write `(row, {table: rows})` records (see `ExtractionPlan.record`) in one pass.
+
+    `outputs` maps formats to paths as in `write_rows`; the first of `tables`
+    takes the rows, the others the child rows. Returns the record count.
+    """
+    main = next(iter(tables))
+    sinks, n = [], 0
+    try:
+        for fmt, path in outputs.items():
+            sinks.append(_Sheets(path, tables) if fmt == "xlsx" else _Files(path, fmt, tables))
+        for n, (row, children) in enumerate(records, 1):
+            for sink in sinks:
+                sink.write(main, row)
+                for table, rows in children.items():
+                    for child in rows:
+                        sink.write(table, child)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return n
+
+
+def _zip_tables(records, fmt, path):
+    """`write_tables` into a zip holding one <table><suffix> file per table."""
+    folder = tempfile.mkdtemp(prefix="xml_toolkit_")
+    try:
+        main = os.path.join(folder, "tables" + FORMATS[fmt][1])
+        n = write_tables(records, {fmt: main})
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:      # already compressed
+            for i, name in enumerate(NORMALIZED_TABLES):
+                zf.write(table_path(main, name) if i else main, name + FORMATS[fmt][1])
+        return n
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def output_type(fmt, layout="flat"):
+    """(file suffix, MIME type) of an `export_rows` artifact."""
+    if layout == "normalized" and fmt != "xlsx":
+        return f".{fmt}.zip", ZIP_MIME
+    return FORMATS[fmt][1:]
+
+
+def export_xlsx(feed, path=None, recorder=None):
+    """Convert `feed` to a workbook at `path` (a temp file by default)."""
+    return export_rows(feed, "xlsx", path, recorder)
+
+
+def export_rows(feed, fmt="xlsx", path=None, recorder=None, layout="flat"):
+    """Convert `feed` to a `FORMATS` file at `path` (a temp file by default).
+
+    A normalized Parquet / Arrow export is a zip of one file per table.
+    With a `perf.Run` as `recorder`, parsing and row extraction are booked to
+    their own stages, leaving the writing as the caller's self time.
+    """
+    temporary = path is None
+    path = path or spool_path(output_type(fmt, layout)[0])
+    extract = normalized.record if layout == "normalized" else plan.row
+    if recorder is not None:
+        feed = recorder.timed("parse", feed)
+        rows = recorder.timed("extract rows", (extract(p) for p in feed))
+    else:
+        rows = (extract(p) for p in feed)
+    try:
+        if layout == "flat":
+            n = write_rows(rows, {fmt: path})
+        elif fmt == "xlsx":
+            n = write_tables(rows, {fmt: path})
+        else:
+            n = _zip_tables(rows, fmt, path)
+    except BaseException:
+        if temporary:
+            _remove(path)
+        raise
+    return Artifact(path, n, temporary)
+
+
+def export_workbook(source, payloads="summary", backend=None, recorder=None, progress=None,
+                    fmt="xlsx", layout="flat"):
+    """Export an XML source as `fmt` in `layout`, handling inline payloads per `PAYLOAD_MODES`.
+
+    `progress` wraps the feed before it is read (e.g. `jobs.Job.track`).
+    Returns (export Artifact, zip Artifact or None).
+    """
+    zip_path = spool_path(".zip") if payloads == "zip" else None
+    sink = None if payloads == "inline" else PayloadSink(zip_path)
+    feed = Feed(source, payloads=sink, backend=backend)
+    try:
+        out = export_rows(progress(feed) if progress else feed, fmt, recorder=recorder, layout=layout)
+    except BaseException:
+        if zip_path:
+            _remove(zip_path)
+        raise
+    return out, Artifact(zip_path, sink.count) if zip_path else None
@@ -0,0 +1,51 @@
+"""Streaming access to property feeds.
+
+`Feed` walks the XML with an `iterparse` backend and hands out one `<property>`
+element at a time. Each property is cleared and detached from its parent as
+soon as the consumer moves on, so memory stays flat however large the feed is. The global
+`agents/agent` block is collected on the way through.
+"""
+
+from .backends import get_backend
+from .compression import open_xml
+from .payloads import PayloadFilter
+
+
+class Feed:
+    """Iterable over the `<property>` elements of an XML feed.
+
+    Every iteration re-reads `source` from the start (file objects are rewound),
+    so one `Feed` can serve several actions. Compressed sources (gzip, bzip2,
+    xz, zip) are decompressed on the fly; an `ArchiveMember` reads one feed of
+    a zip holding several. After a full pass, `agents` holds
+    the root-level `agents/agent` elements, or None when the feed has no global
+    `<agents>` section.
+
+    With a `PayloadSink` as `payloads`, inline base64 image/document data is
+    summarised (or extracted) by the sink instead of being read into memory.
+    `backend` picks the XML parser (see `backends.BACKENDS`).
+    """
+
+    def __init__(self, source, payloads=None, backend=None):
+        self.source = source
+        self.payloads = payloads
+        self.backend = get_backend(backend)
+        self.agents = None
+        self.count = 0
+
+    def __iter__(self):
+        self.agents = None
+        self.count = 0
+        with open_xml(self.source) as src:
+            if self.payloads is not None:
+                self.payloads.begin()
+                src = PayloadFilter(src, self.payloads)
+            try:
+                yield from self.backend.properties(src, self)
+            finally:
+                if self.payloads is not None:
+                    self.payloads.end()
+
+    def global_agents(self):
+        """Root-level agents seen by the last pass ([] when there were none)."""
+        return self.agents or []
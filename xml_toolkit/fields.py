@@ -0,0 +1,490 @@
+"""Declarative export columns, compiled into a one-visit extraction plan.
+
+`PROPERTY_FIELDS` describes every export column in terms of the paths it reads
+and the code → label map it applies. `ExtractionPlan` merges all those paths
+into one tag tree, so extracting a property walks each element of interest
+once and dispatches on its tag, instead of issuing a `findtext` per column.
+"""
+
+from .codes import (desc_map, doc_type_map, force_map, gp_type_map, img_type_map,
+                    link_type_map, loc_acc_map, prop_subtype_map, ptype_map,
+                    sale_type_map, size_type_map, status_map, tenure_map)
+
+ADDRESS_TAGS = ['address1', 'address2', 'address3', 'town_city', 'county', 'postcode', 'country']
+
+
+def truncate(value, limit=30000):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + "… [TRUNCATED]"
+    return value
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Field kinds
+# ────────────────────────────────────────────────────────────────────────────
+# Paths are '/'-separated tags below <property>. Repeated groups ("images/image")
+# are collected as lists of item dicts keyed by item-relative path, with ""
+# for the item's own text and "@attr" for its attributes. `compile` returns a
+# renderer from those raw values to the field's cell (or list of cells when the
+# field spans several columns).
+
+class Text:
+    """Text at `path` (default: the column name), optionally mapped.
+
+    `paired_with` looks the value up as `(other_value, value)` and keeps the
+    raw value when the pair is unknown (used for property_subtype).
+    """
+
+    def __init__(self, column, path=None, map=None, strip=False, paired_with=None):
+        self.column, self.path, self.map = column, path or column, map
+        self.strip, self.paired_with = strip, paired_with
+
+    def columns(self):
+        return [self.column]
+
+    def register(self, plan):
+        plan.need_text(self.path)
+        if self.paired_with:
+            plan.need_text(self.paired_with)
+
+    def compile(self):
+        path, m, strip, other = self.path, self.map, self.strip, self.paired_with
+        if other:
+            return lambda raw: m.get((raw.get(other, "").strip(), raw.get(path, "").strip()),
+                                     raw.get(path, "").strip())
+        if m is not None:
+            if strip:
+                return lambda raw: m.get(raw.get(path, "").strip(), "")
+            return lambda raw: m.get(raw.get(path, ""), "")
+        return lambda raw: raw.get(path, "")
+
+
+class Attr:
+    """Attribute `attr` of the element at `path`, mapped through `map`."""
+
+    def __init__(self, column, path, attr, map):
+        self.column, self.key, self.map = column, f"{path}@{attr}", map
+        self.path, self.attr = path, attr
+
+    def columns(self):
+        return [self.column]
+
+    def register(self, plan):
+        plan.need_attr(self.path, self.attr)
+
+    def compile(self):
+        key, m = self.key, self.map
+        return lambda raw: m.get(raw.get(key, ""), "")
+
+
+def _items(raw, groups):
+    for g in groups:
+        items = raw.get(g)
+        if items:
+            return items
+    return ()
+
+
+class Pick:
+    """`value` from the first item of `group` whose `where` child equals `equals`."""
+
+    def __init__(self, column, group, value, where, equals):
+        self.column, self.group, self.value = column, group, value
+        self.where, self.equals = where, equals
+
+    def columns(self):
+        return [self.column]
+
+    def register(self, plan):
+        plan.need_item(self.group, self.value)
+        plan.need_item(self.group, self.where)
+
+    def compile(self):
+        group, value, where, equals = (self.group,), self.value, self.where, self.equals
+
+        def render(raw):
+            for item in _items(raw, group):
+                if item.get(where) == equals:
+                    return item.get(value, "")
+            return ""
+        return render
+
+
+class Slots:
+    """The first `count` items of a group spread over numbered columns.
+
+    `groups` are alternative paths; the first one present in the property wins.
+    `cells` is a list of (column prefix, item path, map or None).
+    """
+
+    def __init__(self, groups, count, cells):
+        self.groups, self.count, self.cells = tuple(groups), count, cells
+
+    def columns(self):
+        return [f"{col} {i + 1}" for i in range(self.count) for col, _, _ in self.cells]
+
+    def register(self, plan):
+        for g in self.groups:
+            for _, path, _ in self.cells:
+                plan.need_item(g, path)
+
+    def compile(self):
+        groups, count, cells = self.groups, self.count, self.cells
+        blank = [""] * len(cells)
+
+        def render(raw):
+            items = _items(raw, groups)
+            out = []
+            for i in range(count):
+                if i < len(items):
+                    item = items[i]
+                    out.extend(m.get(item.get(path, ""), "") if m is not None else item.get(path, "")
+                               for _, path, m in cells)
+                else:
+                    out.extend(blank)
+            return out
+        return render
+
+
+class ByAttr:
+    """One column per label: item text keyed by the item's `attr` code (last one wins)."""
+
+    def __init__(self, group, attr, labels):
+        self.group, self.attr, self.labels = group, attr, labels
+
+    def columns(self):
+        return list(self.labels.values())
+
+    def register(self, plan):
+        plan.need_item(self.group, "")
+        plan.need_item(self.group, "@" + self.attr)
+
+    def compile(self):
+        group, key, labels = (self.group,), "@" + self.attr, self.labels
+        index = {code: i for i, code in enumerate(labels)}
+
+        def render(raw):
+            out = [""] * len(index)
+            for item in _items(raw, group):
+                i = index.get(item.get(key))
+                if i is not None:
+                    out[i] = item.get("", "").strip()
+            return out
+        return render
+
+
+class Join:
+    """Comma-joined value of every item in `group`.
+
+    `value` is an item path, or a tuple of paths where the first non-empty one
+    is used. `map` translates codes; `clip` truncates long values (URLs, inline
+    payloads) to what a spreadsheet cell can hold.
+    """
+
+    def __init__(self, column, group, value, map=None, clip=False):
+        self.column, self.group, self.map, self.clip = column, group, map, clip
+        self.values = value if isinstance(value, tuple) else (value,)
+
+    def columns(self):
+        return [self.column]
+
+    def register(self, plan):
+        for v in self.values:
+            plan.need_item(self.group, v)
+
+    def compile(self):
+        group, values, m, clip = self.group, self.values, self.map, self.clip
+        first = values[0]
+        if len(values) > 1:
+            wrap = truncate if clip else str
+
+            def render(raw):
+                return ", ".join([wrap(next((item[k] for k in values if item.get(k)), ""))
+                                  for item in raw.get(group, ())])
+        elif m is not None:
+            def render(raw):
+                return ", ".join([m.get(item.get(first, ""), "") for item in raw.get(group, ())])
+        elif clip:
+            def render(raw):
+                return ", ".join([truncate(item.get(first, "")) for item in raw.get(group, ())])
+        else:
+            def render(raw):
+                return ", ".join([item.get(first, "") for item in raw.get(group, ())])
+        return render
+
+
+class Table:
+    """A child table: one row per item of `groups` (the first one present).
+
+    Rows start with the property's external_reference and the item's 1-based
+    position. `cells` is a list of (column, item path or tuple of paths where
+    the first non-empty one is used, map or None). The item's own text ("")
+    is stripped; unmapped values are truncated to what a spreadsheet cell can
+    hold.
+    """
+
+    def __init__(self, name, groups, cells):
+        self.name, self.groups, self.cells = name, tuple(groups), cells
+
+    def columns(self):
+        return [REF_COLUMN, "n", *(col for col, _, _ in self.cells)]
+
+    def coded(self):
+        return [col for col, _, m in self.cells if m is not None]
+
+    def register(self, plan):
+        for g in self.groups:
+            for _, path, _ in self.cells:
+                for p in path if isinstance(path, tuple) else (path,):
+                    plan.need_item(g, p)
+
+    def compile(self):
+        groups, getters = self.groups, []
+        for _, path, m in self.cells:
+            if isinstance(path, tuple):
+                getters.append(lambda item, ps=path: truncate(next((item[k] for k in ps if item.get(k)), "")))
+            elif m is not None:
+                getters.append(lambda item, p=path, m=m: m.get(item.get(p, ""), ""))
+            elif path == "":
+                getters.append(lambda item: item.get("", "").strip())
+            else:
+                getters.append(lambda item, p=path: truncate(item.get(p, "")))
+
+        def render(raw, ref):
+            return [[ref, i, *[get(item) for get in getters]] for i, item in enumerate(_items(raw, groups), 1)]
+        return render
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Export spec
+# ────────────────────────────────────────────────────────────────────────────
+REF_COLUMN = 'external_reference'
+
+PROPERTY_FIELDS = [
+    Text(REF_COLUMN),
+    Text('action'),
+    Text('name'),
+    *[Text(tag, f'address/{tag}') for tag in ADDRESS_TAGS],
+    Attr('location_accuracy', 'location', 'accuracy', loc_acc_map),
+    Text('latitude', 'location/latitude'),
+    Text('longitude', 'location/longitude'),
+    Text('property_type', map=ptype_map, strip=True),
+    Text('property_subtype', map=prop_subtype_map, paired_with='property_type'),
+    Text('sales_status', map=status_map),
+    Pick('email', 'agents/agent', 'email', where='main_agent', equals='1'),
+    Attr('size type', 'size', 'type', size_type_map),
+    Text('size_from', 'size/size_from'),
+    Text('size_to', 'size/size_to'),
+    Slots(['sale_basises/sale_basis', 'sale_basis'], 2, [
+        ('tenure type', 'tenure_type', tenure_map),
+        ('sale type', 'sale_type', sale_type_map),
+        ('guide price', 'guide_price', None),
+        ('guide price type', 'guide_price_type', gp_type_map),
+    ]),
+    ByAttr('descriptions/description', 'type', desc_map),
+    Join('image caption', 'images/image', 'caption'),
+    Join('image_type', 'images/image', 'type', img_type_map),
+    Join('image', 'images/image', ('url', 'absolute_path', 'data'), clip=True),
+    Join('document description', 'documents/document', 'description'),
+    Join('document type', 'documents/document', 'type', doc_type_map),
+    Join('show_on_site', 'documents/document', 'show_on_site'),
+    Join('brochure', 'documents/document', ('url', 'absolute_path', 'data'), clip=True),
+    Join('link name', 'links/link', 'name'),
+    Join('link type', 'links/link', 'type', link_type_map),
+    Join('url', 'links/link', 'url', clip=True),
+    Join('width', 'links/link', 'width'),
+    Join('height', 'links/link', 'height'),
+    Text('last_updated'),
+    Text('force_update', map=force_map),
+]
+
+# Normalized layout: the single-valued fields, plus one child table per
+# repeated group instead of numbered or comma-joined columns.
+SCALAR_FIELDS = [f for f in PROPERTY_FIELDS if not isinstance(f, (Slots, ByAttr, Join))]
+CHILD_TABLES = [
+    Table('sale_bases', ['sale_basises/sale_basis', 'sale_basis'], [
+        ('tenure type', 'tenure_type', tenure_map),
+        ('sale type', 'sale_type', sale_type_map),
+        ('guide price', 'guide_price', None),
+        ('guide price type', 'guide_price_type', gp_type_map),
+    ]),
+    Table('descriptions', ['descriptions/description'], [
+        ('type', '@type', desc_map),
+        ('text', '', None),
+    ]),
+    Table('images', ['images/image'], [
+        ('image caption', 'caption', None),
+        ('image_type', 'type', img_type_map),
+        ('image', ('url', 'absolute_path', 'data'), None),
+    ]),
+    Table('documents', ['documents/document'], [
+        ('document description', 'description', None),
+        ('document type', 'type', doc_type_map),
+        ('show_on_site', 'show_on_site', None),
+        ('brochure', ('url', 'absolute_path', 'data'), None),
+    ]),
+    Table('links', ['links/link'], [
+        ('link name', 'name', None),
+        ('link type', 'type', link_type_map),
+        ('url', 'url', None),
+        ('width', 'width', None),
+        ('height', 'height', None),
+    ]),
+    Table('agents', ['agents/agent'], [
+        ('main_agent', 'main_agent', None),
+        ('email', 'email', None),
+    ]),
+]
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Plan
+# ────────────────────────────────────────────────────────────────────────────
+class _Node:
+    __slots__ = ("children", "text", "attr_keys", "repeat", "key", "leaf")
+
+    def __init__(self, key):
+        self.children, self.text, self.attr_keys, self.repeat = {}, None, (), False
+        self.key, self.leaf = key, False
+
+
+def _walk(elem, node, out):
+    if node.text is not None and node.text not in out:
+        out[node.text] = elem.text or ""
+    for a, key in node.attr_keys:
+        if key not in out:
+            out[key] = elem.get(a, "")
+    children = node.children
+    for c in elem:
+        sub = children.get(c.tag)
+        if sub is None:
+            continue
+        if sub.leaf:
+            if sub.text not in out:
+                out[sub.text] = c.text or ""
+        elif sub.repeat:
+            item = {}
+            _walk(c, sub, item)
+            items = out.get(sub.key)
+            if items is None:
+                out[sub.key] = [item]
+            else:
+                items.append(item)
+        else:
+            _walk(c, sub, out)
+
+
+class ExtractionPlan:
+    """Compiled form of a field spec: one tag tree plus one renderer per field.
+
+    With child `tables`, `record` also renders their rows from the same walk.
+    """
+
+    def __init__(self, spec, tables=()):
+        self.spec = spec
+        self._root = _Node("")
+        for f in [*spec, *tables]:
+            f.register(self)
+        self._finalize(self._root)
+        self.columns = [c for f in spec for c in f.columns()]
+
+        # (renderer, whether it fills one cell) per field, applied in order to build a row
+        renderers = [(f.compile(), len(f.columns()) == 1) for f in spec]
+
+        def values(raw):
+            row = []
+            append, extend = row.append, row.extend
+            for render, single in renderers:
+                if single:
+                    append(render(raw))
+                else:
+                    extend(render(raw))
+            return row
+
+        self.values = values
+        self._tables = [(t.name, t.compile()) for t in tables]
+
+    def _finalize(self, node):
+        node.leaf = not (node.children or node.attr_keys or node.repeat) and node.text is not None
+        for child in node.children.values():
+            self._finalize(child)
+
+    def _node(self, path, base=None):
+        node = base or self._root
+        # keys are relative to the nearest repeated group (an item dict)
+        for part in path.split("/") if path else ():
+            if part not in node.children:
+                key = part if node.repeat or not node.key else f"{node.key}/{part}"
+                node.children[part] = _Node(key)
+            node = node.children[part]
+        return node
+
+    def _local(self, node):
+        return "" if node.repeat else node.key
+
+    def _add_attr(self, node, attr):
+        if all(a != attr for a, _ in node.attr_keys):
+            node.attr_keys += ((attr, f"{self._local(node)}@{attr}"),)
+
+    def need_text(self, path):
+        node = self._node(path)
+        node.text = self._local(node)
+
+    def need_attr(self, path, attr):
+        self._add_attr(self._node(path), attr)
+
+    def need_item(self, group, path):
+        """Register `path` (relative to each item, "" or "@attr" for the item itself) of a group."""
+        item = self._node(group)
+        if not item.repeat:
+            if item.children or item.text is not None:
+                raise ValueError(f"{group!r} is used both as a group and as a path")
+            item.repeat = True
+        sub, _, attr = path.partition("@")
+        node = self._node(sub, item) if sub else item
+        if attr:
+            self._add_attr(node, attr)
+        else:
+            node.text = self._local(node)
+
+    def raw(self, p):
+        """Every registered path of `p` from a single walk (path → text / item list)."""
+        out = {}
+        _walk(p, self._root, out)
+        return out
+
+    def row(self, p):
+        """Export values for `p`, in `columns` order."""
+        return self.values(self.raw(p))
+
+    def row_dict(self, p):
+        return dict(zip(self.columns, self.row(p)))
+
+    def record(self, p):
+        """(row, {table: rows}) for `p`: export values plus the rows of each child table."""
+        raw = self.raw(p)
+        ref = raw.get(REF_COLUMN, "")
+        return self.values(raw), {name: render(raw, ref) for name, render in self._tables}
+
+
+def coded_columns(spec):
+    """Columns holding one code-map label per cell (few distinct values, e.g. sales_status)."""
+    out = []
+    for f in spec:
+        if isinstance(f, (Text, Attr)) and f.map is not None:
+            out.append(f.column)
+        elif isinstance(f, Slots):
+            out.extend(f"{col} {i + 1}" for i in range(f.count) for col, _, m in f.cells if m is not None)
+    return out
+
+
+plan = ExtractionPlan(PROPERTY_FIELDS)
+COLUMNS = plan.columns
+CODED_COLUMNS = coded_columns(PROPERTY_FIELDS)
+
+normalized = ExtractionPlan(SCALAR_FIELDS, CHILD_TABLES)
+# table → (columns, code-mapped columns); "properties" holds `normalized.columns`
+NORMALIZED_TABLES = {
+    "properties": (normalized.columns, coded_columns(SCALAR_FIELDS)),
+    **{t.name: (t.columns(), t.coded()) for t in CHILD_TABLES},
+}
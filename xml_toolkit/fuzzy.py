@@ -0,0 +1,178 @@
+"""Near-match suggestions for refs that have no exact counterpart.
+
+Refs drift in formatting between systems (`ABC-123`, `ABC123`, `abc 123 `),
+so `normalize_ref` case-folds them and keeps only letters and digits. A
+`RefIndex` holds the distinct normalized refs of one side in a character
+trigram inverted index, built with vectorized pandas / numpy operations. A
+query looks up its own trigrams, ranks the candidates sharing them by Dice
+coefficient and scores only the best few with edit distance, so it never
+compares against every ref. Trigrams shared by a large share of the refs
+(common prefixes such as "SYN" or "000") are skipped unless a query has
+nothing rarer.
+
+Edit distance comes from rapidfuzz when it is installed, otherwise from a
+numpy Levenshtein that scores a query's whole shortlist together.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rapidfuzz.distance import Levenshtein as _rapid_levenshtein
+except ImportError:     # optional: pip install rapidfuzz
+    _rapid_levenshtein = None
+
+MIN_SIMILARITY = 0.6    # suggestions scoring below this are dropped
+SHORTLIST = 20          # candidates per query scored with edit distance
+COMMON_GRAM = 0.02      # trigrams in more than this share of refs are skipped
+_NOT_ALNUM = re.compile(r"[\W_]+")
+
+
+def normalize_ref(ref):
+    """`ref` case-folded, with everything but letters and digits removed."""
+    return _NOT_ALNUM.sub("", str(ref).casefold())
+
+
+def _distances(a, others):
+    """Edit distance from `a` to each of `others`, as an int array.
+
+    Without rapidfuzz the Levenshtein table is filled one row per character
+    of `a` for all of `others` at once; the insertions within a row are a
+    running minimum (`np.minimum.accumulate`), so no Python loop runs per cell.
+    """
+    if _rapid_levenshtein is not None:
+        return np.array([_rapid_levenshtein.distance(a, o) for o in others], dtype=np.int64)
+    lengths = np.array([len(o) for o in others], dtype=np.int64)
+    width = max(int(lengths.max(initial=0)), 1)
+    chars = np.array(others, dtype=f"<U{width}").view(np.uint32).reshape(len(others), width)
+    steps = np.arange(width + 1)
+    previous = np.broadcast_to(steps, (len(others), width + 1))
+    for i, ca in enumerate(a, 1):
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(previous[:, :-1] + (chars != ord(ca)), previous[:, 1:] + 1)
+        previous = np.minimum.accumulate(current - steps, axis=1) + steps
+    return previous[np.arange(len(others)), lengths]
+
+
+def similarity(a, b):
+    """1 - edit distance / longer length, for two normalized refs."""
+    longest = max(len(a), len(b))
+    return 1.0 - int(_distances(a, [b])[0]) / longest if longest else 1.0
+
+
+def _gram_keys(chars):
+    """int64 key of each trigram of a (rows, width) array of code points (21 bits each)."""
+    return (chars[:, :-2] << 42) | (chars[:, 1:-1] << 21) | chars[:, 2:]
+
+
+def _trigrams(norm):
+    padded = np.array([f"^{norm}$"]).view(np.uint32).astype(np.int64)[None, :]
+    return np.unique(_gram_keys(padded))
+
+
+class RefIndex:
+    """Trigram index over a collection of refs, answering `suggest(ref)`."""
+
+    def __init__(self, refs, chunk=1 << 16):
+        refs = pd.Series(list(refs), dtype=object).dropna().astype(str).drop_duplicates()
+        norms = refs.map(normalize_ref)
+        refs, norms = refs[norms != ""].to_numpy(dtype=object), norms[norms != ""]
+        # distinct normalized refs, each with the original spellings behind it
+        codes, uniques = pd.factorize(norms)
+        self.norms = list(uniques)
+        self.exact = {n: i for i, n in enumerate(self.norms)}
+        first = np.unique(codes, return_index=True)[1]
+        self._spelling = refs[first]
+        again = np.ones(len(codes), dtype=bool)
+        again[first] = False
+        self._more = {}
+        for code, ref in zip(codes[again].tolist(), refs[again].tolist()):
+            self._more.setdefault(code, []).append(ref)
+
+        # (trigram key, ref id) pairs, built on code point arrays a chunk of refs at a time
+        grams, ids = [], []
+        for lo in range(0, len(self.norms), chunk):
+            padded = np.array([f"^{n}$" for n in self.norms[lo:lo + chunk]])
+            width = padded.dtype.itemsize // 4
+            chars = padded.view(np.uint32).reshape(len(padded), width).astype(np.int64)
+            lengths = np.char.str_len(padded)
+            valid = np.arange(width - 2) < (lengths - 2)[:, None]
+            grams.append(_gram_keys(chars)[valid])
+            ids.append(np.nonzero(valid)[0] + lo)
+        grams = np.concatenate(grams) if grams else np.empty(0, dtype=np.int64)
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        order = np.lexsort((ids, grams))
+        grams, ids = grams[order], ids[order]
+        keep = np.ones(len(grams), dtype=bool)      # a trigram repeated within one ref counts once
+        keep[1:] = (grams[1:] != grams[:-1]) | (ids[1:] != ids[:-1])
+        grams, self._ids = grams[keep], ids[keep]
+        self._grams, starts = np.unique(grams, return_index=True)
+        self._bounds = np.append(starts, len(grams))
+        self._gram_counts = np.bincount(self._ids, minlength=len(self.norms))
+        self._common = max(50, int(len(self.norms) * COMMON_GRAM))
+
+    def __len__(self):
+        return len(self.norms)
+
+    def originals(self, i):
+        """Every spelling of the i-th normalized ref."""
+        return [self._spelling[i], *self._more.get(i, ())]
+
+    def _candidates(self, grams):
+        at = np.searchsorted(self._grams, grams)
+        found = at < len(self._grams)
+        found[found] = self._grams[at[found]] == grams[found]
+        at = at[found]
+        sizes = self._bounds[at + 1] - self._bounds[at]
+        order = np.argsort(sizes, kind="stable")
+        rare = order[sizes[order] <= self._common]
+        if not len(rare):
+            rare = order[:2]
+        if not len(rare):
+            return np.empty(0, dtype=np.int64)
+        hits = np.concatenate([self._ids[self._bounds[g]:self._bounds[g + 1]] for g in at[rare]])
+        ids, shared = np.unique(hits, return_counts=True)
+        dice = 2 * shared / (len(grams) + self._gram_counts[ids])
+        if len(ids) > SHORTLIST:
+            best = np.argpartition(-dice, SHORTLIST)[:SHORTLIST]
+            ids, dice = ids[best], dice[best]
+        return ids[np.argsort(-dice, kind="stable")]
+
+    def suggest(self, ref, limit=3, min_similarity=MIN_SIMILARITY):
+        """[(original ref, similarity)] of the closest refs, best first.
+
+        A ref equal to `ref` after normalization scores 1.0 and is the only
+        suggestion.
+        """
+        norm = normalize_ref(ref)
+        if not norm:
+            return []
+        hit = self.exact.get(norm)
+        if hit is not None:
+            return [(original, 1.0) for original in self.originals(hit)]
+        ids = self._candidates(_trigrams(norm))
+        if not len(ids):
+            return []
+        others = [self.norms[i] for i in ids.tolist()]
+        longest = np.maximum(len(norm), [len(o) for o in others])
+        scores = 1.0 - _distances(norm, others) / longest
+        order = np.argsort(-scores, kind="stable")
+        scored = [(float(scores[k]), int(ids[k])) for k in order if scores[k] >= min_similarity]
+        out = []
+        for score, i in scored:
+            out.extend((original, round(score, 3)) for original in self.originals(i))
+        return out[:limit]
+
+
+def suggestion_columns(refs, index, side, limit=3):
+    """DataFrame of "Closest <side> ref(s)" and "Similarity" (best score) for each of `refs`."""
+    names, scores = [], []
+    for ref in refs:
+        found = index.suggest(ref, limit) if index is not None else []
+        names.append(", ".join(r for r, _ in found))
+        scores.append(found[0][1] if found else float("nan"))
+    return pd.DataFrame({f"Closest {side} ref(s)": names, "Similarity": scores},
+                        index=refs.index if isinstance(refs, pd.Series) else None)
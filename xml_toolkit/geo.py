@@ -0,0 +1,187 @@
+"""Offline check of property pins against postcode centroids.
+
+`Centroids` loads a local postcode-centroid CSV (ONS Postcode Directory,
+Code-Point Open converted to lat/long, or any file with postcode, latitude
+and longitude columns) once into sorted numpy arrays: fixed-width byte keys
+and float32 coordinates, plus the mean position of each postcode district
+(outward code) for postcodes the file does not list. `validate` looks up
+every pin's postcode with one `searchsorted` and computes all distances in a
+single vectorized haversine, so a million properties take seconds and
+nothing goes over the network.
+
+A pin is flagged when it is 0,0, out of range or not a number, when it lies
+further from its postcode than the `TOLERANCE_KM` of its location@accuracy
+band (as "swapped" when latitude and longitude the other way round would
+fit), or when its postcode is unknown and it falls outside the area the file
+covers at all, e.g. in the sea.
+
+The pages and the CLI read the file named by `XML_TOOLKIT_POSTCODES`; without
+it the check is skipped.
+"""
+
+import os
+import threading
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from .codes import loc_acc_map
+
+POSTCODES_PATH = os.environ.get("XML_TOOLKIT_POSTCODES")
+# location@accuracy code → km a pin may sit from its postcode centroid
+TOLERANCE_KM = {"4": 2.0, "3": 5.0, "2": 10.0, "1": 25.0, "0": 50.0}
+DEFAULT_TOLERANCE_KM = 50.0     # accuracy missing or not a known code
+DISTRICT_SLACK_KM = 10.0        # added when only the postcode district is known
+COVERAGE_MARGIN = 0.5           # degrees around the file's bounding box still counted as covered
+GEO_COLUMNS = ("external_reference", "postcode", "latitude", "longitude", "accuracy", "distance_km",
+               "issue")
+_ISSUES = (None, "outside postcode coverage", "far from postcode", "swapped", "out of range", "zero",
+           "not a number")     # from the weakest finding to the strongest
+_EARTH_KM = 6371.0088
+_HEADERS = {"postcode": ("postcode", "pcds", "pcd", "pcd7", "pcd8", "pc"),
+            "latitude": ("latitude", "lat"),
+            "longitude": ("longitude", "long", "lon", "lng")}
+_loaded = {}
+_lock = threading.Lock()
+
+
+def _keys(postcodes):
+    """Postcodes upper-cased with spaces and punctuation removed, as a byte-string array."""
+    keys = pd.Series(postcodes, dtype=object).fillna("").astype(str).str.upper() \
+        .str.replace(r"[^0-9A-Z]", "", regex=True).to_numpy(dtype=object)
+    return keys.astype(f"S{max(max(map(len, keys), default=0), 1)}")
+
+
+def _find(keys, table):
+    """(index into `table`, found) for each of `keys`, by binary search of the sorted `table`."""
+    if not len(table):
+        return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    at = np.minimum(np.searchsorted(table, keys), len(table) - 1)
+    return at, table[at] == keys
+
+
+def _floats(texts):
+    """float64 array of numeric strings, NaN for any that are not numbers."""
+    try:
+        return np.array(texts, dtype=object).astype(np.float64)
+    except ValueError:
+        return pd.to_numeric(pd.Series(texts, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between arrays of points in degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * _EARTH_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class Centroids:
+    """Postcode → centroid lookup held in sorted numpy arrays."""
+
+    def __init__(self, postcodes, lat, lon):
+        keys = _keys(postcodes)
+        lat, lon = np.asarray(lat, dtype=np.float32), np.asarray(lon, dtype=np.float32)
+        usable = (keys != b"") & (np.abs(lat) <= 90) & (np.abs(lon) <= 180) & ~((lat == 0) & (lon == 0))
+        keys, lat, lon = keys[usable], lat[usable], lon[usable]
+        if not len(keys):
+            raise ValueError("postcode centroid file has no usable rows")
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.lat, self.lon = keys[order], lat[order], lon[order]
+        # districts: the outward code, i.e. all but the three-character inward code
+        district = pd.Series(self.keys).str[:-3]
+        means = pd.DataFrame({"lat": self.lat, "lon": self.lon}, dtype=np.float64) \
+            .groupby(district.to_numpy()).mean()
+        self.district_keys = means.index.to_numpy().astype(self.keys.dtype)
+        self.district_lat = means["lat"].to_numpy(dtype=np.float32)
+        self.district_lon = means["lon"].to_numpy(dtype=np.float32)
+        self.bounds = (float(self.lat.min()) - COVERAGE_MARGIN, float(self.lat.max()) + COVERAGE_MARGIN,
+                       float(self.lon.min()) - COVERAGE_MARGIN, float(self.lon.max()) + COVERAGE_MARGIN)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def read_csv(cls, path):
+        header = pd.read_csv(path, nrows=0).columns
+        found = {}
+        for want, names in _HEADERS.items():
+            found[want] = next((c for c in header if c.strip().lower() in names), None)
+        if None in found.values():
+            raise ValueError(f"{path}: postcode centroid CSV needs postcode, latitude and longitude "
+                             f"columns (found {', '.join(header)})")
+        frame = pd.read_csv(path, usecols=list(found.values()), dtype={found["postcode"]: str})
+        coords = frame[[found["latitude"], found["longitude"]]].apply(pd.to_numeric, errors="coerce")
+        return cls(frame[found["postcode"]], coords.iloc[:, 0].to_numpy(), coords.iloc[:, 1].to_numpy())
+
+    def lookup(self, postcodes):
+        """(lat, lon, district) arrays for `postcodes`: NaN where unknown, district True for a district fallback."""
+        keys = _keys(postcodes)
+        lat = np.full(len(keys), np.nan)
+        lon = np.full(len(keys), np.nan)
+        at, hit = _find(keys, self.keys)
+        lat[hit], lon[hit] = self.lat[at[hit]], self.lon[at[hit]]
+        district = np.zeros(len(keys), dtype=bool)
+        rest = np.nonzero(~hit & (np.char.str_len(keys) > 3))[0]
+        if len(rest):
+            at, hit = _find(np.array([k[:-3] for k in keys[rest]], dtype=keys.dtype), self.district_keys)
+            rest, at = rest[hit], at[hit]
+            lat[rest], lon[rest] = self.district_lat[at], self.district_lon[at]
+            district[rest] = True
+        return lat, lon, district
+
+    def _covered(self, lat, lon):
+        lo_lat, hi_lat, lo_lon, hi_lon = self.bounds
+        return (lat >= lo_lat) & (lat <= hi_lat) & (lon >= lo_lon) & (lon <= hi_lon)
+
+    def validate(self, positions):
+        """GEO_COLUMNS rows for the flagged pins among `positions`, in order.
+
+        `positions` holds (ref, postcode, latitude, longitude, accuracy code)
+        tuples with the coordinates as the feed's text.
+        """
+        if not positions:
+            return []
+        refs, postcodes, lat_text, lon_text, accuracy = (list(map(itemgetter(i), positions)) for i in range(5))
+        lat, lon = _floats(lat_text), _floats(lon_text)
+        codes = pd.Series(accuracy, dtype=object)
+        tolerance = codes.map(TOLERANCE_KM).fillna(DEFAULT_TOLERANCE_KM).to_numpy(dtype=np.float64)
+
+        c_lat, c_lon, district = self.lookup(postcodes)
+        tolerance = tolerance + np.where(district, DISTRICT_SLACK_KM, 0.0)
+        known = ~np.isnan(c_lat)
+        distance = haversine_km(lat, lon, c_lat, c_lon)
+        swapped_distance = haversine_km(lon, lat, c_lat, c_lon)
+
+        # index into _ISSUES; later (stronger) findings overwrite earlier ones
+        issue = np.zeros(len(refs), dtype=np.int8)
+        unknown = ~known & ~self._covered(lat, lon)
+        issue[unknown] = 1
+        issue[unknown & self._covered(lon, lat)] = 3
+        far = known & (distance > tolerance)
+        issue[far] = 2
+        issue[far & (swapped_distance <= tolerance)] = 3
+        issue[(np.abs(lat) > 90) | (np.abs(lon) > 180)] = 4
+        issue[(lat == 0) & (lon == 0)] = 5
+        issue[np.isnan(lat) | np.isnan(lon)] = 6
+
+        rows = []
+        for i in np.flatnonzero(issue).tolist():
+            km = distance[i]
+            rows.append((refs[i], postcodes[i], lat_text[i], lon_text[i],
+                         loc_acc_map.get(accuracy[i], accuracy[i] or ""),
+                         None if np.isnan(km) else round(float(km), 1), _ISSUES[issue[i]]))
+        return rows
+
+
+def centroids(path=None):
+    """The `Centroids` of `path` (default `XML_TOOLKIT_POSTCODES`), loaded once per file version; None without a file."""
+    path = path or POSTCODES_PATH
+    if not path:
+        return None
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    with _lock:
+        if key not in _loaded:
+            _loaded.clear()
+            _loaded[key] = Centroids.read_csv(path)
+        return _loaded[key]
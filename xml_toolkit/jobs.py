@@ -0,0 +1,172 @@
+"""Background jobs with progress and cancellation.
+
+A `Job` runs `work(job)` on a worker thread. The work wraps the feed it
+iterates in `job.track(...)`, which counts properties, and raises `Cancelled`
+at the next property once `cancel()` has been called; work done elsewhere
+(e.g. in worker processes) reports each finished piece with `job.advance(n)`. The page polls `done`,
+`total`, `rate` and `eta` between reruns; the job keeps running whatever the
+page script does meanwhile.
+
+Uploads are shared with the page script, so a job should read them through
+`detached(...)`: its own read position over the same bytes.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .compression import ArchiveMember
+
+JOB_THREADS = int(os.environ.get("XML_TOOLKIT_JOB_THREADS", "2"))
+_pool = ThreadPoolExecutor(max_workers=JOB_THREADS, thread_name_prefix="xml_toolkit_job")
+
+
+class Cancelled(Exception):
+    pass
+
+
+class _BufferStream:
+    """Read-only binary stream over a buffer (e.g. an upload's `getvalue()`), without copying it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        out = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return out
+
+    def seek(self, pos, whence=0):
+        self._pos = [0, self._pos, len(self._view)][whence] + pos
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        pass
+
+
+def detached(source):
+    """`source` with a read position of its own: paths as they are, in-memory uploads as a view.
+
+    The view is over `getvalue()`, which hands back the bytes an upload was
+    created from; `getbuffer()` would make the upload copy them first.
+    """
+    if isinstance(source, ArchiveMember):
+        return ArchiveMember(detached(source.archive), source.name)
+    if hasattr(source, "getvalue"):
+        return _BufferStream(source.getvalue())
+    return source
+
+
+class _Tracked:
+    """Iterable proxy counting items into a job and checking for cancellation."""
+
+    def __init__(self, job, iterable):
+        self._job, self._iterable = job, iterable
+
+    def __getattr__(self, attr):        # e.g. Feed.agents after the pass
+        return getattr(self._iterable, attr)
+
+    def __iter__(self):
+        job = self._job
+        for item in self._iterable:
+            if job.cancelled:
+                raise Cancelled("cancelled")
+            yield item
+            job.done += 1
+
+
+class Job:
+    """`work(job)` running on a worker thread; `state` is running / done / failed / cancelled."""
+
+    def __init__(self, work, label=""):
+        self.label = label
+        self.unit = "properties"    # what `done` and `total` count
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = None
+        self.stopped = False        # raised Cancelled before finishing
+        self._cancel = threading.Event()
+        self._future = _pool.submit(self._run, work)
+
+    def _run(self, work):
+        try:
+            self.result = work(self)
+        except Cancelled:
+            self.stopped = True
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.finished = time.monotonic()
+
+    def track(self, iterable, total=None):
+        """Wrap the iterable the work loops over; `total` is the expected item count."""
+        if total is not None:
+            self.total = total
+        return _Tracked(self, iterable)
+
+    def advance(self, items):
+        """Count `items` more done by work not iterated through `track`; raises `Cancelled` once cancelled."""
+        if self.cancelled:
+            raise Cancelled("cancelled")
+        self.done += items
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def running(self):
+        return self.finished is None
+
+    @property
+    def state(self):
+        if self.running:
+            return "running"
+        if self.error is not None:
+            return "failed"
+        return "cancelled" if self.stopped else "done"
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self):
+        """Items per second so far."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate (None until it can be estimated)."""
+        if not self.total or not self.rate:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def describe(self):
+        text = f"{self.done:,}" + (f" / {self.total:,}" if self.total else "") + f" {self.unit}"
+        if self.done:
+            text += f" · {self.rate:,.0f}/s"
+        if self.eta is not None and self.running:
+            text += f" · ETA {self.eta:,.0f}s"
+        return text
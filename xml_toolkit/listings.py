@@ -0,0 +1,157 @@
+"""Likely duplicate listings: one building listed under several refs.
+
+`ListingIndex` takes each property's ref, name, address and lat/long during
+the report pass and files it under two hash keys, both scoped to its
+normalized postcode:
+
+* an address key – the first address lines, case-folded, stripped of
+  punctuation and with common street words abbreviated ("Road" → "rd");
+* a location key – the lat/long grid cell of `GRID` degrees it falls in.
+
+Properties sharing an address key are joined with union-find. Properties
+in the same or neighbouring cells of a postcode are joined only when they
+also share their name or their first address line: nearness alone would
+chain every listing of a dense street into one cluster. Every step is a dict
+lookup per property, so the cost grows linearly with the feed rather than
+with the number of pairs. Only clusters spanning at least two distinct
+refs are reported; one ref repeated is check (b).
+
+Index state is plain lists and dicts, so partial indexes from separate
+chunks of a feed can be merged like the rest of the report.
+"""
+
+import math
+import os
+import re
+
+GRID = float(os.environ.get("XML_TOOLKIT_DUPLICATE_GRID", "0.0002"))  # degrees, about 22 m north–south
+_ADDRESS_LINES = 3      # address1–address3; town and county add nothing the postcode does not
+_NOT_ALNUM = re.compile(r"[\W_]+")
+_ABBREVIATIONS = {
+    "street": "st", "road": "rd", "avenue": "ave", "lane": "ln", "drive": "dr", "court": "ct",
+    "place": "pl", "square": "sq", "crescent": "cres", "terrace": "ter", "close": "cl",
+    "gardens": "gdns", "house": "ho", "building": "bldg", "industrial": "ind", "estate": "est",
+    "business": "bus", "park": "pk", "north": "n", "south": "s", "east": "e", "west": "w",
+}
+_NEIGHBOURS = ((0, 1), (1, -1), (1, 0), (1, 1))     # each cell pair is checked from one side only
+
+
+def postcode_key(postcode):
+    """`postcode` upper-cased without spaces or punctuation."""
+    return _NOT_ALNUM.sub("", postcode or "").upper()
+
+
+def address_key(lines):
+    """The address lines as one case-folded, punctuation-free string with street words abbreviated."""
+    words = _NOT_ALNUM.sub(" ", " ".join(lines).casefold()).split()
+    return " ".join(_ABBREVIATIONS.get(w, w) for w in words)
+
+
+def grid_cell(lat, lon):
+    """(row, column) of the `GRID` cell holding a lat/long pair, or None when it is not a usable position."""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lon)) or abs(lat) > 90 or abs(lon) > 180 \
+            or (lat == 0 and lon == 0):
+        return None
+    return math.floor(lat / GRID), math.floor(lon / GRID)
+
+
+class ListingIndex:
+    """Address and location hash index over a feed's properties, yielding duplicate clusters."""
+
+    def __init__(self):
+        self.listings = []      # (ref, name, address, lat, lon) of every indexed property
+        self.signals = []       # per listing: ("name" | "street", key) pairs a nearby listing must share one of
+        self.by_address = {}    # (postcode key, address key) → listing ids
+        self.by_cell = {}       # (postcode key, row, column) → listing ids
+
+    def add(self, ref, name, address, postcode, lat, lon):
+        """Index one property; `address` is its `report.ADDRESS_TAGS` values."""
+        postcode = postcode_key(postcode)
+        if not postcode:
+            return
+        street = address_key(address[:_ADDRESS_LINES])
+        cell = grid_cell(lat, lon)
+        if not street and cell is None:
+            return
+        i = len(self.listings)
+        self.listings.append((ref, name or "", address, lat or "", lon or ""))
+        lines = [key for key in (address_key([line]) for line in address[:_ADDRESS_LINES]) if key]
+        signals = [("street", lines[0])] if lines else []     # the most specific line, e.g. "unit 4"
+        if address_key([name or ""]):
+            signals.append(("name", address_key([name])))
+        self.signals.append(signals)
+        if street:
+            self.by_address.setdefault((postcode, street), []).append(i)
+        if cell is not None:
+            self.by_cell.setdefault((postcode, *cell), []).append(i)
+
+    def merge(self, other):
+        """Fold another index (a later slice of the same feed) into this one."""
+        offset = len(self.listings)
+        self.listings.extend(other.listings)
+        self.signals.extend(other.signals)
+        for mine, theirs in ((self.by_address, other.by_address), (self.by_cell, other.by_cell)):
+            for key, ids in theirs.items():
+                mine.setdefault(key, []).extend(i + offset for i in ids)
+        return self
+
+    def clusters(self):
+        """[(cluster, ref, name, *address, lat, lon, matched on)] of every likely duplicate, in feed order.
+
+        Clusters are numbered from 1 in order of their first property;
+        "matched on" lists how a property was linked to others of its
+        cluster: "address", "location + name" and/or "location + street".
+        """
+        parent = list(range(len(self.listings)))
+        matched = [set() for _ in self.listings]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def join(ids, how):
+            root = find(ids[0])
+            for i in ids:
+                matched[i].add(how)
+                parent[find(i)] = root
+
+        def join_nearby(ids):
+            sharing = {}
+            for i in ids:
+                for signal in self.signals[i]:
+                    sharing.setdefault(signal, []).append(i)
+            for (kind, _), same in sharing.items():
+                if len(same) > 1:
+                    join(same, f"location + {kind}")
+
+        for ids in self.by_address.values():
+            if len(ids) > 1:
+                join(ids, "address")
+
+        for (postcode, row, column), ids in self.by_cell.items():
+            if len(ids) > 1:
+                join_nearby(ids)
+            for dr, dc in _NEIGHBOURS:
+                near = self.by_cell.get((postcode, row + dr, column + dc))
+                if near:
+                    join_nearby(ids + near)
+
+        members = {}
+        for i in range(len(self.listings)):
+            if matched[i]:
+                members.setdefault(find(i), []).append(i)
+        out, number = [], 0
+        for ids in sorted(members.values(), key=lambda ids: ids[0]):
+            if len({self.listings[i][0] for i in ids}) < 2:
+                continue
+            number += 1
+            for i in ids:
+                ref, name, address, lat, lon = self.listings[i]
+                out.append((number, ref, name, *address, lat, lon, ", ".join(sorted(matched[i]))))
+        return out
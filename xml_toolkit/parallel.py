@@ -0,0 +1,282 @@
+"""Parallel parsing of a single large feed.
+
+The feed is memory-mapped and cut into byte ranges that each start at a
+`<property` start tag. Workers re-open the map, scan their range for
+`<property>…</property>` spans and parse just those spans (wrapped in a
+synthetic root) through the usual `Feed`, so extraction is identical to a
+sequential pass. Everything between the spans — the document prolog, the
+global `<agents>` block, wrapper elements — is handed back as "gap" bytes and
+parsed once in the parent to recover the root-level agents.
+
+Report partials are merged with `ReportBuilder.merge`; export rows are
+spooled by each worker to a pickle file and replayed in range order.
+
+Assumes `<property>` elements do not nest and that the literal text
+"<property" does not occur inside comments or CDATA.
+"""
+
+import mmap
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .compare import XML_REF_COLUMNS, xml_ref_row
+from .compression import open_xml
+from .export import spool_path
+from .feed import Feed
+from .fields import normalized, plan
+from .payloads import PayloadSink
+from .report import ReportBuilder
+
+_OPEN, _CLOSE = b"<property", b"</property>"
+_NAME_END = (b">", b"/", b" ", b"\t", b"\r", b"\n")
+CHUNK_BYTES = 32 << 20      # target range size; several ranges per worker balance the load
+PROGRESS_RANGES = 4         # ranges per worker at least when reporting progress, so it moves
+_ROW_BATCH = 2000
+
+
+def _next_start(mm, pos, end=None):
+    """Offset of the next `<property` start tag at or after `pos` (-1 if none)."""
+    end = len(mm) if end is None else end
+    while True:
+        i = mm.find(_OPEN, pos, end)
+        if i < 0 or mm[i + 9:i + 10] in _NAME_END:
+            return i
+        pos = i + 9
+
+
+def count_properties(source, chunk_size=8 << 20):
+    """Number of `<property` start tags in a feed (any `Feed` source), from a byte scan.
+
+    Used as the progress total of a streamed pass; like the range split it
+    counts tags inside comments or CDATA too. Compressed feeds are scanned as
+    they decompress.
+    """
+    with open_xml(source) as f:
+        n, tail = 0, b""
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            data = tail + chunk
+            i = data.find(_OPEN)
+            while 0 <= i <= len(data) - 10:      # the byte after the name must be in this piece
+                if data[i + 9:i + 10] in _NAME_END:
+                    n += 1
+                i = data.find(_OPEN, i + 9)
+            tail = data[-9:]
+        return n
+
+
+def split_ranges(mm, chunks):
+    """Cut the map into at most `chunks` ranges, each after the first starting at a property."""
+    size = len(mm)
+    bounds = []
+    for k in range(1, chunks):
+        i = _next_start(mm, max(size * k // chunks, bounds[-1] + 1 if bounds else 0))
+        if i < 0:
+            break
+        if not bounds or i > bounds[-1]:
+            bounds.append(i)
+    edges = [0] + bounds + [size]
+    return list(zip(edges, edges[1:]))
+
+
+def _gap(gaps, data):
+    # whitespace between properties can't affect the skeleton, so don't ship it back
+    if data.strip():
+        gaps.append(data)
+
+
+def _scan(mm, start, end):
+    """(property spans, gap pieces) of the range [start, end)."""
+    spans, gaps, pos = [], [], start
+    while True:
+        i = _next_start(mm, pos, end)
+        if i < 0:
+            _gap(gaps, mm[pos:end])
+            return spans, gaps
+        gt = mm.find(b">", i)
+        if mm[gt - 1:gt] == b"/":
+            stop = gt + 1
+        else:
+            j = mm.find(_CLOSE, gt)
+            if j < 0:
+                raise ValueError(f"unclosed <property> at byte {i}")
+            stop = j + len(_CLOSE)
+        _gap(gaps, mm[pos:i])
+        spans.append((i, stop))
+        pos = stop
+
+
+def _prolog(mm):
+    """The XML declaration, so fragments are decoded with the feed's encoding."""
+    if mm[:5] == b"<?xml":
+        return mm[:mm.find(b"?>") + 2]
+    return b""
+
+
+class _Fragments:
+    """Read-only stream over a sequence of byte pieces."""
+
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._buf = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buf) < size:
+            piece = next(self._pieces, None)
+            if piece is None:
+                break
+            self._buf += piece
+        n = len(self._buf) if size < 0 else size
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    def close(self):
+        pass
+
+
+@dataclass
+class _Part:
+    count: int = 0
+    gaps: list = field(default_factory=list)
+    builder: ReportBuilder = None
+    rows_path: str = None
+    refs: list = None
+
+
+def _work(path, start, end, report, rows, refs, payloads, backend, layout):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        spans, gaps = _scan(mm, start, end)
+        pieces = [_prolog(mm) + b"<chunk>", *(mm[a:b] for a, b in spans), b"</chunk>"]
+    part = _Part(gaps=gaps, builder=ReportBuilder() if report else None,
+                 refs=[] if refs else None)
+    feed = Feed(_Fragments(pieces), payloads=None if payloads == "inline" else PayloadSink(),
+                backend=backend)
+    out = batch = None
+    extract = normalized.record if layout == "normalized" else plan.row
+    if rows:
+        part.rows_path = spool_path(".rows")
+        out, batch = open(part.rows_path, "wb"), []
+    try:
+        for p in feed:
+            if part.builder is not None:
+                part.builder.add(p)
+            if part.refs is not None:
+                part.refs.append(xml_ref_row(p))
+            if out is not None:
+                batch.append(extract(p))
+                if len(batch) >= _ROW_BATCH:
+                    pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+        if batch:
+            pickle.dump(batch, out, pickle.HIGHEST_PROTOCOL)
+    finally:
+        if out is not None:
+            out.close()
+    part.count = feed.count
+    return part
+
+
+def _replay(paths):
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        yield from pickle.load(f)
+                    except EOFError:
+                        break
+        finally:
+            os.remove(path)
+
+
+@dataclass
+class ParallelPass:
+    """Merged outcome of `parallel_pass`."""
+    count: int
+    agents: list                # root-level agents, None without a global <agents>
+    builder: ReportBuilder      # merged report state, or None
+    refs: list                  # xml_ref_row per property, or None
+    row_paths: list = field(default_factory=list)
+
+    def report(self):
+        return self.builder.finish(self.agents)
+
+    def ref_frame(self):
+        """The collected refs as `compare.xml_ref_frame` returns them."""
+        return pd.DataFrame(self.refs, columns=XML_REF_COLUMNS)
+
+    def rows(self):
+        """Export rows (or records) in feed order; the spooled row files are consumed as they're read."""
+        paths, self.row_paths = self.row_paths, []
+        return _replay(paths)
+
+    def discard(self):
+        for path in self.row_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.row_paths = []
+
+
+def parallel_pass(path, jobs=None, report=True, rows=False, refs=False, payloads="summary",
+                  backend=None, chunk_bytes=CHUNK_BYTES, layout="flat", mp_context=None,
+                  progress=None):
+    """Parse the (uncompressed) feed at `path` across `jobs` processes (default: one per CPU).
+
+    With `rows`, the export rows are spooled (`ExtractionPlan.record`s for the
+    normalized `layout`). `mp_context` starts the workers some other way than
+    the platform default, e.g. not by forking a multi-threaded server.
+    `progress(count)` is called with the number of properties of each range
+    as it completes (e.g. `Job.advance`); when it raises, ranges not yet
+    started are dropped and the exception propagates once the running ones end.
+    """
+    if payloads == "zip":
+        raise ValueError("payload extraction to a zip is only supported in a sequential pass")
+    jobs = jobs or os.cpu_count() or 1
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks = jobs * PROGRESS_RANGES if progress is not None else jobs
+        ranges = split_ranges(mm, max(chunks, -(-len(mm) // chunk_bytes)))
+
+    stopped = None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as pool:
+        futures = [pool.submit(_work, path, a, b, report, rows, refs, payloads, backend, layout)
+                   for a, b in ranges]
+        try:
+            for fut in as_completed(futures) if progress is not None else ():
+                if fut.exception() is None:
+                    progress(fut.result().count)
+        except BaseException as e:      # e.g. the job was cancelled
+            stopped = e
+            for fut in futures:
+                fut.cancel()
+    # the pool has drained: collect every part so a failed range doesn't leak row files
+    parts, error = [], stopped
+    for fut in futures:
+        if fut.cancelled():
+            continue
+        try:
+            parts.append(fut.result())
+        except Exception as e:
+            error = error or e
+    merged = ParallelPass(count=sum(part.count for part in parts), agents=None, builder=None,
+                          refs=None, row_paths=[part.rows_path for part in parts if part.rows_path])
+    if error is not None:
+        merged.discard()
+        raise error
+
+    skeleton = Feed(_Fragments([g for part in parts for g in part.gaps]), backend=backend)
+    for _ in skeleton:
+        pass
+    merged.agents = skeleton.agents
+    if report:
+        merged.builder = parts[0].builder
+        for part in parts[1:]:
+            merged.builder.merge(part.builder)
+    if refs:
+        merged.refs = [r for part in parts for r in part.refs]
+    return merged
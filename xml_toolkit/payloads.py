@@ -0,0 +1,196 @@
+"""Lazy handling of inline base64 payloads.
+
+Feeds may embed whole files in `images/image/data` and
+`documents/document/data`. When a `Feed` is given a `PayloadSink`, the raw
+byte stream goes through `PayloadFilter` before it reaches the parser: the
+content of those `<data>` elements is cut out of the stream, hashed and
+counted (and optionally base64-decoded into a sidecar zip) piece by piece,
+and replaced by a short reference. The parser never sees the payload and the
+full base64 text is never built.
+"""
+
+import binascii
+import hashlib
+import zipfile
+
+_MAGIC = [(b"\xff\xd8\xff", ".jpg"), (b"\x89PNG", ".png"), (b"GIF8", ".gif"), (b"%PDF", ".pdf"),
+          (b"RIFF", ".webp"), (b"PK\x03\x04", ".docx"), (b"\xd0\xcf\x11\xe0", ".doc")]
+_HEAD = 8
+_WS = b" \t\r\n"
+# element start/end tags that own a payload <data> child, and the zip folder for each
+_OWNERS = {b"image": "images", b"document": "documents"}
+
+
+def _extension(head):
+    return next((ext for magic, ext in _MAGIC if head.startswith(magic)), ".bin")
+
+
+class PayloadSink:
+    """Collects payloads for one pass over a feed.
+
+    With `zip_path`, payloads are decoded into that zip (rewritten on every
+    pass); without it only their length and sha256 are recorded.
+    """
+
+    def __init__(self, zip_path=None):
+        self.zip_path = zip_path
+        self.count = 0
+        self.chars = 0
+        self._zip = None
+
+    def begin(self):
+        self.end()
+        self.count = self.chars = 0
+        if self.zip_path:
+            self._zip = zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_STORED)
+
+    def end(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def open(self, kind):
+        self.count += 1
+        return _Payload(self, kind, self.count)
+
+
+class _Payload:
+    def __init__(self, sink, kind, n):
+        self.sink, self.kind, self.n = sink, kind, n
+        self.sha = hashlib.sha256()
+        self.length = 0
+        self._pending = b""     # base64 chars not yet forming a full 4-char quantum
+        self._head = b""        # first decoded bytes, held until the member is named
+        self._out = None
+        self.member = None
+
+    def write(self, data):
+        self.sha.update(data)
+        self.length += len(data)
+        if self.sink._zip is None:
+            return
+        data = self._pending + data.translate(None, _WS)
+        cut = len(data) - len(data) % 4
+        self._pending = data[cut:]
+        if cut:
+            self._emit(binascii.a2b_base64(data[:cut]))
+
+    def _emit(self, data):
+        if self._out is None:
+            self._head += data
+            if len(self._head) < _HEAD:
+                return
+            self._start()
+            data, self._head = self._head, b""
+        self._out.write(data)
+
+    def _start(self):
+        self.member = f"{self.kind}/{self.n:06d}{_extension(self._head)}"
+        self._out = self.sink._zip.open(self.member, "w")
+
+    def close(self):
+        """Finish the payload and return the text that stands in for it."""
+        self.sink.chars += self.length
+        if self.sink._zip is not None:
+            try:
+                if self._pending:
+                    self._emit(binascii.a2b_base64(self._pending + b"=" * (-len(self._pending) % 4)))
+            except binascii.Error:
+                pass
+            if self._out is None and self._head:
+                self._start()
+                self._out.write(self._head)
+            if self._out is not None:
+                self._out.close()
+        if not self.length:
+            return ""
+        ref = f"[payload {self.length} chars sha256:{self.sha.hexdigest()[:16]}"
+        return f"{ref} -> {self.member}]" if self.member else ref + "]"
+
+
+def _last_tag(seg, names):
+    """(position, name) of the last `<name>` / `<name ...>` start tag in `seg`."""
+    best = (-1, b"")
+    for name in names:
+        for t in (b"<" + name + b">", b"<" + name + b" "):
+            best = max(best, (seg.rfind(t), name))
+    return best
+
+
+class PayloadFilter:
+    """Read-only binary stream over `raw` with payload content swapped for references.
+
+    Only `<data>` elements inside an `<image>` or `<document>` are treated as
+    payloads; everything else passes through byte for byte. `raw` is read in
+    `chunk_size` pieces (it may return fewer bytes); `read(size)` returns at
+    most `size` filtered bytes, and only an empty result means the end.
+    """
+
+    def __init__(self, raw, sink, chunk_size=1 << 20):
+        self.raw, self.sink, self.chunk_size = raw, sink, chunk_size
+        self._carry = b""
+        self._owner = None      # zip folder of the enclosing <image>/<document>, if any
+        self._payload = None
+        self._eof = False
+        self._buffer, self._pos = b"", 0    # filtered bytes not yet read
+
+    def read(self, size=-1):
+        want = None if size is None or size < 0 else size
+        while not self._eof and (want is None or len(self._buffer) - self._pos < want):
+            chunk = self.raw.read(self.chunk_size)
+            self._eof = not chunk
+            out = [self._buffer[self._pos:]]
+            self._process(self._carry + chunk, out)
+            self._buffer, self._pos = b"".join(out), 0
+        end = len(self._buffer) if want is None else min(self._pos + want, len(self._buffer))
+        data, self._pos = self._buffer[self._pos:end], end
+        return data
+
+    def close(self):
+        self.raw.close()
+
+    def _context(self, seg):
+        opened, name = _last_tag(seg, _OWNERS)
+        closed = max(seg.rfind(b"</" + n + b">") for n in _OWNERS)
+        if opened > closed:
+            self._owner = _OWNERS[name]
+        elif closed > opened:
+            self._owner = None
+
+    def _process(self, data, out):
+        pos, eof = 0, self._eof
+        self._carry = b""
+        while pos < len(data):
+            if self._payload is not None:
+                end = data.find(b"</data", pos)
+                if end < 0:
+                    keep = len(data) if eof else max(pos, len(data) - 6)
+                    self._payload.write(data[pos:keep])
+                    self._carry = data[keep:]
+                    return
+                self._payload.write(data[pos:end])
+                out.append(self._payload.close().encode())
+                self._payload = None
+                pos = end
+                continue
+
+            start = data.find(b"<data", pos)
+            gt = data.find(b">", start) if start >= 0 else -1
+            if start < 0 or gt < 0:
+                # pass everything through, holding back a tag split across chunks
+                cut = len(data)
+                if not eof:
+                    lt = data.rfind(b"<", pos)
+                    if lt >= 0 and data.find(b">", lt) < 0:
+                        cut = lt
+                self._context(data[pos:cut])
+                out.append(data[pos:cut])
+                self._carry = data[cut:]
+                return
+            self._context(data[pos:start])
+            out.append(data[pos:gt + 1])
+            if (self._owner and data[start + 5:start + 6] in (b">", b" ", b"\t", b"\r", b"\n")
+                    and data[gt - 1:gt] != b"/"):
+                self._payload = self.sink.open(self._owner)
+            pos = gt + 1
+
@@ -0,0 +1,231 @@
+"""Per-stage timing, memory and profiling for one run of an action.
+
+A `Run` collects `Stage` records. `stage()` times a block (and, with
+`memory=True`, its tracemalloc peak); `timed()` wraps an iterable such as a
+`Feed` so the time spent producing items is booked to its own stage, even
+though parsing is interleaved with whatever consumes it. Stages nest: each one
+reports total and self time (total minus time booked to stages inside it).
+
+tracemalloc is process-wide, while runs execute on job threads and in
+concurrent sessions. A run therefore measures memory only when it started
+tracing itself, with no other run active, and no other run starts before it
+ends; otherwise its peaks are left as None rather than mixing in another
+run's allocations.
+
+Finished runs can be appended as JSON lines to a log file (by default the
+`XML_TOOLKIT_PERF_LOG` environment variable) and, with `profile=True`, carry
+a cProfile dump of the whole run.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+LOG_PATH = os.environ.get("XML_TOOLKIT_PERF_LOG")
+
+_lock = threading.Lock()
+_active = set()     # runs between __enter__ and __exit__, in any thread or session
+_tracer = None      # the run that started tracemalloc, until it ends
+
+
+class Stage:
+    __slots__ = ("name", "depth", "seconds", "child_seconds", "peak_bytes", "items", "info")
+
+    def __init__(self, name, depth, info):
+        self.name, self.depth, self.info = name, depth, info
+        self.seconds = self.child_seconds = 0.0
+        self.peak_bytes = self.items = None
+
+    @property
+    def self_seconds(self):
+        return self.seconds - self.child_seconds
+
+    def to_dict(self):
+        return {"stage": self.name, "depth": self.depth, "seconds": round(self.seconds, 6),
+                "self_seconds": round(self.self_seconds, 6), "peak_bytes": self.peak_bytes,
+                "items": self.items, **self.info}
+
+
+class _Timed:
+    """Iterable proxy booking the time spent in `next()` to a stage."""
+
+    def __init__(self, run, name, iterable):
+        self._run, self._name, self._iterable = run, name, iterable
+
+    def __getattr__(self, attr):        # e.g. Feed.agents / Feed.count after the pass
+        return getattr(self._iterable, attr)
+
+    def __iter__(self):
+        run = self._run
+        stage = run._stage(self._name)
+        stage.items = stage.items or 0
+        it = iter(self._iterable)
+        while True:
+            run._enter(stage)
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                run._exit(stage)
+            stage.items += 1
+            yield item
+
+
+class Run:
+    """Stage records for one run of `action`; use as a context manager."""
+
+    def __init__(self, action, memory=False, profile=False, log_path=None, **info):
+        self.action, self.info = action, info
+        self.memory, self.profile = memory, profile
+        self.log_path = log_path or LOG_PATH
+        self.stages = {}
+        self.seconds = None
+        self.error = None
+        self.profile_data = None    # .prof bytes (pstats/snakeviz format)
+        self._stack = []            # [stage, started, start_mem]
+        self._profiler = None
+        self._overlapped = False    # another run started while this one was tracing
+        self.memory_skipped = False     # memory was asked for but could not be measured alone
+
+    # ── lifecycle ────────────────────────────────────────────────────────
+    def __enter__(self):
+        global _tracer
+        with _lock:
+            if _tracer is not None:
+                _tracer._overlapped = True
+            if self.memory and not _active and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracer = self
+            _active.add(self)
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._t0
+        if self._profiler is not None:
+            self._profiler.disable()
+            with _profile_file() as path:
+                self._profiler.dump_stats(path)
+                with open(path, "rb") as f:
+                    self.profile_data = f.read()
+            self._profiler = None
+        self._end_tracing()
+        if isinstance(exc, Exception):     # not e.g. Streamlit's st.stop()
+            self.error = f"{type(exc).__name__}: {exc}"
+        if self.log_path:
+            self.write_log(self.log_path)
+        return False
+
+    def _end_tracing(self):
+        global _tracer
+        with _lock:
+            _active.discard(self)
+            measured = _tracer is self and not self._overlapped
+            if _tracer is self:
+                tracemalloc.stop()
+                _tracer = None
+        if self.memory and not measured:
+            self.memory_skipped = True
+            for stage in self.stages.values():
+                stage.peak_bytes = None
+
+    @property
+    def _measuring(self):
+        return _tracer is self and not self._overlapped
+
+    # ── recording ────────────────────────────────────────────────────────
+    def _stage(self, name, **info):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name, len(self._stack), info)
+        else:
+            stage.info.update(info)
+        return stage
+
+    def _enter(self, stage, memory=False):
+        start_mem = None
+        if memory and self._measuring:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack and self._stack[-1][2] is not None:
+                parent = self._stack[-1][0]
+                parent.peak_bytes = max(parent.peak_bytes or 0, peak - self._stack[-1][2])
+            tracemalloc.reset_peak()
+            start_mem = current
+        self._stack.append([stage, time.perf_counter(), start_mem])
+
+    def _exit(self, stage):
+        _, started, start_mem = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        stage.seconds += elapsed
+        if self._stack:
+            self._stack[-1][0].child_seconds += elapsed
+        if start_mem is not None and self._measuring:
+            peak = tracemalloc.get_traced_memory()[1] - start_mem
+            stage.peak_bytes = max(stage.peak_bytes or 0, peak)
+
+    def stage(self, name, items=None, **info):
+        """Context manager timing a block; set `.items` on the yielded stage to record a count."""
+        return _StageBlock(self, name, items, info)
+
+    def timed(self, name, iterable):
+        """Wrap `iterable` so producing its items is recorded as stage `name`."""
+        return _Timed(self, name, iterable)
+
+    # ── output ───────────────────────────────────────────────────────────
+    def to_dict(self):
+        return {"action": self.action, **self.info, "seconds": self.seconds, "error": self.error,
+                "memory": self.memory and not self.memory_skipped,
+                "stages": [s.to_dict() for s in self.stages.values()]}
+
+    def write_log(self, path):
+        record = dict(self.to_dict(), ts=time.strftime("%Y-%m-%dT%H:%M:%S%z"))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def profile_summary(self, limit=25, sort="cumulative"):
+        """Top functions of the captured profile as text."""
+        if not self.profile_data:
+            return ""
+        with _profile_file(self.profile_data) as path:
+            out = io.StringIO()
+            pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+            return out.getvalue()
+
+
+class _StageBlock:
+    def __init__(self, run, name, items, info):
+        self.run, self.name, self.items, self.info = run, name, items, info
+
+    def __enter__(self):
+        self.stage = self.run._stage(self.name, **self.info)
+        if self.items is not None:
+            self.stage.items = self.items
+        self.run._enter(self.stage, memory=True)
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.run._exit(self.stage)
+        return False
+
+
+@contextmanager
+def _profile_file(data=b""):
+    """Path of a temporary .prof file holding `data`, removed on exit (pstats reads and writes only files)."""
+    fd, path = tempfile.mkstemp(prefix="xml_toolkit_", suffix=".prof")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield path
+    finally:
+        os.remove(path)
@@ -0,0 +1,179 @@
+"""Reconciliation of many feeds against one CRM master export.
+
+The master is read once and every feed is streamed once into a ref → count
+`Counter` (`feed_ref_counts`); feeds on disk are counted in worker processes
+(`count_feeds`, in-memory ones meanwhile in the calling process) and only
+their counts travel back, so neither the master nor a feed is copied or
+re-read per feed. `reconcile` then factorizes all refs
+into integer codes and works on (ref code, feed, count) entries, one per
+distinct ref of each feed, with `np.bincount`: the cost is linear in the
+master plus the total size of the feeds, not feeds × master.
+
+The result is a matrix with one row per ref: its count in the master and in
+each feed (0 absent, 1 present, more for a duplicate), the number of feeds
+holding it and a status — "ok", or any of "missing from feeds", "not in
+master", "duplicate" and "in multiple feeds".
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .compare import REF_COLUMN, xml_ref_row
+from .compression import ArchiveMember
+from .export import Artifact, spool_path
+from .feed import Feed
+
+MASTER_COLUMN = "Master"
+STATUSES = ("missing from feeds", "not in master", "duplicate", "in multiple feeds")
+
+
+def feed_ref_counts(source, backend=None, track=None):
+    """Counter of the stripped external_reference of every property, from one streamed pass.
+
+    `track` optionally wraps the feed (e.g. `Job.track`) before it is iterated.
+    """
+    feed = Feed(source, backend=backend)
+    return Counter(xml_ref_row(p)[0] for p in (track(feed) if track else feed))
+
+
+def _safe_counts(source, backend):
+    try:
+        return feed_ref_counts(source, backend), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _on_disk(source):
+    if isinstance(source, ArchiveMember):
+        source = source.archive
+    return isinstance(source, (str, os.PathLike))
+
+
+def count_feeds(sources, jobs=None, backend=None, mp_context=None):
+    """(source, counts, error) for each of `sources` in order, counted across `jobs` processes.
+
+    Feeds on disk (paths, spooled uploads and their zip members) go to the
+    processes; in-memory feeds are counted in this process. A feed that fails
+    has counts None and the error message; the rest still run. A caller that
+    stops iterating early neither waits for the feeds still being counted nor
+    starts the others.
+    """
+    sources = list(sources)
+    jobs = jobs or min(len(sources), os.cpu_count() or 1)
+    if jobs <= 1 or sum(map(_on_disk, sources)) <= 1:
+        for s in sources:
+            yield (s, *_safe_counts(s, backend))
+        return
+    pool = ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context)
+    try:
+        futures = [pool.submit(_safe_counts, s, backend) if _on_disk(s) else None for s in sources]
+        for s, fut in zip(sources, futures):
+            yield (s, *(fut.result() if fut else _safe_counts(s, backend)))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)     # feeds already running finish on their own
+
+
+def _unique_names(names):
+    seen, out = Counter(), []
+    for name in map(str, names):
+        seen[name] += 1
+        out.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return out
+
+
+@dataclass
+class Reconciliation:
+    feeds: list                 # feed names, in matrix column order
+    matrix: pd.DataFrame        # Property ref, Master, one count column per feed, Feeds, Status
+    per_feed: pd.DataFrame      # Feed, Properties, Refs, In master, Not in master, Duplicated, Shared
+
+    def issues(self):
+        """Matrix rows whose status is not "ok"."""
+        return self.matrix[self.matrix["Status"] != "ok"].reset_index(drop=True)
+
+    def summary(self):
+        status = self.matrix["Status"]
+        return {
+            "feeds": len(self.feeds),
+            "refs": len(self.matrix),
+            "ok": int((status == "ok").sum()),
+            **{s.replace(" ", "_"): int(status.str.contains(s, regex=False).sum()) for s in STATUSES},
+        }
+
+    def to_excel(self, path):
+        """Per-feed counts, the refs needing attention and the full matrix as sheets of one workbook."""
+        with pd.ExcelWriter(path, engine="xlsxwriter",
+                            engine_kwargs={"options": {"strings_to_urls": False}}) as xw:
+            self.per_feed.to_excel(xw, index=False, sheet_name="Feeds")
+            self.issues().to_excel(xw, index=False, sheet_name="Issues")
+            self.matrix.to_excel(xw, index=False, sheet_name="Matrix")
+
+
+def reconcile(master, feeds):
+    """Reconcile a master export (DataFrame with a "Property ref" column) against `feeds`.
+
+    `feeds` maps each feed's name to its `feed_ref_counts`, or lists
+    (name, counts) pairs; a name given again is numbered ("feed.xml (2)").
+    """
+    if REF_COLUMN not in master.columns:
+        raise ValueError(f"Excel must contain '{REF_COLUMN}' column")
+    feeds = list(feeds.items() if isinstance(feeds, dict) else feeds)
+    names = _unique_names(name for name, _ in feeds)
+    master_counts = master[REF_COLUMN].dropna().astype(str).str.strip().value_counts()
+
+    # (ref, column, count) entries: column 0 is the master, feed i is column i + 1
+    refs = [master_counts.index.to_numpy(dtype=object)]
+    columns = [np.zeros(len(master_counts), dtype=np.int64)]
+    counts = [master_counts.to_numpy(dtype=np.int64)]
+    for i, (_, found) in enumerate(feeds, 1):
+        refs.append(np.fromiter(found.keys(), dtype=object, count=len(found)))
+        columns.append(np.full(len(found), i, dtype=np.int64))
+        counts.append(np.fromiter(found.values(), dtype=np.int64, count=len(found)))
+    codes, uniques = pd.factorize(np.concatenate(refs))
+    column, count = np.concatenate(columns), np.concatenate(counts)
+    n, in_feed = len(uniques), column > 0
+
+    in_master = np.bincount(codes[~in_feed], weights=count[~in_feed], minlength=n).astype(np.int64)
+    feed_codes, feed_of, feed_count = codes[in_feed], column[in_feed] - 1, count[in_feed]
+    n_feeds = np.bincount(feed_codes, minlength=n)
+    repeated = (in_master > 1) | (np.bincount(feed_codes, weights=feed_count > 1, minlength=n) > 0)
+
+    status = np.full(n, "", dtype=object)
+    for mask, label in zip(((in_master > 0) & (n_feeds == 0), in_master == 0, repeated, n_feeds > 1),
+                           STATUSES):
+        status[mask] = np.where(status[mask] == "", label, status[mask] + "; " + label)
+    status[status == ""] = "ok"
+
+    grid = np.zeros((n, len(names)), dtype=np.int32)
+    grid[feed_codes, feed_of] = feed_count
+    matrix = pd.DataFrame(grid, columns=names)
+    matrix.insert(0, REF_COLUMN, uniques)
+    matrix.insert(1, MASTER_COLUMN, in_master)
+    matrix["Feeds"] = n_feeds
+    matrix["Status"] = status
+
+    def tally(weights=None):
+        return np.bincount(feed_of, weights=weights, minlength=len(names)).astype(np.int64)
+
+    per_feed = pd.DataFrame({
+        "Feed": names,
+        "Properties": tally(feed_count),
+        "Refs": tally(),
+        "In master": tally(in_master[feed_codes] > 0),
+        "Not in master": tally(in_master[feed_codes] == 0),
+        "Duplicated": tally(feed_count > 1),
+        "Shared": tally(n_feeds[feed_codes] > 1),
+    })
+    return Reconciliation(feeds=names, matrix=matrix, per_feed=per_feed)
+
+
+def export_reconciliation(result):
+    """`Reconciliation.to_excel` into a temporary workbook `Artifact`."""
+    path = spool_path(".xlsx")
+    result.to_excel(path)
+    return Artifact(path, len(result.matrix))
@@ -0,0 +1,275 @@
+"""Single-pass quality report over a property feed.
+
+`property_facts` visits each property's children once and collects what the
+checks (a)–(p) read; `ReportBuilder.add` updates every check from those
+facts. Builders only hold counters, lists of refs, the hash index of check
+(o) (`listings.ListingIndex`) and the pins check (p) validates at the end
+(`geo.Centroids`), so partial builders from separate chunks of a feed can be
+merged.
+`finish` turns the state into a `Report`, which the pages just render.
+"""
+
+from collections import Counter, namedtuple
+from dataclasses import dataclass, field
+
+from .backends import findtext
+from .cache import sizeof
+from .codes import ptype_map, status_map
+from .geo import GEO_COLUMNS, centroids
+from .listings import ListingIndex
+
+ADDRESS_TAGS = ("address1", "address2", "address3", "town_city", "county", "postcode")
+_POSTCODE = ADDRESS_TAGS.index("postcode")
+LISTING_COLUMNS = ("cluster", "external_reference", "name", *ADDRESS_TAGS, "latitude", "longitude",
+                   "matched_on")
+_tenure_type, _sale_type, _guide_price_type = map(findtext, ("tenure_type", "sale_type",
+                                                             "guide_price_type"))
+
+
+def _text(elem):
+    return elem.text if elem is not None and elem.text is not None else ""
+
+
+def is_number(text):
+    try:
+        float(text)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+PropertyFacts = namedtuple("PropertyFacts", [
+    "ref", "name", "ptype", "psub", "status",
+    "address",                  # ADDRESS_TAGS values, "" when absent
+    "lat", "lon",               # None = tag absent, "" = present but blank
+    "accuracy",                 # location@accuracy code, None when absent
+    "size_from", "size_to",
+    "bases",                    # <sale_basis> elements
+    "has_images", "has_docs",
+])
+
+
+def property_facts(p):
+    """Everything the report checks read from one property, from a single walk of its children."""
+    ref = name = ptype = psub = status = None
+    address = {}
+    has_images = has_docs = False
+    lat = lon = accuracy = None
+    size_from = size_to = None
+    bases = []
+
+    for child in p:
+        tag = child.tag
+        if tag == "external_reference":
+            ref = _text(child)
+        elif tag == "sales_status":
+            status = _text(child)
+        elif tag == "property_type":
+            ptype = _text(child)
+        elif tag == "property_subtype":
+            psub = _text(child)
+        elif tag == "name":
+            name = _text(child)
+        elif tag == "address":
+            for a in child:
+                address.setdefault(a.tag, _text(a))
+        elif tag == "location":
+            accuracy = child.get("accuracy")
+            for c in child:
+                if c.tag == "latitude" and lat is None:
+                    lat = _text(c).strip()
+                elif c.tag == "longitude" and lon is None:
+                    lon = _text(c).strip()
+        elif tag == "latitude":
+            lat = _text(child).strip()
+        elif tag == "longitude":
+            lon = _text(child).strip()
+        elif tag == "size":
+            for c in child:
+                if c.tag == "size_from" and size_from is None:
+                    size_from = _text(c)
+                elif c.tag == "size_to" and size_to is None:
+                    size_to = _text(c)
+        elif tag == "sale_basises":
+            bases.extend(c for c in child if c.tag == "sale_basis")
+        elif tag == "sale_basis":
+            bases.append(child)
+        elif tag == "images":
+            has_images = True
+        elif tag == "documents":
+            has_docs = True
+
+    return PropertyFacts(ref, name, ptype, psub, status, tuple(address.get(t, "") for t in ADDRESS_TAGS),
+                         lat, lon, accuracy, size_from, size_to, bases, has_images, has_docs)
+
+
+def has_duplicate_address(name, address):
+    """Check (k): the name and address lines repeat a non-blank value."""
+    values = [v for v in (name or "", *address) if v]
+    return len(values) != len(set(values))
+
+
+@dataclass
+class Report:
+    total: int = 0
+    agents_section: bool = False
+    blank_phones: list = field(default_factory=list)          # (a) (name, email)
+    ref_counts: Counter = field(default_factory=Counter)      # (b)
+    status_counts: Counter = field(default_factory=Counter)   # (c)
+    type_counts: Counter = field(default_factory=Counter)     # (d)
+    subtype_count: int = 0                                    # (e)
+    combos: set = field(default_factory=set)                  # (f)
+    lease_errors: list = field(default_factory=list)          # (g)
+    sale_errors: list = field(default_factory=list)           # (h)
+    no_images: list = field(default_factory=list)             # (i)
+    no_docs: list = field(default_factory=list)               # (j)
+    dup_address: list = field(default_factory=list)           # (k) (ref, name, *address)
+    latlong_missing: list = field(default_factory=list)       # (l)
+    invalid_sizes: list = field(default_factory=list)         # (m)
+    blank_postcodes: list = field(default_factory=list)       # (n)
+    dup_listings: list = field(default_factory=list)          # (o) LISTING_COLUMNS rows
+    geo_checked: bool = False                                 # (p) a postcode centroid file was loaded
+    geo_issues: list = field(default_factory=list)            # (p) geo.GEO_COLUMNS rows
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the report, as the `size` of its `cache.results` entry."""
+        return sizeof(self)
+
+    @property
+    def listing_clusters(self):
+        return len({row[0] for row in self.dup_listings})
+
+    @property
+    def unique_refs(self):
+        return sum(1 for c in self.ref_counts.values() if c == 1)
+
+    @property
+    def dup_refs(self):
+        return {r: c for r, c in self.ref_counts.items() if c > 1}
+
+    def to_dict(self):
+        """JSON-ready summary of every check, with codes translated to labels."""
+        return {
+            "total": self.total,
+            "a_blank_phones": ([{"name": n, "email": e} for n, e in self.blank_phones]
+                               if self.agents_section else None),
+            "b_unique_refs": self.unique_refs,
+            "b_duplicate_refs": self.dup_refs,
+            "c_sales_status": {label: self.status_counts.get(code, 0) for code, label in status_map.items()},
+            "d_property_type": {label: self.type_counts.get(code, 0) for code, label in ptype_map.items()},
+            "e_with_subtype": self.subtype_count,
+            "f_type_subtype_combinations": len(self.combos),
+            "g_leasehold_to_let_errors": self.lease_errors,
+            "h_for_sale_price_type_errors": self.sale_errors,
+            "i_missing_images": self.no_images,
+            "j_missing_brochures": self.no_docs,
+            "k_duplicate_address_lines": [list(e) for e in self.dup_address],
+            "l_latlong_blank": self.latlong_missing,
+            "m_invalid_sizes": self.invalid_sizes,
+            "n_blank_postcodes": self.blank_postcodes,
+            "o_duplicate_listings": [dict(zip(LISTING_COLUMNS, row)) for row in self.dup_listings],
+            "p_location_vs_postcode": ([dict(zip(GEO_COLUMNS, row)) for row in self.geo_issues]
+                                       if self.geo_checked else None),
+        }
+
+
+class ReportBuilder:
+    """Accumulates report state one property at a time."""
+
+    def __init__(self):
+        self.report = Report()
+        self.listings = ListingIndex()
+        self.positions = []     # (ref, postcode, lat, lon, accuracy) of every pinned property
+
+    def add(self, p):
+        self.add_facts(property_facts(p))
+
+    def add_facts(self, facts):
+        r = self.report
+        ref, name, ptype, psub, status, address, lat, lon, accuracy, size_from, size_to, bases, \
+            has_images, has_docs = facts
+
+        r.total += 1
+        r.ref_counts[ref] += 1
+        r.status_counts[status] += 1
+        r.type_counts[ptype] += 1
+        if psub:
+            r.subtype_count += 1
+        r.combos.add((ptype or "", psub or ""))
+
+        for basis in bases:
+            tenure = _tenure_type(basis)
+            sale_type = _sale_type(basis)
+            if tenure in {"1", "2"} and sale_type == "2":
+                r.lease_errors.append(ref)
+            if sale_type == "1" and tenure == "3" and _guide_price_type(basis) != "3":
+                r.sale_errors.append(ref)
+
+        if not has_images:
+            r.no_images.append(ref)
+        if not has_docs:
+            r.no_docs.append(ref)
+
+        if has_duplicate_address(name, address):
+            r.dup_address.append((ref, name or "", *address))
+
+        if (lat is not None or lon is not None) and (not lat or not lon):
+            r.latlong_missing.append(ref)
+
+        if not (is_number(size_from) and is_number(size_to)):
+            r.invalid_sizes.append(ref)
+
+        if not address[_POSTCODE]:
+            r.blank_postcodes.append(ref)
+
+        self.listings.add(ref, name, address, address[_POSTCODE], lat, lon)
+        if lat and lon:
+            self.positions.append((ref, address[_POSTCODE], lat, lon, accuracy))
+
+    def merge(self, other):
+        """Fold another builder's state (a later slice of the same feed) into this one."""
+        r, o = self.report, other.report
+        r.total += o.total
+        r.ref_counts.update(o.ref_counts)
+        r.status_counts.update(o.status_counts)
+        r.type_counts.update(o.type_counts)
+        r.subtype_count += o.subtype_count
+        r.combos |= o.combos
+        for name in ("lease_errors", "sale_errors", "no_images", "no_docs", "dup_address",
+                     "latlong_missing", "invalid_sizes", "blank_postcodes"):
+            getattr(r, name).extend(getattr(o, name))
+        self.listings.merge(other.listings)
+        self.positions.extend(other.positions)
+        return self
+
+    def finish(self, agents):
+        """Complete the report with check (a) over the feed's global agents, (o)'s clusters and (p)."""
+        r = self.report
+        r.dup_listings = self.listings.clusters()
+        validate_positions(r, self.positions)
+        r.agents_section = agents is not None
+        r.blank_phones = [(a.findtext("name", "[No Name]"), a.findtext("email", "[No Email]"))
+                          for a in agents or []
+                          if not (a.findtext("telephone") or "").strip()]
+        return r
+
+
+def validate_positions(report, positions):
+    """Check (p): `positions` against the postcode centroid file, when one is configured."""
+    table = centroids()
+    report.geo_checked = table is not None
+    report.geo_issues = table.validate(positions) if table is not None else []
+
+
+def build_report(feed, recorder=None):
+    """Run the full report in one streamed pass over `feed`.
+
+    With a `perf.Run` as `recorder`, parsing is booked to its own stage.
+    """
+    builder = ReportBuilder()
+    if recorder is not None:
+        feed = recorder.timed("parse", feed)
+    for p in feed:
+        builder.add(p)
+    return builder.finish(feed.agents)
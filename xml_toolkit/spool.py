@@ -0,0 +1,154 @@
+"""Large uploads spooled to disk and parsed from there.
+
+Streamlit hands every upload over as an in-memory buffer. Up to `SPOOL_MB`
+the toolkit reads that buffer directly: for a small file this is the fastest
+path, and jobs read it through a zero-copy view (`jobs.detached`). A larger
+upload is copied to a temporary file once, in 1 MB chunks and hashed on the
+way, and every action reads the file from then on, so parsing never adds a
+second in-memory copy to the one Streamlit keeps for the widget. Given at
+least two `SPLIT_JOBS`, a plain XML feed is memory-mapped and parsed by
+`parallel_pass` across that many processes (`split_path`, `split_pass`);
+otherwise it is streamed from the file. Only a spooled plain feed is cheap
+to count ahead of a pass (`progress_total`); jobs over anything else show
+their running count without a total. At most `jobs.JOB_THREADS` jobs run at
+once, so the split passes of concurrent sessions stay within the machine's
+CPUs.
+
+A `SpooledUpload` is path-like, so it can be passed wherever a feed or Excel
+path is expected. Its file is removed when the object is garbage-collected,
+i.e. once the session that spooled it ends or its upload is replaced, and no
+running job still holds it.
+
+`XML_TOOLKIT_SPOOL_MB` sets the threshold, `XML_TOOLKIT_SPOOL_DIR` the
+directory (default: the system temp directory) and `XML_TOOLKIT_SPLIT_JOBS`
+the processes per split pass (default: the CPUs shared among the job threads).
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import types
+import weakref
+
+from .compression import compression
+from .jobs import JOB_THREADS
+from .parallel import count_properties, parallel_pass
+
+SPOOL_MB = int(os.environ.get("XML_TOOLKIT_SPOOL_MB", "64"))
+SPOOL_DIR = os.environ.get("XML_TOOLKIT_SPOOL_DIR") or None
+SPLIT_JOBS = int(os.environ.get("XML_TOOLKIT_SPLIT_JOBS", "0")) or max(1, (os.cpu_count() or 1) // JOB_THREADS)
+# workers are not forked from the (multi-threaded) Streamlit server
+_START = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_no_page = types.ModuleType("__main__")
+_starting = threading.Lock()
+
+
+class _Process(_START.Process):
+    """A worker started without the page script.
+
+    Streamlit runs a page as `__main__` with its `__file__` set, and a
+    forkserver or spawned process imports the parent's `__main__` before its
+    work, i.e. it would run the whole page again; the workers only need
+    toolkit modules.
+    """
+
+    def start(self):
+        with _starting:
+            page, sys.modules["__main__"] = sys.modules["__main__"], _no_page
+            try:
+                super().start()
+            finally:
+                if sys.modules["__main__"] is _no_page:     # unless a page run replaced it meanwhile
+                    sys.modules["__main__"] = page
+
+
+class _SplitContext(type(_START)):
+    Process = _Process
+
+
+SPLIT_CONTEXT = _SplitContext()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _suffix(name):
+    """Every extension of `name` (".xml.gz"), so the spooled copy is recognised like the upload."""
+    base = os.path.basename(name)
+    return base[base.find("."):] if "." in base else ""
+
+
+class SpooledUpload(os.PathLike):
+    """An uploaded file copied to a temporary file, removed once nothing references it."""
+
+    def __init__(self, uploaded, chunk_size=1 << 20):
+        self.name = getattr(uploaded, "name", "upload")
+        fd, self.path = tempfile.mkstemp(prefix="xml_toolkit_upload_", suffix=_suffix(self.name),
+                                         dir=SPOOL_DIR)
+        h = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pos = uploaded.tell()
+                uploaded.seek(0)
+                for chunk in iter(lambda: uploaded.read(chunk_size), b""):
+                    h.update(chunk)
+                    f.write(chunk)
+                uploaded.seek(pos)
+        except BaseException:
+            _remove(self.path)
+            raise
+        self.size = os.path.getsize(self.path)
+        self.digest = h.hexdigest()     # equals `cache.content_hash` of the upload
+        weakref.finalize(self, _remove, self.path)
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.name
+
+    def __reduce__(self):
+        # worker processes get the plain path; only this process owns (and removes) the file
+        return str, (self.path,)
+
+
+def should_spool(uploaded):
+    """Whether an upload is over `SPOOL_MB` and is better read from disk."""
+    size = getattr(uploaded, "size", None)
+    if size is None:
+        size = len(uploaded.getvalue())
+    return size > SPOOL_MB << 20
+
+
+def split_pass(source, **options):
+    """`parallel_pass` over the spooled `source` with this module's jobs and start method."""
+    return parallel_pass(split_path(source), SPLIT_JOBS, mp_context=SPLIT_CONTEXT, **options)
+
+
+def split_path(source):
+    """Path to hand `parallel_pass` when `source` is a spooled plain XML feed; None to stream it.
+
+    With a single `SPLIT_JOBS` a split pass only adds overhead, so feeds are streamed.
+    """
+    if SPLIT_JOBS > 1 and isinstance(source, SpooledUpload) and compression(source) is None:
+        return source.path
+    return None
+
+
+def progress_total(source):
+    """Property count of a spooled plain XML `source` for a job's progress; None for any other source.
+
+    Scanning a file on disk takes a fraction of the pass; a compressed feed
+    would be decompressed twice, so its jobs run without a total.
+    """
+    if isinstance(source, SpooledUpload) and compression(source) is None:
+        return count_properties(source)
+    return None
@@ -0,0 +1,271 @@
+"""Persistent SQLite index of ingested feeds, keyed by content hash.
+
+`FeedStore.ingest` bulk-loads one streamed pass over a feed: a `properties`
+table holding the report facts and the JSON export row of every property, and
+child tables for sale bases, images, documents, links, per-property agents and
+the feed's global agents. A feed whose digest is already stored is not read
+again, so re-opening it costs one primary-key lookup.
+
+The report and the external ref comparison then run as queries against the
+stored feed (`report`, `xml_ref_frame`), and single refs can be looked up
+through the index on external_reference.
+
+Feeds are always ingested through a `PayloadSink` (`FeedStore.feed`), so
+inline base64 image and document data is stored as its length and hash,
+whichever page or command ingested the feed.
+
+The store is optional: the pages use it when `XML_TOOLKIT_STORE` names a
+database file, and the CLI with `--store`.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .backends import findtext
+from .compare import XML_REF_COLUMNS
+from .feed import Feed
+from .fields import COLUMNS, plan
+from .listings import ListingIndex
+from .payloads import PayloadSink
+from .report import (ADDRESS_TAGS, Report, has_duplicate_address, is_number, property_facts,
+                     validate_positions)
+
+STORE_PATH = os.environ.get("XML_TOOLKIT_STORE")
+_BATCH = 5000
+
+# child table → (plan group, item paths stored as columns)
+CHILD_TABLES = {
+    "images": ("images/image", ("caption", "type", "url", "absolute_path", "data")),
+    "documents": ("documents/document", ("description", "type", "show_on_site", "url",
+                                         "absolute_path", "data")),
+    "links": ("links/link", ("name", "type", "url", "width", "height")),
+    "agents": ("agents/agent", ("main_agent", "email")),
+}
+SALE_BASIS_COLUMNS = ("tenure_type", "sale_type", "guide_price", "guide_price_type")
+_basis_fields = [findtext(c) for c in SALE_BASIS_COLUMNS]
+_PROPERTY_COLUMNS = ("external_reference", "name", "property_type", "property_subtype",
+                     "sales_status", *ADDRESS_TAGS, "latitude", "longitude", "accuracy",
+                     "size_from", "size_to", "has_images", "has_docs", "row")
+
+
+def _child_ddl(table, columns):
+    cols = "".join(f", {c} TEXT" for c in columns)
+    return (f"CREATE TABLE IF NOT EXISTS {table} (feed TEXT, seq INTEGER, idx INTEGER{cols}, "
+            f"PRIMARY KEY (feed, seq, idx)) WITHOUT ROWID;")
+
+
+_SCHEMA = "\n".join([
+    "CREATE TABLE IF NOT EXISTS feeds (digest TEXT PRIMARY KEY, properties INTEGER, "
+    "agents_section INTEGER, loaded_at TEXT);",
+    "CREATE TABLE IF NOT EXISTS properties (feed TEXT, seq INTEGER, "
+    + ", ".join(f"{c} {'INTEGER' if c.startswith('has_') else 'TEXT'}" for c in _PROPERTY_COLUMNS)
+    + ", PRIMARY KEY (feed, seq)) WITHOUT ROWID;",
+    *[f"CREATE INDEX IF NOT EXISTS properties_{c} ON properties (feed, {c});"
+      for c in ("external_reference", "sales_status", "property_type", "postcode")],
+    _child_ddl("sale_basis", SALE_BASIS_COLUMNS),
+    *[_child_ddl(table, columns) for table, (_, columns) in CHILD_TABLES.items()],
+    _child_ddl("feed_agents", ("name", "email", "telephone")),
+])
+
+
+def _insert(table, width):
+    return f"INSERT INTO {table} VALUES ({', '.join('?' * width)})"
+
+
+class FeedStore:
+    """SQLite database of ingested feeds; every method opens its own connection."""
+
+    def __init__(self, path=None):
+        self.path = path or STORE_PATH
+        if not self.path:
+            raise ValueError("no store path given and XML_TOOLKIT_STORE is not set")
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=300, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode = WAL")
+            db.create_function("is_number", 1, is_number, deterministic=True)
+            db.create_function("dup_address", 1 + len(ADDRESS_TAGS),
+                               lambda name, *address: has_duplicate_address(name, address),
+                               deterministic=True)
+            yield db
+        finally:
+            db.close()
+
+    # ── loading ──────────────────────────────────────────────────────────
+    def has(self, digest):
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM feeds WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def feed(self, source, backend=None):
+        """The `Feed` to ingest `source` through."""
+        return Feed(source, payloads=PayloadSink(), backend=backend)
+
+    def ingest(self, digest, feed, recorder=None):
+        """Store one pass over `feed` under `digest` unless it is already there; returns the count.
+
+        `feed` is a `FeedStore.feed`, possibly wrapped (e.g. by `Job.track`).
+        """
+        if getattr(feed, "payloads", None) is None:
+            raise ValueError("feeds are ingested through a PayloadSink; open them with FeedStore.feed")
+        with self._connect() as db:
+            found = db.execute("SELECT properties FROM feeds WHERE digest = ?", (digest,)).fetchone()
+            if found:
+                return found[0]
+            db.execute("BEGIN IMMEDIATE")   # one writer; a concurrent ingest of the same feed waits
+            try:
+                found = db.execute("SELECT properties FROM feeds WHERE digest = ?", (digest,)).fetchone()
+                if found:
+                    db.execute("ROLLBACK")
+                    return found[0]
+                count = self._load(db, digest, recorder.timed("parse", feed) if recorder else feed)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return count
+
+    def _load(self, db, digest, feed):
+        batches = {table: [] for table in ("properties", "sale_basis", *CHILD_TABLES)}
+        sql = {"properties": _insert("properties", 2 + len(_PROPERTY_COLUMNS)),
+               "sale_basis": _insert("sale_basis", 3 + len(SALE_BASIS_COLUMNS)),
+               **{t: _insert(t, 3 + len(cols)) for t, (_, cols) in CHILD_TABLES.items()}}
+
+        def flush():
+            for table, rows in batches.items():
+                if rows:
+                    db.executemany(sql[table], rows)
+                    rows.clear()
+
+        seq = -1
+        for seq, p in enumerate(feed):
+            f = property_facts(p)
+            raw = plan.raw(p)
+            batches["properties"].append((
+                digest, seq, f.ref, f.name, f.ptype, f.psub, f.status, *f.address, f.lat, f.lon,
+                f.accuracy, f.size_from, f.size_to, f.has_images, f.has_docs,
+                json.dumps(plan.values(raw), ensure_ascii=False)))
+            for idx, basis in enumerate(f.bases):
+                batches["sale_basis"].append((digest, seq, idx, *(get(basis) for get in _basis_fields)))
+            for table, (group, columns) in CHILD_TABLES.items():
+                for idx, item in enumerate(raw.get(group, ())):
+                    batches[table].append((digest, seq, idx, *(item.get(c) for c in columns)))
+            if len(batches["properties"]) >= _BATCH:
+                flush()
+        flush()
+
+        agents = feed.agents
+        db.executemany(_insert("feed_agents", 6), [
+            (digest, -1, i, a.findtext("name"), a.findtext("email"), a.findtext("telephone"))
+            for i, a in enumerate(agents or [])])
+        db.execute("INSERT INTO feeds VALUES (?, ?, ?, ?)",
+                   (digest, seq + 1, agents is not None, time.strftime("%Y-%m-%dT%H:%M:%S%z")))
+        return seq + 1
+
+    def drop(self, digest):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            for table in ("properties", "sale_basis", *CHILD_TABLES, "feed_agents"):
+                db.execute(f"DELETE FROM {table} WHERE feed = ?", (digest,))
+            db.execute("DELETE FROM feeds WHERE digest = ?", (digest,))
+            db.execute("COMMIT")
+
+    def feeds(self):
+        """Stored feeds as a DataFrame (digest, properties, agents_section, loaded_at)."""
+        with self._connect() as db:
+            return pd.read_sql_query("SELECT * FROM feeds ORDER BY loaded_at", db)
+
+    # ── queries ──────────────────────────────────────────────────────────
+    def report(self, digest, feed=None, recorder=None):
+        """The same `Report` `build_report` gives, computed from the stored feed.
+
+        With `feed`, it is ingested first unless already stored.
+        """
+        if feed is not None:
+            self.ingest(digest, feed, recorder)
+        with self._connect() as db:
+            def q(sql):
+                return db.execute(sql, (digest,)).fetchall()
+
+            def refs(where):
+                return [ref for ref, in q("SELECT external_reference FROM properties "
+                                          f"WHERE feed = ? AND ({where}) ORDER BY seq")]
+
+            found = q("SELECT properties, agents_section FROM feeds WHERE digest = ?")
+            if not found:
+                raise KeyError(f"feed {digest} is not in the store")
+            r = Report(total=found[0][0], agents_section=bool(found[0][1]))
+            for column, counts in (("external_reference", r.ref_counts), ("sales_status", r.status_counts),
+                                   ("property_type", r.type_counts)):
+                counts.update(dict(q(f"SELECT {column}, COUNT(*) FROM properties WHERE feed = ? "
+                                     f"GROUP BY {column} ORDER BY MIN(seq)")))
+            r.subtype_count = q("SELECT COUNT(*) FROM properties WHERE feed = ? "
+                                "AND property_subtype <> ''")[0][0]
+            r.combos = set(q("SELECT DISTINCT COALESCE(property_type, ''), COALESCE(property_subtype, '') "
+                             "FROM properties WHERE feed = ?"))
+
+            basis_refs = ("SELECT p.external_reference FROM sale_basis b JOIN properties p "
+                          "ON p.feed = b.feed AND p.seq = b.seq WHERE b.feed = ? AND ({}) "
+                          "ORDER BY b.seq, b.idx")
+            r.lease_errors = [ref for ref, in q(basis_refs.format(
+                "b.tenure_type IN ('1', '2') AND b.sale_type = '2'"))]
+            r.sale_errors = [ref for ref, in q(basis_refs.format(
+                "b.sale_type = '1' AND b.tenure_type = '3' AND b.guide_price_type IS NOT '3'"))]
+
+            r.no_images = refs("NOT has_images")
+            r.no_docs = refs("NOT has_docs")
+            address = ", ".join(ADDRESS_TAGS)
+            r.dup_address = [(ref, name or "", *rest) for ref, name, *rest in q(
+                f"SELECT external_reference, name, {address} FROM properties "
+                f"WHERE feed = ? AND dup_address(name, {address}) ORDER BY seq")]
+            r.latlong_missing = refs("(latitude IS NOT NULL OR longitude IS NOT NULL) "
+                                     "AND (COALESCE(latitude, '') = '' OR COALESCE(longitude, '') = '')")
+            r.invalid_sizes = refs("NOT (is_number(size_from) AND is_number(size_to))")
+            r.blank_postcodes = refs("postcode = ''")
+            listings = ListingIndex()
+            postcode = ADDRESS_TAGS.index("postcode")
+            for ref, name, *lines, lat, lon in q(f"SELECT external_reference, name, {address}, latitude, "
+                                                 "longitude FROM properties WHERE feed = ? ORDER BY seq"):
+                listings.add(ref, name, tuple(lines), lines[postcode], lat, lon)
+            r.dup_listings = listings.clusters()
+            validate_positions(r, q("SELECT external_reference, postcode, latitude, longitude, accuracy "
+                                    "FROM properties WHERE feed = ? AND latitude <> '' AND longitude <> '' "
+                                    "ORDER BY seq"))
+
+            r.blank_phones = [(name if name is not None else "[No Name]",
+                               email if email is not None else "[No Email]")
+                              for name, email, phone in q("SELECT name, email, telephone FROM feed_agents "
+                                                          "WHERE feed = ? ORDER BY idx")
+                              if not (phone or "").strip()]
+        return r
+
+    def xml_ref_frame(self, digest, feed=None, recorder=None):
+        """`compare.xml_ref_frame` of the stored feed (ingesting `feed` first when given)."""
+        if feed is not None:
+            self.ingest(digest, feed, recorder)
+        with self._connect() as db:
+            rows = db.execute("SELECT external_reference, sales_status FROM properties "
+                              "WHERE feed = ? ORDER BY seq", (digest,)).fetchall()
+        return pd.DataFrame([((ref or "").strip(), (status or "").strip()) for ref, status in rows],
+                            columns=XML_REF_COLUMNS)
+
+    def lookup(self, digest, ref):
+        """Export rows of the properties with external_reference `ref`."""
+        with self._connect() as db:
+            rows = db.execute("SELECT row FROM properties WHERE feed = ? AND external_reference = ? "
+                              "ORDER BY seq", (digest, ref)).fetchall()
+        return pd.DataFrame([json.loads(row) for row, in rows], columns=COLUMNS)
+
+    def rows(self, digest):
+        """Export rows of the stored feed in feed order."""
+        with self._connect() as db:
+            for row, in db.execute("SELECT row FROM properties WHERE feed = ? ORDER BY seq", (digest,)):
+                yield json.loads(row)
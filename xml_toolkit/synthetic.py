@@ -0,0 +1,198 @@
+"""Synthetic feeds and matching CRM exports for benchmarks.
+
+`write_feed` streams a feed of any size with every part of the schema the
+toolkit reads: global agents, address, location accuracy, sale bases,
+descriptions, images (optionally with inline base64 `data`), documents and
+links. A small share of properties carries the faults the report looks for.
+`write_excel` writes the "Property ref" export to compare it against, with
+some refs missing, some extra and some duplicated, and `write_postcodes` a
+centroid file for every postcode a feed can use (for check (p)).
+
+Output is deterministic for a given seed.
+"""
+
+import base64
+import csv
+import random
+import zlib
+from xml.sax.saxutils import escape
+
+from .codes import (desc_map, doc_type_map, img_type_map, link_type_map, loc_acc_map,
+                    prop_subtype_map, size_type_map, status_map)
+from .compare import EXCEL_COLUMNS
+from .export import write_xlsx
+
+# town, county, postcode area, latitude, longitude
+_TOWNS = [("Leeds", "West Yorkshire", "LS", 53.80, -1.55),
+          ("Manchester", "Greater Manchester", "M", 53.48, -2.24),
+          ("Bristol", "Avon", "BS", 51.45, -2.59),
+          ("Birmingham", "West Midlands", "B", 52.49, -1.89),
+          ("Glasgow", "Lanarkshire", "G", 55.86, -4.25),
+          ("Cardiff", "South Glamorgan", "CF", 51.48, -3.18),
+          ("Norwich", "Norfolk", "NR", 52.63, 1.30),
+          ("Reading", "Berkshire", "RG", 51.45, -0.97)]
+_INWARD = "ABDEFGHJLNPQRSTUWXYZ"
+_STREETS = ["High Street", "Station Road", "Park Lane", "Mill Road", "Church Street", "Victoria Road",
+            "Kings Road", "Bridge Street", "Queens Way", "Market Place"]
+_WORDS = ("modern open plan office space with excellent natural light, raised floors, air conditioning, "
+          "allocated parking and good access to the motorway network and local amenities").split()
+_SUBTYPES = {}
+for _ptype, _psub in prop_subtype_map:
+    _SUBTYPES.setdefault(_ptype, []).append(_psub)
+
+
+def _centroid(postcode, lat, lon):
+    """Fixed position of a synthetic postcode near its town centre (`lat`, `lon`)."""
+    h = zlib.crc32(postcode.encode())
+    return lat + ((h & 0xFFFF) / 0xFFFF - 0.5) * 0.1, lon + ((h >> 16) / 0xFFFF - 0.5) * 0.1
+
+
+def _blob(size, seed):
+    rnd = random.Random(seed)
+    return base64.b64encode(b"\xff\xd8\xff\xe0" + rnd.randbytes(max(size - 4, 0))).decode()
+
+
+class _Writer:
+    def __init__(self, rnd, faults, images, blob_rate, blobs):
+        self.rnd, self.faults, self.images = rnd, faults, images
+        self.blob_rate, self.blobs = blob_rate, blobs
+
+    def fault(self):
+        return self.rnd.random() < self.faults
+
+    def property(self, ref, n):
+        rnd = self.rnd
+        town, county, area, lat, lon = rnd.choice(_TOWNS)
+        unit, street = rnd.randint(1, 250), rnd.choice(_STREETS)
+        ptype = rnd.choice(list(_SUBTYPES))
+        postcode = "" if self.fault() else (f"{area}{rnd.randint(1, 29)} {rnd.randint(1, 9)}"
+                                            f"{rnd.choice(_INWARD)}{rnd.choice(_INWARD)}")
+        name = street if self.fault() else f"Unit {unit}, {street}"
+        out = [
+            "<property>",
+            f"<external_reference>{escape(ref)}</external_reference><action>1</action>",
+            f"<name>{escape(name)}</name>",
+            f"<address><address1>Unit {unit}</address1><address2>{street}</address2>"
+            f"<town_city>{town}</town_city><county>{county}</county>"
+            f"<postcode>{postcode}</postcode><country>United Kingdom</country></address>",
+        ]
+        if self.fault():
+            out.append(f'<location accuracy="0"><latitude>{lat:.5f}</latitude>'
+                       "<longitude></longitude></location>")
+        else:
+            if postcode:
+                lat, lon = _centroid(postcode, lat, lon)
+            out.append(f'<location accuracy="{rnd.choice(list(loc_acc_map))}">'
+                       f"<latitude>{lat + rnd.uniform(-0.005, 0.005):.5f}</latitude>"
+                       f"<longitude>{lon + rnd.uniform(-0.005, 0.005):.5f}</longitude></location>")
+        out.append(f"<property_type>{ptype}</property_type>"
+                   f"<property_subtype>{rnd.choice(_SUBTYPES[ptype])}</property_subtype>"
+                   f"<sales_status>{rnd.choice(list(status_map))}</sales_status>")
+        out.append(f"<agents><agent><main_agent>1</main_agent><email>agent{n % 50}@example.com</email>"
+                   "</agent><agent><main_agent>0</main_agent><email>support@example.com</email>"
+                   "</agent></agents>")
+        size_from = rnd.randint(200, 20000)
+        size_to = "TBC" if self.fault() else size_from + rnd.randint(0, 5000)
+        out.append(f'<size type="{rnd.choice(list(size_type_map))}"><size_from>{size_from}</size_from>'
+                   f"<size_to>{size_to}</size_to></size>")
+        out.append("<sale_basises>")
+        for _ in range(rnd.randint(1, 2)):
+            # lettings normally carry tenure 3 (NA), sales a freehold/leasehold tenure
+            sale_type = rnd.choice("12")
+            tenure = "3" if (sale_type == "2") != self.fault() else rnd.choice("12")
+            out.append(f"<sale_basis><tenure_type>{tenure}</tenure_type><sale_type>{sale_type}</sale_type>"
+                       f"<guide_price>{rnd.randint(10, 5000) * 1000}</guide_price>"
+                       f"<guide_price_type>{rnd.choice('124567')}</guide_price_type></sale_basis>")
+        out.append("</sale_basises><descriptions>")
+        for code in rnd.sample(list(desc_map), rnd.randint(1, len(desc_map))):
+            words = " ".join(rnd.choices(_WORDS, k=rnd.randint(10, 60)))
+            out.append(f'<description type="{code}">{words}</description>')
+        out.append("</descriptions>")
+        if not self.fault():
+            out.append("<images>")
+            for i in range(rnd.randint(1, self.images)):
+                if self.blobs and rnd.random() < self.blob_rate:
+                    source = f"<data>{rnd.choice(self.blobs)}</data>"
+                else:
+                    source = f"<url>https://img.example.com/{ref}/{i}.jpg</url>"
+                out.append(f"<image><caption>Image {i + 1}</caption>"
+                           f"<type>{rnd.choice(list(img_type_map))}</type>{source}</image>")
+            out.append("</images>")
+        if not self.fault():
+            out.append(f"<documents><document><description>Brochure</description>"
+                       f"<type>{rnd.choice(list(doc_type_map))}</type><show_on_site>1</show_on_site>"
+                       f"<url>https://docs.example.com/{ref}.pdf</url></document></documents>")
+        if rnd.random() < 0.3:
+            out.append(f"<links><link><name>Tour</name><type>{rnd.choice(list(link_type_map))}</type>"
+                       f"<url>https://tour.example.com/{ref}</url><width>640</width><height>480</height>"
+                       f"</link></links>")
+        out.append(f"<last_updated>2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}</last_updated>"
+                   f"<force_update>{rnd.choice('01')}</force_update></property>\n")
+        return "".join(out)
+
+
+def write_feed(path, count, dup_rate=0.01, fault_rate=0.02, images=3, blob_rate=0.0,
+               blob_bytes=50_000, seed=0):
+    """Write a feed of `count` properties to `path`; returns the refs in feed order.
+
+    `dup_rate` of properties reuse an earlier ref, `fault_rate` is the chance
+    of each injected data fault, and `blob_rate` of images carry a
+    `blob_bytes` inline base64 payload instead of a URL.
+    """
+    rnd = random.Random(seed)
+    blobs = [_blob(blob_bytes, seed + i) for i in range(8)] if blob_rate else []
+    writer = _Writer(rnd, fault_rate, images, blob_rate, blobs)
+    refs = []
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<root>\n<agents>\n')
+        for i in range(5):
+            phone = "" if i == 4 else f"0113 496 0{i:03d}"
+            f.write(f"<agent><name>Agent {i}</name><email>agent{i}@example.com</email>"
+                    f"<telephone>{phone}</telephone></agent>\n")
+        f.write("</agents>\n<properties>\n")
+        for n in range(count):
+            ref = rnd.choice(refs) if refs and rnd.random() < dup_rate else f"SYN{n:07d}"
+            refs.append(ref)
+            f.write(writer.property(ref, n))
+        f.write("</properties>\n</root>\n")
+    return refs
+
+
+def write_excel(path, refs, missing_rate=0.02, extra_rate=0.02, dup_rate=0.01, seed=0):
+    """Write a CRM export listing `refs`, minus/plus/duplicating a share of them."""
+    rnd = random.Random(seed + 1)
+
+    def rows():
+        for ref in dict.fromkeys(refs):
+            if rnd.random() < missing_rate:
+                continue
+            row = [f"https://crm.example.com/p/{ref}", ref, rnd.choice(list(status_map.values())),
+                   "2023-01-01", "2024-06-01"]
+            yield row
+            if rnd.random() < dup_rate:
+                yield row
+            if rnd.random() < extra_rate:
+                yield [f"https://crm.example.com/p/X{ref}", f"X{ref}", "Available",
+                       "2023-01-01", "2024-06-01"]
+
+    return write_xlsx(rows(), path, columns=EXCEL_COLUMNS, sheet_name="Sheet1")
+
+
+def write_postcodes(path):
+    """Write the centroid CSV (postcode, latitude, longitude) of every postcode `write_feed` can use.
+
+    Returns the number of postcodes.
+    """
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["postcode", "latitude", "longitude"])
+        for _, _, area, lat, lon in _TOWNS:
+            for district in range(1, 30):
+                for sector in range(1, 10):
+                    for a in _INWARD:
+                        for b in _INWARD:
+                            postcode = f"{area}{district} {sector}{a}{b}"
+                            out.writerow([postcode, *(f"{v:.6f}" for v in _centroid(postcode, lat, lon))])
+                            rows += 1
+    return rows
@@ -0,0 +1,323 @@
+"""Streamlit rendering shared by the toolkit pages."""
+
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from .cache import content_hash
+from .codes import ptype_map, status_map
+from .compression import ArchiveMember, xml_members
+from .geo import GEO_COLUMNS
+from .jobs import Job
+from .perf import Run
+from .report import ADDRESS_TAGS, LISTING_COLUMNS
+from .spool import SpooledUpload, should_spool
+
+PERF_RUNS = 10      # runs kept in the Performance panel per session
+PAGE_ROWS = 100     # rows per page of a findings table
+_perf_lock = threading.Lock()   # runs are added from job threads while the page renders them
+
+
+def _upload_key(uploaded):
+    return getattr(uploaded, "file_id", None) or (uploaded.name, uploaded.size)
+
+
+def upload_digest(uploaded):
+    """Content hash of an upload, computed once per upload rather than per rerun."""
+    digests = st.session_state.setdefault("_upload_digests", {})
+    key = _upload_key(uploaded)
+    if key not in digests:
+        digests[key] = content_hash(uploaded)
+    return digests[key]
+
+
+def upload_source(uploaded, slot):
+    """What to read an upload through: the upload itself, or a `SpooledUpload` over `SPOOL_MB`.
+
+    The spooled copy is kept in this session's state under `slot` (one per
+    uploader), so it is spooled once, and its temporary file goes when the
+    upload in that slot is replaced or the session ends.
+    """
+    if not should_spool(uploaded):
+        return uploaded
+    spooled = st.session_state.setdefault("_spooled", {})
+    key = _upload_key(uploaded)
+    if slot not in spooled or spooled[slot][0] != key:
+        spooled[slot] = (key, SpooledUpload(uploaded))
+        st.session_state.setdefault("_upload_digests", {})[key] = spooled[slot][1].digest
+    return spooled[slot][1]
+
+
+def feed_upload(uploaded, key):
+    """(feed source, digest) of an uploaded feed, spooled to disk when large (`upload_source`).
+
+    A zip holding several feeds gets a picker (widget `key`) for the one to work on.
+    """
+    source = upload_source(uploaded, key)
+    digest = upload_digest(uploaded)
+    names = st.session_state.setdefault("_upload_members", {})
+    if digest not in names:
+        names[digest] = xml_members(source)
+    if len(names[digest]) > 1:
+        name = st.selectbox(f"Feed in {uploaded.name}", names[digest], key=key)
+        return ArchiveMember(source, name), f"{digest}:{name}"
+    return source, digest
+
+
+def background_job(key, work, label, restart=False):
+    """This session's `Job` for `key`, starting `work(job)` when there is none.
+
+    With `restart`, a failed or cancelled job is replaced by a fresh one.
+    """
+    jobs = st.session_state.setdefault("_jobs", {})
+    job = jobs.get(key)
+    if job is None or (restart and job.state in ("failed", "cancelled")):
+        job = jobs[key] = Job(work, label)
+    return job
+
+
+def job_result(key):
+    """The result of this session's finished job for `key`, dropping the job; None otherwise."""
+    jobs = st.session_state.setdefault("_jobs", {})
+    job = jobs.get(key)
+    if job is None or job.state != "done":
+        return None
+    del jobs[key]
+    return job.result
+
+
+def render_job(key):
+    """Progress bar and Cancel button of this session's job for `key` (nothing when there is none)."""
+    job = st.session_state.setdefault("_jobs", {}).get(key)
+    if job is None:
+        return
+    if job.running:
+        st.progress(job.fraction or 0.0, text=f"{job.label}: {job.describe()}")
+        if st.button("✖ Cancel", key=f"cancel_{id(job)}"):
+            job.cancel()
+        return
+    if job.state == "failed":
+        st.error(f"❌ {job.label} failed: {job.error}")
+    elif job.state == "cancelled":
+        st.warning(f"{job.label} cancelled after {job.describe()}.")
+    if st.button("↻ Retry", key=f"retry_{id(job)}"):
+        st.session_state["_jobs"].pop(key, None)
+        st.rerun()
+
+
+def rerun_while_busy(interval=0.5):
+    """Re-run the page every `interval` seconds while any of this session's jobs is running."""
+    if any(job.running for job in st.session_state.get("_jobs", {}).values()):
+        time.sleep(interval)
+        st.rerun()
+
+
+def _frame(rows, columns):
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    if len(columns) == 1:
+        rows = [(r,) for r in rows]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _csv(key, rows, columns, owner):
+    """CSV of all `rows`, built once per `owner` (the object the rows come from) and `key`."""
+    cached = st.session_state.setdefault("_findings_csv", {}).get(key)
+    if cached is None or cached[0] is not owner:
+        cached = st.session_state["_findings_csv"][key] = (
+            owner, _frame(rows, columns).to_csv(index=False).encode("utf-8"))
+    return cached[1]
+
+
+def render_findings(key, rows, columns=None, empty=None, owner=None):
+    """Count, one page of `rows` and a "download full list as CSV" button.
+
+    `rows` is a DataFrame, a list of tuples or (for one column) a list of
+    values. Only the current page of `PAGE_ROWS` rows is sent to the browser,
+    so the cost of rendering does not grow with the number of findings. The
+    CSV is kept per `owner` (default: `rows` itself) so reruns reuse it.
+    """
+    n = len(rows)
+    if not n:
+        if empty:
+            st.success(empty)
+        return
+    columns = list(rows.columns) if isinstance(rows, pd.DataFrame) else columns
+    pages = -(-n // PAGE_ROWS)
+    if st.session_state.get(f"page_{key}", 1) > pages:     # fewer findings than on a previous run
+        st.session_state[f"page_{key}"] = pages
+    left, right = st.columns([1, 3])
+    page = left.number_input(f"Page (of {pages:,})", 1, pages, 1, key=f"page_{key}") if pages > 1 else 1
+    start = (page - 1) * PAGE_ROWS
+    chunk = rows.iloc[start:start + PAGE_ROWS] if isinstance(rows, pd.DataFrame) else rows[start:start + PAGE_ROWS]
+    right.caption(f"{n:,} in total · showing {start + 1:,}–{start + len(chunk):,}")
+    st.dataframe(_frame(chunk, columns), hide_index=True)
+    st.download_button("⬇️ Download full list as CSV",
+                       _csv(key, rows, columns, rows if owner is None else owner),
+                       file_name=f"{key}.csv", mime="text/csv", key=f"csv_{key}")
+
+
+class PerfPanel:
+    """Collapsible sidebar "Performance" panel listing this session's recent runs.
+
+    Create it before any action runs (its options configure the runs), wrap
+    each action in `run(...)`, and call `render()` at the end of the page.
+    """
+
+    def __init__(self):
+        self.box = st.sidebar.expander("⏱️ Performance", expanded=False)
+        self.memory = self.box.checkbox("Track memory per stage (tracemalloc)", key="perf_memory")
+        self.profile = self.box.checkbox("Capture a cProfile of the next run", key="perf_profile")
+        self.runs = st.session_state.setdefault("_perf_runs", [])
+
+    def run(self, action, **info):
+        """A `perf.Run` for `action`, listed in the panel whether or not it succeeds.
+
+        Safe to call from a job thread.
+        """
+        run = Run(action, memory=self.memory, profile=self.profile, **info)
+        with _perf_lock:
+            self.runs.append(run)
+            del self.runs[:-PERF_RUNS]
+        return run
+
+    def render(self):
+        with _perf_lock:
+            runs = list(self.runs)
+        with self.box:
+            if not runs:
+                st.caption("No runs recorded yet.")
+            for run in reversed(runs):
+                seconds = f"{run.seconds:.3f}s" if run.seconds is not None else "running"
+                st.markdown(f"**{run.action}** · {seconds}" + (f" · ❌ {run.error}" if run.error else ""))
+                if run.memory_skipped:
+                    st.caption("Memory not measured: another run overlapped this one.")
+                stages = pd.DataFrame([s.to_dict() for s in list(run.stages.values())],
+                                      columns=["stage", "depth", "seconds", "self_seconds",
+                                               "peak_bytes", "items"])
+                if len(stages):
+                    stages["stage"] = ["· " * d + name for d, name in zip(stages["depth"], stages["stage"])]
+                    stages["peak_mb"] = (stages.pop("peak_bytes").astype(float) / 1e6).round(2)
+                    st.dataframe(stages.drop(columns="depth"), hide_index=True)
+                if run.profile_data:
+                    st.download_button("⬇️ cProfile (.prof)", run.profile_data,
+                                       file_name=f"{run.action.replace(' ', '_')}.prof",
+                                       key=f"perf_prof_{id(run)}")
+                    st.code(run.profile_summary(limit=15))
+
+
+def render_report(report):
+    """Render a finished `Report`, checks (a)–(p), each list as a paged table."""
+    # (a) Blank phone numbers from top-level <agents>
+    st.subheader("a) Blank Phone Numbers")
+    if report.agents_section:
+        st.write(f"Number of agents with blank phone numbers: {len(report.blank_phones)}")
+        render_findings("blank_phones", report.blank_phones, ["Name", "Email"],
+                        empty="No agents with blank phone numbers found.")
+    else:
+        st.warning("No global <agents> section found.")
+
+    # (b) Unique and duplicated external references
+    st.subheader("b) External References")
+    dup_refs = report.dup_refs
+    st.write("Unique External References:", report.unique_refs)
+    st.write("Duplicated References Count:", len(dup_refs))
+    render_findings("duplicate_refs", list(dup_refs.items()), ["external_reference", "count"],
+                    owner=report)
+
+    # (c) Sales status count
+    st.subheader("c) Sales Status Count")
+    for code, label in status_map.items():
+        st.write(f"{label}: {report.status_counts.get(code, 0)}")
+
+    # (d) Property type count
+    st.subheader("d) Property Type Count")
+    for code, label in ptype_map.items():
+        st.write(f"{label}: {report.type_counts.get(code, 0)}")
+
+    # (e) Property subtype count
+    st.subheader("e) Property Subtype Count")
+    st.write("Properties with a subtype:", report.subtype_count)
+
+    # (f) Unique type + subtype combinations
+    st.subheader("f) Unique Property Type + Subtype")
+    st.write("Unique combinations:", len(report.combos))
+
+    refs = ["external_reference"]
+
+    # (g) Leasehold/To Let error
+    st.subheader("g) Leasehold/To Let Error")
+    st.write(f"Properties with Leasehold/To Let error: {len(report.lease_errors)}")
+    render_findings("lease_errors", report.lease_errors, refs)
+
+    # (h) For Sale/Price Type error
+    st.subheader("h) For Sale/Price Type Error")
+    st.write(f"Properties with For Sale/Price Type error: {len(report.sale_errors)}")
+    render_findings("sale_errors", report.sale_errors, refs)
+
+    # (i) Properties missing images
+    st.subheader("i) Properties Missing Images")
+    st.write(f"Missing images: {len(report.no_images)}")
+    render_findings("missing_images", report.no_images, refs)
+
+    # (j) Properties missing brochures
+    st.subheader("j) Properties Missing Brochures")
+    st.write(f"Missing brochures: {len(report.no_docs)}")
+    render_findings("missing_brochures", report.no_docs, refs)
+
+    # (k) Duplicate address lines
+    st.subheader("k) Duplicate Address Lines")
+    st.write(f"Properties with duplicate address fields: {len(report.dup_address)}")
+    render_findings("duplicate_address", report.dup_address, [*refs, "name", *ADDRESS_TAGS])
+
+    # (l) LAT/LONG tags present but blank
+    st.subheader("l) LAT/LONG Missing")
+    st.write(f"Properties where <latitude> and/or <longitude> exist but are blank: "
+             f"{len(report.latlong_missing)}")
+    render_findings("latlong_missing", report.latlong_missing, refs,
+                    empty="No LAT/LONG fields are blank when tags are present.")
+
+    # (m) Size missing or invalid
+    st.subheader("m) Size Missing or Invalid")
+    st.write(f"Invalid or missing sizes: {len(report.invalid_sizes)}")
+    render_findings("invalid_sizes", report.invalid_sizes, refs)
+
+    # (n) Postcode blank
+    st.subheader("n) Postcode Blank")
+    st.write(f"Properties with blank postcode: {len(report.blank_postcodes)}")
+    render_findings("blank_postcodes", report.blank_postcodes, refs)
+
+    # (o) One building listed under several refs
+    st.subheader("o) Likely Duplicate Listings")
+    st.write(f"Clusters of properties sharing an address, or a name or first address line nearby: "
+             f"{report.listing_clusters} "
+             f"({len(report.dup_listings)} properties)")
+    render_findings("duplicate_listings", report.dup_listings, list(LISTING_COLUMNS),
+                    empty="No properties share an address, or a name or address line nearby, with another ref.")
+
+    # (p) Pins checked against postcode centroids
+    st.subheader("p) Location vs Postcode")
+    if report.geo_checked:
+        st.write(f"Properties whose pin is invalid or too far from their postcode: {len(report.geo_issues)}")
+        render_findings("location_vs_postcode", report.geo_issues, list(GEO_COLUMNS),
+                        empty="Every pin is within range of its postcode.")
+    else:
+        st.info("Set XML_TOOLKIT_POSTCODES to a postcode centroid CSV (postcode, latitude, longitude) "
+                "to check pins against postcodes.")
+
+
+def render_diff(diff):
+    """Render a `FeedDiff`: counts, field-level changes, then the affected rows."""
+    for col, (label, n) in zip(st.columns(4), diff.summary().items()):
+        col.metric(label.title(), n)
+
+    st.subheader("Field changes")
+    render_findings("diff_fields", diff.fields, empty="No property changed between the two feeds.")
+
+    st.subheader("Added / changed properties")
+    render_findings("diff_rows", diff.rows, empty="No properties were added or changed.")
+
+    st.subheader("Removed properties")
+    render_findings("diff_removed", diff.removed, empty="No properties were removed.")